@@ -0,0 +1,57 @@
+#%%
+"""
+Throughput scaling of process_corpus with the number of worker processes.
+
+The six data/ASU_2022-*.html files are replicated into a temporary directory to build a corpus of a few hundred
+documents, which is then processed with an increasing number of workers.
+
+Usage (from the repository root):
+    python src/benchmark/batch_throughput.py [--documents 300] [--workers 1 2 4 8] [--backend bs4]
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.BatchProcessor import process_corpus
+
+
+def build_corpus(directory, documents):
+    sources = sorted(glob.glob(os.path.join(ROOT, 'data', 'ASU_2022-*.html')))
+    paths = []
+    for i in range(documents):
+        path = os.path.join(directory, f'{i:05d}_{os.path.basename(sources[i % len(sources)])}')
+        shutil.copyfile(sources[i % len(sources)], path)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--documents', type=int, default=300)
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count()])
+    arg_parser.add_argument('--backend', default='bs4')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = build_corpus(directory, args.documents)
+        megabytes = sum(os.path.getsize(path) for path in paths) / 1e6
+        print(f'{len(paths)} documents, {megabytes:.1f} MB, backend {args.backend}')
+        print(f'{"workers":>8} {"seconds":>9} {"docs/s":>9} {"MB/s":>8} {"speedup":>8} {"failed":>7}')
+
+        baseline = None
+        for workers in dict.fromkeys(args.workers):
+            start = time.perf_counter()
+            results = process_corpus(paths, workers=workers, parser_kwargs={'backend': args.backend})
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            failed = sum(not result.ok for result in results)
+            print(f'{workers:>8} {elapsed:>9.2f} {len(paths) / elapsed:>9.1f} {megabytes / elapsed:>8.1f} {baseline / elapsed:>7.2f}x {failed:>7}')
+
+# %%
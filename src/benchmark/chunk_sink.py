@@ -0,0 +1,79 @@
+#%%
+"""
+Writing a whole corpus of chunk records to one file: the peak RSS after every pass over the data/ files, with the
+records streamed through a ChunkSink versus collected in a list and written at the end.
+
+Usage (from the repository root):
+    python src/benchmark/chunk_sink.py [--passes 20] [--output chunks.jsonl.gz]
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.ChunkSink import ChunkSink
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def corpus_chunks(documents, passes):
+    for copy in range(passes):
+        for path, html_content in documents:
+            yield f'{path}#{copy}', TextChunker(HTMLParser(html_content, backend='lxml').parse()).chunk_text(keep_text_only=False)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--passes', type=int, default=20, help='passes over the data/ files')
+    arg_parser.add_argument('--output', help='the output file, a temporary .jsonl.gz by default')
+    arg_parser.add_argument('--collect', action='store_true', help='collect every record in a list before writing')
+    args = arg_parser.parse_args(argv)
+
+    documents = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.html'))):
+        with open(path, 'r', encoding='utf-8') as html_file:
+            documents.append((os.path.basename(path), html_file.read()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = args.output or os.path.join(directory, 'chunks.jsonl.gz')
+        start = time.perf_counter()
+        checkpoints = []
+        if args.collect:
+            records = []
+            for index, (document_id, chunks) in enumerate(corpus_chunks(documents, args.passes)):
+                records.extend(ChunkSink.chunk_records(document_id, chunks))
+                if (index + 1) % len(documents) == 0:
+                    checkpoints.append(peak_rss_mb())
+            with open(output, 'w', encoding='utf-8') as records_file:
+                records_file.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+            written = len(records)
+        else:
+            with ChunkSink(output) as sink:
+                for index, (document_id, chunks) in enumerate(corpus_chunks(documents, args.passes)):
+                    sink.write_chunks(document_id, chunks)
+                    if (index + 1) % len(documents) == 0:
+                        checkpoints.append(peak_rss_mb())
+            written = sink.records
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(output)
+
+    mode = 'list' if args.collect else 'ChunkSink'
+    print(f'{mode}: {written} records of {args.passes * len(documents)} documents, {size / 1e6:.1f} MB written in {seconds:.1f}s')
+    print('peak RSS MB after each pass: ' + ' '.join(f'{rss:.0f}' for rss in checkpoints))
+    print(f'peak RSS MB at the end: {peak_rss_mb():.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#%%
+"""
+Startup time: `python -X importtime` of the package entry points, each in a fresh interpreter.
+
+For every entry point the import is timed as it is (pandas, numpy and bs4 are imported lazily) and with the heavy
+dependencies imported up front, which is what every import cost while they were imported at module level. The last
+rows time a whole short-lived process: streaming text only chunks of a file, which never imports pandas.
+
+Usage (from the repository root):
+    python src/benchmark/import_time.py [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+HEAVY = ('pandas', 'numpy', 'bs4')
+ENTRY_POINTS = (
+    'src.main.TextParsing',
+    'src.main.TextParsing.HTMLParser',
+    'src.main.TextParsing.TextChunker',
+    'src.main.TextParsing.StreamChunker',
+    'src.main.TextParsing.BatchProcessor',
+)
+SAMPLE = os.path.join(ROOT, 'data', 'ASU_2022-02.html')
+SCRIPTS = (
+    ('stream text chunks', f'from src.main import TextParsing\nfor chunk in TextParsing.iter_chunks({SAMPLE!r}): pass'),
+    ('parse + chunk_text', f'from src.main import TextParsing\nTextParsing.chunk_text(open({SAMPLE!r}).read())'),
+)
+
+
+def imports_of(statement):
+    """
+    Runs `statement` with `-X importtime` in a fresh interpreter.
+
+    Returns:
+        tuple: The cumulative import time in seconds of each module imported at the top level, and the names of all
+               imported modules.
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    top_level, imported = {}, set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if not cumulative_us.strip().isdigit():
+            continue  # the header line
+        imported.add(name.strip())
+        # nested imports are indented by two spaces per level
+        if not name.startswith('  '):
+            top_level[name.strip()] = int(cumulative_us) / 1e6
+    return top_level, imported
+
+
+def import_time(statement, startup):
+    """
+    Returns:
+        tuple: The import time of `statement` in seconds, without the modules imported by the interpreter startup,
+               and the heavy modules it imported.
+    """
+    top_level, imported = imports_of(statement)
+    return sum(seconds for name, seconds in top_level.items() if name not in startup), imported & set(HEAVY)
+
+
+def run_time(script):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per measurement, the best is kept')
+    args = arg_parser.parse_args(argv)
+
+    startup = set(imports_of('pass')[0])
+    print(f'best of {args.repeat} fresh interpreters')
+    print(f'{"import":<40}{"eager ms":>10}{"lazy ms":>10}  heavy modules imported')
+    for module in ENTRY_POINTS:
+        # the heavy modules are imported first, their time is part of what the module cost when it imported them
+        eager = min(import_time(f'import {", ".join(HEAVY)}, {module}', startup)[0] for _ in range(args.repeat))
+        lazy, imported = min(import_time(f'import {module}', startup) for _ in range(args.repeat))
+        print(f'{module:<40}{eager * 1e3:>10.1f}{lazy * 1e3:>10.1f}  {", ".join(sorted(imported)) or "-"}')
+
+    print()
+    print(f'{"process":<40}{"wall ms":>10}')
+    for name, script in SCRIPTS:
+        print(f'{name:<40}{min(run_time(script) for _ in range(args.repeat)) * 1e3:>10.1f}')
+    print(f'{"python -c pass":<40}{min(run_time("pass") for _ in range(args.repeat)) * 1e3:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
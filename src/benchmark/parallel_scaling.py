@@ -0,0 +1,84 @@
+#%%
+"""
+Intra document parallelism: parsing and chunking one large document with the 'lxml' backend serially and with
+`workers` processes walking its parts, see `ParallelWalk`.
+
+The document concatenates the bodies of every file of data/ (under the head of the first one), repeated `--copies`
+times. Every parallel result is checked against the serial chunks, and the best speedup over workers=1 is reported.
+Only the walk runs on the workers, the parse and chunk columns split the serial and parallel parts of each run. A
+speedup needs at least as many free CPUs as workers. With --fork (Linux) the workers are forked and inherit the
+parsed tree, otherwise each of them parses the document again.
+
+Usage (from the repository root):
+    python src/benchmark/parallel_scaling.py [--copies 20] [--workers 1 2 4 8] [--fork]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.benchmark.synthetic import _BODY
+
+REPEAT = 3
+
+
+def concatenated_document(copies=20, pattern=os.path.join(ROOT, 'data', '*.html')):
+    """
+    Returns the bodies of the files matching `pattern` concatenated `copies` times, under the head of the first file.
+    """
+    heads, bodies = [], []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'r', encoding='utf-8') as html_file:
+            html_content = html_file.read()
+        match = _BODY.search(html_content)
+        heads.append(html_content[:match.start()] if match else '<html>')
+        bodies.append(match.group(1) if match else html_content)
+    return f'{heads[0]}<body>\n{"".join(bodies) * copies}</body></html>'
+
+
+def run(html_content, workers):
+    parser = HTMLParser(html_content, backend='lxml', workers=workers)
+    start = time.perf_counter()
+    document = parser.parse_compact()
+    parsed = time.perf_counter()
+    chunks = TextChunker(document).chunk_text()
+    return parsed - start, time.perf_counter() - parsed, chunks
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--copies', type=int, default=20, help='repetitions of the concatenated data/ bodies')
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    arg_parser.add_argument('--fork', action='store_true', help='fork the workers, see HTMLParser.PARALLEL_FORK')
+    args = arg_parser.parse_args(argv)
+    HTMLParser.PARALLEL_FORK = args.fork
+
+    html_content = concatenated_document(args.copies)
+    print(f'{len(html_content) / 1e6:.1f} MB document, {os.cpu_count()} CPUs, best of {REPEAT}')
+    print(f'{"workers":>8}{"parse s":>10}{"chunk s":>10}{"total s":>10}{"speedup":>10}{"chunks":>8}  identical')
+
+    serial_total, serial_chunks = None, None
+    best = (1.0, 1)
+    for workers in sorted(set(args.workers) | {1}):
+        timings = [run(html_content, workers) for _ in range(REPEAT)]
+        parse_seconds, chunk_seconds, chunks = min(timings, key=lambda timing: timing[0] + timing[1])
+        total = parse_seconds + chunk_seconds
+        if serial_total is None:
+            serial_total, serial_chunks = total, chunks
+        print(f'{workers:>8}{parse_seconds:>10.2f}{chunk_seconds:>10.2f}{total:>10.2f}{serial_total / total:>9.2f}x'
+              f'{len(chunks):>8}  {chunks == serial_chunks}')
+        best = max(best, (serial_total / total, workers))
+
+    print(f'best speedup over workers=1: {best[0]:.2f}x with {best[1]} workers')
+    if (os.cpu_count() or 1) < 2:
+        print('only one CPU, the workers share it and cannot run faster than the serial walk')
+
+
+if __name__ == '__main__':
+    main()
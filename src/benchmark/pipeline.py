@@ -0,0 +1,201 @@
+#%%
+"""
+Benchmark of the parse -> score -> chunk -> refine pipeline.
+
+Every case (a file of data/ or a synthetic document, see synthetic.py) runs in a fresh process, so the peak RSS
+reported for a case is its own. Each stage is timed REPEAT times and the best time is kept:
+
+    parse[<backend>]   HTMLParser(html, backend=...).parse()
+    score              TextChunker(df).scores, the vectorized scoring of every row
+    chunk              chunk_text(refine=False) on a chunker whose scores are known
+    refine             chunk_text() with the default refine bounds, scores known
+    get_text           HTMLParser.get_text() on a parsed document
+    end_to_end[<b>]    parse with the first backend, then score, chunk and refine with a new TextChunker
+
+The results can be saved as a baseline and later runs compared against it, the comparison fails (exit code 1)
+when a stage got slower than the tolerance.
+
+Usage (from the repository root):
+    python src/benchmark/pipeline.py --save before
+    python src/benchmark/pipeline.py --compare before --tolerance 0.2
+    python src/benchmark/pipeline.py --no-files --scales 10 100 --depths 0 200 --backends lxml stream
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import synthetic_document, synthetic_name
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+# differences below this many seconds are noise, whatever the ratio
+NOISE_FLOOR = 0.002
+
+
+def best_of(func, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(case, backends, repeat):
+    """
+    Runs all stages of one case, called in a fresh process.
+    """
+    from src.main.TextParsing.HTMLParser import HTMLParser
+    from src.main.TextParsing.TextChunker import TextChunker
+
+    if case['kind'] == 'file':
+        with open(case['path'], 'r', encoding='utf-8') as html_file:
+            html_content = html_file.read()
+    else:
+        html_content = synthetic_document(case['scale'], case['depth'])
+
+    stages = {}
+    for backend in backends:
+        stages[f'parse[{backend}]'] = best_of(lambda: HTMLParser(html_content, backend=backend).parse(), repeat)
+
+    parser = HTMLParser(html_content, backend=backends[0])
+    df = parser.parse()
+    stages['score'] = best_of(lambda: TextChunker(df).scores, repeat)
+
+    chunker = TextChunker(df)
+    chunker.scores
+
+    def reset():
+        # keep the scores, drop the cached lengths and text
+        scores = chunker.scores
+        chunker.df = df
+        chunker._scores = scores
+
+    stages['chunk'] = best_of(lambda: chunker.chunk_text(refine=False), repeat, reset)
+    stages['refine'] = best_of(lambda: chunker.chunk_text(), repeat, reset)
+
+    def reset_text():
+        parser.text_buffer = None
+    stages['get_text'] = best_of(parser.get_text, repeat, reset_text)
+
+    stages[f'end_to_end[{backends[0]}]'] = best_of(
+        lambda: TextChunker(HTMLParser(html_content, backend=backends[0]).parse()).chunk_text(), repeat
+    )
+    return {
+        'rows': len(df), 'bytes': len(html_content.encode('utf-8')), 'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages': stages
+    }
+
+
+def build_cases(files, scales, depths):
+    cases = {}
+    for path in files:
+        cases[os.path.splitext(os.path.basename(path))[0]] = {'kind': 'file', 'path': path}
+    for scale in scales:
+        for depth in depths:
+            cases[synthetic_name(scale, depth)] = {'kind': 'synthetic', 'scale': scale, 'depth': depth}
+    return cases
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    import numpy
+    import pandas
+    return {'commit': commit, 'python': platform.python_version(), 'pandas': pandas.__version__, 'numpy': numpy.__version__,
+            'machine': platform.machine(), 'system': platform.system(), 'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def report(results):
+    for name, result in results['cases'].items():
+        print(f'\n{name}: {result["rows"]} rows, {result["bytes"] / 1024:.0f} KiB, peak RSS {result["peak_rss_mb"]:.0f} MiB')
+        for stage, seconds in result['stages'].items():
+            print(f'  {stage:<16}{seconds * 1e3:>12.2f} ms{result["rows"] / seconds:>14,.0f} rows/s')
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the stages slower than the baseline by more than `tolerance` and returns their number.
+    """
+    regressions = 0
+    print(f'\ncompared with {baseline["environment"].get("commit")} ({baseline["environment"].get("time")}):')
+    for name, result in results['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            continue
+        for stage, seconds in result['stages'].items():
+            before = base['stages'].get(stage)
+            if before is None:
+                continue
+            ratio = seconds / before
+            slower = ratio > 1 + tolerance and seconds - before > NOISE_FLOOR
+            regressions += slower
+            flag = 'REGRESSION' if slower else ''
+            print(f'  {name:<28}{stage:<16}{before * 1e3:>10.2f} -> {seconds * 1e3:>10.2f} ms {ratio:>6.2f}x {flag}')
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark the parse -> score -> chunk -> refine pipeline.')
+    arg_parser.add_argument('--files', nargs='*', default=None, help='HTML files, defaults to data/*.html')
+    arg_parser.add_argument('--no-files', action='store_true', help='only run the synthetic documents')
+    arg_parser.add_argument('--scales', nargs='*', type=int, default=[10, 100], help='synthetic sizes, in copies of the source body')
+    arg_parser.add_argument('--depths', nargs='*', type=int, default=[0, 100], help='nesting depths of the synthetic documents')
+    arg_parser.add_argument('--backends', nargs='*', default=['bs4', 'lxml', 'stream'])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--save', metavar='NAME', help='save the results as baselines/NAME.json')
+    arg_parser.add_argument('--compare', metavar='NAME', help='compare with baselines/NAME.json (or a path)')
+    arg_parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a stage is a regression')
+    args = arg_parser.parse_args(argv)
+
+    files = [] if args.no_files else (args.files if args.files is not None else sorted(glob.glob(os.path.join(ROOT, 'data', '*.html'))))
+    cases = build_cases(files, args.scales, args.depths)
+
+    results = {'environment': environment(), 'repeat': args.repeat, 'cases': {}}
+    for name, case in cases.items():
+        # a fresh process per case, for a clean heap and a peak RSS of the case alone
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results['cases'][name] = executor.submit(run_case, case, args.backends, args.repeat).result()
+        print(f'{name} done', file=sys.stderr)
+
+    report(results)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save}.json')
+        with open(path, 'w', encoding='utf-8') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f'\nsaved {path}')
+
+    if args.compare:
+        path = args.compare if os.path.exists(args.compare) else os.path.join(BASELINE_DIR, f'{args.compare}.json')
+        with open(path, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.tolerance)
+        print(f'{regressions} regressions')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
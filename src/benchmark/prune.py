@@ -0,0 +1,81 @@
+#%%
+"""
+Subtree pruning: parsing a page full of navigation, footer and hidden chrome with the default rules (only <script>
+is skipped) versus BOILERPLATE_PRUNE_RULES.
+
+Usage (from the repository root):
+    python src/benchmark/prune.py [path/to/file.html] [--chrome 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.PruneRules import BOILERPLATE_PRUNE_RULES
+
+REPEAT = 3
+
+CHROME = (
+    '<nav class="site-nav"><ul>' + ''.join(f'<li><a href="/{i}">Section {i}</a></li>' for i in range(20)) + '</ul></nav>'
+    '<div class="cookie-banner" style="font-weight: bold">We use cookies <button>Accept</button></div>'
+    '<div id="sidebar">' + ''.join(f'<p class="teaser">Related story {i}</p>' for i in range(10)) + '</div>'
+    '<div style="display: none">' + ''.join(f'<span>hidden {i}</span>' for i in range(10)) + '</div>'
+    '<script>window.dataLayer = window.dataLayer || [];</script>'
+    '<footer><p>Copyright</p><p>Terms</p><p>Privacy</p></footer>'
+)
+
+
+def web_page(html_content, chrome):
+    """
+    Returns the document with `chrome` copies of the page chrome spread between its body children.
+    """
+    head, _, rest = html_content.partition('<body')
+    body_open, _, body = rest.partition('>')
+    paragraphs = body.split('</p>')
+    step = max(1, len(paragraphs) // chrome)
+    pieces = []
+    for index, paragraph in enumerate(paragraphs):
+        pieces.append(paragraph)
+        if index % step == 0 and index // step < chrome:
+            pieces.append('</p>' + CHROME if index < len(paragraphs) - 1 else CHROME)
+        elif index < len(paragraphs) - 1:
+            pieces.append('</p>')
+    return f'{head}<body{body_open}>{"".join(pieces)}'
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('path', nargs='?', default=os.path.join(ROOT, 'data', 'ASU_2022-02.html'))
+    arg_parser.add_argument('--chrome', type=int, default=200, help='copies of the page chrome inserted into the document')
+    args = arg_parser.parse_args(argv)
+
+    with open(args.path, 'r') as html_file:
+        html_content = web_page(html_file.read(), args.chrome)
+
+    print(f'{os.path.basename(args.path)} with {args.chrome} copies of the page chrome, best of {REPEAT}')
+    print(f'{"backend":<10}{"default ms":>12}{"rows":>8}{"pruned ms":>12}{"rows":>8}{"speedup":>10}  pruned nodes / rows')
+    for backend in HTMLParser.BACKENDS:
+        before, df = best_of(lambda: HTMLParser(html_content, backend=backend).parse())
+        parser = HTMLParser(html_content, backend=backend, prune_rules=BOILERPLATE_PRUNE_RULES, stats=True)
+        parser.parse()
+        counters = parser.stats.counters
+        after, pruned = best_of(lambda: HTMLParser(html_content, backend=backend, prune_rules=BOILERPLATE_PRUNE_RULES).parse())
+        print(f'{backend:<10}{before * 1e3:>12.1f}{len(df):>8}{after * 1e3:>12.1f}{len(pruned):>8}{before / after:>9.2f}x'
+              f'  {counters["pruned_nodes"]} / {counters["pruned_rows"]}')
+
+
+if __name__ == '__main__':
+    main()
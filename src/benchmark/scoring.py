@@ -0,0 +1,59 @@
+#%%
+"""
+Row-wise apply versus vectorized TextChunker scoring.
+
+Each parsed frame is scored as is and replicated 50 times, to show how both paths scale with the row count.
+
+Usage (from the repository root):
+    python src/benchmark/scoring.py
+"""
+import glob
+import os
+import sys
+import time
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+
+REPEAT = 3
+SCALE = 50
+
+
+def row_wise(chunker, df):
+    return df.apply(
+        lambda row: chunker._calculate_score(
+            row['tags'], str(row['font_size']), row['text_decoration'], row['font_weight']
+        ), axis=1
+    )
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(name, df):
+    chunker = TextChunker(df)
+    t_apply = best_of(lambda: row_wise(chunker, df))
+    t_vectorized = best_of(lambda: chunker._calculate_scores(df))
+    print(f'{name:<24} {len(df):>8} {t_apply * 1e3:>10.1f} {t_vectorized * 1e3:>12.1f} {t_apply / t_vectorized:>8.1f}x')
+
+
+if __name__ == '__main__':
+    print(f'{"file":<24} {"rows":>8} {"apply ms":>10} {"vectorized ms":>12} {"speedup":>9}')
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.html'))):
+        with open(path, 'r') as html_file:
+            df = HTMLParser(html_file.read()).parse()
+        name = os.path.basename(path)
+        run(name, df)
+        run(f'{name} x{SCALE}', pd.concat([df] * SCALE, ignore_index=True))
+
+# %%
@@ -0,0 +1,127 @@
+#%%
+"""
+Load test of the ParsingService: concurrent clients sending the data/ files to the /chunk endpoint.
+
+The service is started in this process unless `--address` points to a running one. The client side latency
+percentiles and throughput are printed with the server side stats. `--cold` also times fresh interpreters that
+import the package, parse and chunk one file each, the cost of one job per document without the service.
+
+Usage (from the repository root):
+    python src/benchmark/service_load.py [--clients 8] [--requests 400] [--workers 2] [--cold 5]
+    python src/benchmark/service_load.py --address http://127.0.0.1:8765
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.ParsingService import ParsingService, ServiceClient
+from src.main.TextParsing.Instrumentation import LatencyRecorder
+
+COLD_JOB = (
+    'import sys; sys.path.insert(0, {root!r})\n'
+    'from src.main.TextParsing.HTMLParser import HTMLParser\n'
+    'from src.main.TextParsing.TextChunker import TextChunker\n'
+    'TextChunker(HTMLParser(open({path!r}).read()).parse()).chunk_text()\n'
+)
+
+
+def run_clients(address, documents, clients, requests, parser):
+    """
+    Sends `requests` /chunk requests from `clients` threads, cycling through the documents.
+
+    Returns:
+        tuple: The LatencyRecorder of the client side latencies, the wall seconds and the number of failures.
+    """
+    latency = LatencyRecorder(window=requests)
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    failures = []
+
+    def client():
+        with ServiceClient(address) as service:
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                name, html_content = documents[index % len(documents)]
+                start = time.perf_counter()
+                try:
+                    service.chunk(html_content, parser=parser)
+                except Exception as e:
+                    failures.append(f'{name}: {e}')
+                    continue
+                latency.record('chunk', time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latency, time.perf_counter() - start, failures
+
+
+def cold_jobs(paths, count):
+    timings = []
+    for index in range(count):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', COLD_JOB.format(root=ROOT, path=paths[index % len(paths)])], check=True)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--address', help='a running service (http://host:port or a Unix socket path)')
+    arg_parser.add_argument('--unix-socket', help='start the service on this Unix socket instead of a free port')
+    arg_parser.add_argument('--workers', type=int, default=1, help='worker processes of the started service')
+    arg_parser.add_argument('--max-batch', type=int, default=16)
+    arg_parser.add_argument('--clients', type=int, default=8)
+    arg_parser.add_argument('--requests', type=int, default=400)
+    arg_parser.add_argument('--backend', default='lxml')
+    arg_parser.add_argument('--cold', type=int, default=0, help='fresh interpreter jobs timed for comparison')
+    args = arg_parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+    documents = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as html_file:
+            documents.append((os.path.basename(path), html_file.read()))
+
+    service = None
+    address = args.address
+    if address is None:
+        service = ParsingService(port=0, unix_socket=args.unix_socket, workers=args.workers, max_batch=args.max_batch).start()
+        address = service.address
+    try:
+        latency, seconds, failures = run_clients(address, documents, args.clients, args.requests, {'backend': args.backend})
+        with ServiceClient(address) as client:
+            server_stats = client.stats()
+    finally:
+        if service is not None:
+            service.close()
+
+    summary = latency.to_dict().get('chunk', {})
+    print(f'{address}: {args.clients} clients, {args.requests} requests of {len(documents)} files in {seconds:.2f}s '
+          f'({summary.get("calls", 0) / seconds:.1f} req/s), {len(failures)} failed')
+    print('client ' + ', '.join(f'{name} {value:.1f}' for name, value in summary.items() if name.endswith('_ms')))
+    print('server ' + json.dumps(server_stats, indent=1))
+    for failure in failures[:5]:
+        print(f'FAILED {failure}')
+
+    if args.cold:
+        timings = cold_jobs(paths, args.cold)
+        print(f'fresh interpreter per job: median {timings[len(timings) // 2] * 1e3:.0f} ms, max {timings[-1] * 1e3:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
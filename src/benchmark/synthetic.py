@@ -0,0 +1,47 @@
+#%%
+"""
+Synthetic HTML documents for the benchmarks.
+
+A real document of data/ is scaled up by repeating its body, and every copy can be wrapped into nested styled
+elements to control the nesting depth. The stylesheets of the source document are kept, so the documents score
+and chunk like real filings.
+"""
+import os
+import re
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_SOURCE = os.path.join(ROOT, 'data', 'ASU_2022-05.html')
+
+_BODY = re.compile(r'<body[^>]*>(.*)</body>', re.IGNORECASE | re.DOTALL)
+
+
+def synthetic_document(scale=10, depth=0, source=DEFAULT_SOURCE):
+    """
+    Builds a synthetic HTML document.
+
+    Args:
+        scale (int, optional): The number of copies of the source body. Defaults to 10.
+        depth (int, optional): The number of nested elements wrapped around every copy. Defaults to 0.
+        source (str, optional): The path of the source document. Defaults to data/ASU_2022-05.html.
+
+    Returns:
+        str: The HTML document.
+    """
+    with open(source, 'r', encoding='utf-8') as html_file:
+        html_content = html_file.read()
+
+    match = _BODY.search(html_content)
+    head, body = (html_content[:match.start()], match.group(1)) if match else ('<html>', html_content)
+
+    # alternate between elements that only add nesting and elements that change the inherited styles
+    wrappers = ['<div class="level">', '<span style="color:#333">', '<div>', '<section style="font-size:10pt">']
+    closers = ['</div>', '</span>', '</div>', '</section>']
+    opening = ''.join(wrappers[level % len(wrappers)] for level in range(depth))
+    closing = ''.join(closers[level % len(closers)] for level in reversed(range(depth)))
+
+    copies = ''.join(f'{opening}{body}{closing}\n' for _ in range(scale))
+    return f'{head}<body>\n{copies}</body></html>'
+
+
+def synthetic_name(scale, depth, source=DEFAULT_SOURCE):
+    return f'{os.path.splitext(os.path.basename(source))[0]}x{scale}-depth{depth}'
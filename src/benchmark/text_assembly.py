@@ -0,0 +1,75 @@
+#%%
+"""
+Text assembly: the former iterrows / str.cat paths versus the TextBuffer of HTMLParser.get_text and chunk_text.
+
+Usage (from the repository root):
+    python src/benchmark/text_assembly.py [path/to/file.html]
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+
+REPEAT = 5
+
+
+def best_of(func, setup=None):
+    timings = []
+    for _ in range(REPEAT):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(path):
+    with open(path, 'r') as html_file:
+        parser = HTMLParser(html_file.read())
+    df = parser.parse()
+    output_file = os.path.join(tempfile.mkdtemp(), 'text.txt')
+
+    def iterrows_get_text():
+        return ' '.join([row['text_content'] for _, row in parser.parsed_data.iterrows()])
+
+    def iterrows_write():
+        with open(output_file, 'w', encoding='utf-8') as file:
+            file.write(iterrows_get_text())
+
+    def reset():
+        parser.text_buffer = None
+
+    chunker = TextChunker(df)
+    boundaries = chunker.chunk_boundaries()
+
+    def str_cat_chunks():
+        return [df['text_content'].iloc[start:stop].str.cat(sep=' ') for start, stop in boundaries]
+
+    def reset_chunker():
+        chunker._text_buffer = None
+
+    assert parser.get_text() == iterrows_get_text()
+    assert chunker.text_buffer.slices(boundaries) == str_cat_chunks()
+
+    rows = [
+        ('get_text', best_of(iterrows_get_text), best_of(parser.get_text, reset)),
+        ('get_text(output_file)', best_of(iterrows_write), best_of(lambda: parser.get_text(output_file), reset)),
+        ('chunk texts (with buffer)', best_of(str_cat_chunks), best_of(lambda: chunker.text_buffer.slices(boundaries), reset_chunker)),
+        ('chunk texts (buffer built)', best_of(str_cat_chunks), best_of(lambda: chunker.text_buffer.slices(boundaries))),
+    ]
+
+    print(f'{os.path.basename(path)}: {len(df)} rows, {len(boundaries)} chunks, best of {REPEAT}')
+    print(f'{"":<28}{"before ms":>12}{"after ms":>12}{"speedup":>10}')
+    for name, before, after in rows:
+        print(f'{name:<28}{before * 1e3:>12.3f}{after * 1e3:>12.3f}{before / after:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, 'data', 'ASU_2022-02.html'))
@@ -0,0 +1,94 @@
+#%%
+"""
+Per-node cost of the HTMLParser style walk, before and after the iterative rewrite.
+
+The BeautifulSoup tree is built once per file and only the walk is timed. `legacy_walk` is the former
+recursive `_extract_text_with_style`, kept here as the reference point.
+
+Usage (from the repository root):
+    python src/benchmark/tree_walk.py
+"""
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from bs4 import NavigableString, Tag
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.RowBuilder import RowBuilder
+
+REPEAT = 5
+
+
+def legacy_walk(parser, tag, inherited_styles={}, tags=[]):
+    if isinstance(tag, NavigableString):
+        text = tag.strip()
+        if text:
+            parser.data.append({
+                'text_content': text,
+                'font_family': inherited_styles.get('font-family', ''),
+                'font_size': inherited_styles.get('font-size', ''),
+                'font_weight': inherited_styles.get('font-weight', ''),
+                'text_decoration': inherited_styles.get('text-decoration', ''),
+                'font_color': inherited_styles.get('color', ''),
+                'tags': ', '.join(tags)
+            })
+    elif isinstance(tag, Tag):
+        if tag.name == 'script':
+            return
+        current_styles = inherited_styles.copy()
+        if tag.has_attr('class'):
+            class_styles = {}
+            for cls in tag['class']:
+                if cls in parser.styles:
+                    class_styles.update(parser.styles[cls])
+            current_styles.update(class_styles)
+        if tag.has_attr('style'):
+            current_styles.update(parser._extract_inline_styles(tag['style']))
+        current_tags = tags + [tag.name]
+        if tag.has_attr('data-list-text'):
+            parser.data.append({
+                'text_content': tag['data-list-text'],
+                'font_family': '', 'font_size': '', 'font_weight': '', 'text_decoration': '', 'font_color': '',
+                'tags': ', '.join(current_tags) + ', data-list-text'
+            })
+        for child in tag.contents:
+            legacy_walk(parser, child, current_styles, current_tags)
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(path):
+    with open(path, 'r') as html_file:
+        parser = HTMLParser(html_file.read())
+    nodes = sum(1 for _ in parser.body.descendants) + 1
+
+    def before():
+        parser.data = []
+        legacy_walk(parser, parser.body)
+
+    def after():
+        parser.data = RowBuilder()
+        parser._extract_text_with_style(parser.body)
+
+    t_before, t_after = best_of(before), best_of(after)
+    print(f'{os.path.basename(path):<20} {nodes:>8} {len(parser.data):>8} '
+          f'{t_before / nodes * 1e6:>12.2f} {t_after / nodes * 1e6:>12.2f} {t_before / t_after:>8.2f}x')
+
+
+if __name__ == '__main__':
+    print(f'{"file":<20} {"nodes":>8} {"rows":>8} {"before us/node":>12} {"after us/node":>12} {"speedup":>9}')
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', '*.html'))):
+        run(path)
+
+# %%
@@ -0,0 +1,309 @@
+"""
+Asynchronous, pooled fetching of HTML pages.
+
+Requires aiohttp (`pip install aiohttp`), which is imported when a fetcher session is opened.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from .LRUCache import LRUCache
+
+# responses worth another attempt, everything else is final
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def validate_url(url):
+    """
+    Checks that `url` is an absolute http(s) URL.
+
+    Args:
+        url (str): The URL to check.
+
+    Returns:
+        str: The URL itself.
+
+    Raises:
+        ValueError: If the URL has no http / https scheme or no host.
+    """
+    parts = urlsplit(url) if isinstance(url, str) else None
+    if parts is None or parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f'Invalid URL: {url!r}')
+    return url
+
+
+class FetchResult:
+    """
+    The outcome of fetching one URL.
+
+    Attributes:
+        url (str): The requested URL.
+        status (int): The HTTP status of the last response, None if no response was received.
+        text (str): The decoded page, None if the fetch failed.
+        not_modified (bool): Whether the server answered 304 and `text` is the previously fetched page.
+        attempts (int): The number of requests sent.
+        elapsed (float): Seconds spent on the URL, including the retry delays.
+        error (str): The reason of the failure, None on success.
+    """
+    __slots__ = ('url', 'status', 'text', 'not_modified', 'attempts', 'elapsed', 'error')
+
+    def __init__(self, url, status=None, text=None, not_modified=False, attempts=0, elapsed=0.0, error=None):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.not_modified = not_modified
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = 'ok' if self.ok else f'failed: {self.error}'
+        return f'FetchResult(url={self.url!r}, status={self.status}, {status}, attempts={self.attempts})'
+
+
+class AsyncHTMLFetcher:
+    """
+    Fetches HTML pages concurrently over one pooled HTTP session.
+
+    Connections are kept alive and reused, at most `concurrency` requests are in flight and at most `per_host`
+    of them go to the same host. A request waits for its slot before it starts, so the timeout of a request only
+    counts the request itself, never the time spent behind the others. Failed requests (connection errors, timeouts and the statuses of `RETRY_STATUSES`)
+    are retried with exponential backoff and jitter. The ETag / Last-Modified validators of every page are remembered,
+    so fetching a page again sends a conditional GET and a 304 reuses the remembered page.
+
+    Use it as an async context manager:
+
+        async with AsyncHTMLFetcher(concurrency=32, per_host=4) as fetcher:
+            async for result in fetcher.iter_fetch(urls):
+                ...
+
+    Args:
+        concurrency (int, optional): The maximum number of open connections. Defaults to 16.
+        per_host (int, optional): The maximum number of open connections to one host. Defaults to 4.
+        timeout (float, optional): Seconds allowed for one request, from connecting to reading the body. Defaults to 30.
+        retries (int, optional): The number of retries after the first attempt. Defaults to 3.
+        backoff (float, optional): The delay before the first retry in seconds, doubled on every retry. Defaults to 0.5.
+        headers (dict, optional): Extra headers sent with every request.
+        max_validators (int, optional): The number of pages whose validators and text are remembered for conditional
+                                        requests, 0 disables conditional requests. Defaults to 1024.
+    """
+    def __init__(self, concurrency=16, per_host=4, timeout=30, retries=3, backoff=0.5, headers=None, max_validators=1024):
+        if concurrency <= 0 or per_host <= 0:
+            raise ValueError(f'Invalid concurrency input: {concurrency}, {per_host}, the limits must be positive')
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = dict(headers or {})
+        self.validators = LRUCache(max_validators) if max_validators else None
+        self.session = None
+        # the request slots, taken before a request starts: all hosts, then per host
+        self._slots = None
+        self._host_slots = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        """
+        Opens the pooled session, called by `async with`.
+        """
+        import aiohttp
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+            self.session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._host_slots = {}
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _host_slot(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = self._host_slots[key] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    def _retry_delay(self, attempt):
+        # full jitter keeps retries of many failed requests from arriving together
+        return self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+
+    async def fetch(self, url):
+        """
+        Fetches one page.
+
+        Args:
+            url (str): An absolute http(s) URL.
+
+        Returns:
+            FetchResult: The page, or the reason it could not be fetched. Errors are not raised.
+        """
+        import aiohttp
+        start = time.perf_counter()
+        result = FetchResult(url)
+        try:
+            validate_url(url)
+        except ValueError as error:
+            result.error = str(error)
+            return result
+        if self.session is None:
+            raise RuntimeError('The fetcher is not open, use it with `async with`')
+
+        remembered = self.validators.get(url) if self.validators is not None else None
+        headers = {}
+        if remembered is not None:
+            etag, last_modified, _ = remembered
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        host_slot = self._host_slot(url)
+        while True:
+            result.attempts += 1
+            try:
+                # the host slot first, a request waiting for its host does not hold one of the shared slots;
+                # the timeout of the session starts with the request, once both slots are taken
+                async with host_slot, self._slots, self.session.get(url, headers=headers) as response:
+                    result.status = response.status
+                    if response.status == 304 and remembered is not None:
+                        result.text = remembered[2]
+                        result.not_modified = True
+                        result.error = None
+                    elif response.status == 200:
+                        result.text = await response.text()
+                        result.error = None
+                        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+                        if self.validators is not None and (etag or last_modified):
+                            self.validators.put(url, (etag, last_modified, result.text))
+                    else:
+                        result.error = f'HTTP {response.status}'
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                result.status = None
+                result.error = f'{type(error).__name__}: {error}' if str(error) else type(error).__name__
+
+            retryable = result.error is not None and (result.status is None or result.status in RETRY_STATUSES)
+            if not retryable or result.attempts > self.retries:
+                break
+            await asyncio.sleep(self._retry_delay(result.attempts))
+
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def iter_fetch(self, urls):
+        """
+        Fetches many pages concurrently and yields them as they arrive.
+
+        The URLs are read lazily, at most `concurrency` of them are being fetched at a time.
+
+        Args:
+            urls (iterable): The URLs to fetch.
+
+        Yields:
+            FetchResult: One result per URL, in completion order.
+        """
+        async for result in _iter_bounded(self.fetch, urls, self.concurrency):
+            yield result
+
+    async def fetch_all(self, urls):
+        """
+        Returns:
+            list: The FetchResult of every URL, in input order.
+        """
+        urls = list(urls)
+        position = {}
+        for index, url in enumerate(urls):
+            position.setdefault(url, []).append(index)
+        results = [None] * len(urls)
+        async for result in self.iter_fetch(urls):
+            results[position[result.url].pop()] = result
+        return results
+
+
+async def _iter_bounded(function, items, limit):
+    """
+    Runs the coroutine `function` on every item with at most `limit` running at a time and yields the results in
+    completion order. The items are read one at a time, as running calls complete.
+    """
+    items = iter(items)
+    running = set()
+    try:
+        while True:
+            for item in items:
+                running.add(asyncio.ensure_future(function(item)))
+                if len(running) >= limit:
+                    break
+            if not running:
+                return
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def _parse_page(html_content, parser_kwargs):
+    from .HTMLParser import HTMLParser
+    return HTMLParser(html_content, **parser_kwargs).parse()
+
+
+async def iter_parsed(urls, fetcher=None, workers=None, **parser_kwargs):
+    """
+    Fetches pages and parses each one as soon as it arrives, while the remaining pages are still downloading.
+
+    Args:
+        urls (iterable): The URLs to fetch.
+        fetcher (AsyncHTMLFetcher, optional): An open fetcher, a default one is opened and closed otherwise.
+        workers (int, optional): The number of parser processes, None for one per CPU. 0 parses in a thread of the
+                                 current process.
+        parser_kwargs: Keyword arguments of HTMLParser, e.g. backend='lxml'.
+
+    Yields:
+        tuple: (FetchResult, pandas.DataFrame) in completion order, the DataFrame is None if the fetch failed.
+               A page that fails to parse has the parse error in `FetchResult.error`.
+    """
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = AsyncHTMLFetcher()
+        await fetcher.open()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+    loop = asyncio.get_running_loop()
+
+    async def fetch_and_parse(url):
+        result = await fetcher.fetch(url)
+        if not result.ok:
+            return result, None
+        try:
+            df = await loop.run_in_executor(executor, _parse_page, result.text, parser_kwargs)
+        except Exception as error:
+            result.error = f'{type(error).__name__}: {error}'
+            return result, None
+        return result, df
+
+    try:
+        # the fetches waiting for their parse leave room for as many fetches in flight
+        async for item in _iter_bounded(fetch_and_parse, urls, 2 * fetcher.concurrency):
+            yield item
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if own_fetcher:
+            await fetcher.close()
@@ -0,0 +1,273 @@
+"""
+Batch processing of a corpus of HTML files on a process pool.
+
+Usage (from the repository root):
+    python -m src.main.TextParsing.BatchProcessor data/*.html --workers 4 --cutoff 7 --output chunks.jsonl
+    python -m src.main.TextParsing.BatchProcessor data/*.html --records chunks.jsonl.gz
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .HTMLParser import HTMLParser
+from .TextChunker import TextChunker
+from .DocumentCache import DocumentCache
+from .ChunkSink import ChunkSink
+
+class DocumentResult:
+    """
+    The outcome of processing one document.
+
+    Attributes:
+        index (int): The position of the document in the input list.
+        path (str): The path of the document.
+        chunks (list): The chunks returned by `TextChunker.chunk_text`, None if the document failed.
+        rows (int): The number of parsed text rows.
+        timings (dict): Seconds spent in the 'read', 'parse' and 'chunk' stages and in 'total'.
+        error (str): The formatted traceback if the document failed, otherwise None.
+    """
+    __slots__ = ('index', 'path', 'chunks', 'rows', 'timings', 'error')
+
+    def __init__(self, index, path, chunks=None, rows=0, timings=None, error=None):
+        self.index = index
+        self.path = path
+        self.chunks = chunks
+        self.rows = rows
+        self.timings = timings if timings is not None else {}
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = 'ok' if self.ok else 'failed'
+        return f'DocumentResult(index={self.index}, path={self.path!r}, {status}, chunks={len(self.chunks or [])})'
+
+    def summary(self):
+        """
+        Returns:
+            dict: The JSON serialisable outcome without the chunks.
+        """
+        return {'index': self.index, 'path': self.path, 'rows': self.rows,
+                'chunks': len(self.chunks) if self.chunks is not None else None,
+                'timings': self.timings, 'error': self.error}
+
+
+# one DocumentCache per directory and worker process
+_caches = {}
+
+
+def process_document(index, path, parser_kwargs=None, chunk_kwargs=None, cache_dir=None):
+    """
+    Parses and chunks one HTML file. Failures are captured in the result instead of being raised.
+
+    Args:
+        index (int): The position of the document in the corpus.
+        path (str): The path of the HTML file.
+        parser_kwargs (dict, optional): Keyword arguments of HTMLParser, e.g. {'backend': 'lxml'}.
+        chunk_kwargs (dict, optional): Keyword arguments of `TextChunker.chunk_text`.
+        cache_dir (str, optional): The directory of a DocumentCache, unchanged documents are then not parsed again.
+
+    Returns:
+        DocumentResult: The chunks and per stage timings of the document.
+    """
+    result = DocumentResult(index, path)
+    start = time.perf_counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as html_file:
+            html_content = html_file.read()
+        read_done = time.perf_counter()
+        result.timings['read'] = read_done - start
+
+        if cache_dir is not None:
+            cache = _caches.get(cache_dir)
+            if cache is None:
+                cache = _caches[cache_dir] = DocumentCache(cache_dir)
+            df = cache.parse(html_content, **(parser_kwargs or {}))
+        else:
+            df = HTMLParser(html_content, **(parser_kwargs or {})).parse()
+        parse_done = time.perf_counter()
+        result.timings['parse'] = parse_done - read_done
+        result.rows = len(df)
+
+        result.chunks = TextChunker(df).chunk_text(**(chunk_kwargs or {}))
+        result.timings['chunk'] = time.perf_counter() - parse_done
+    except Exception:
+        result.error = traceback.format_exc()
+    result.timings['total'] = time.perf_counter() - start
+    return result
+
+
+def _largest_first(paths):
+    def size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            # missing files fail quickly in the worker, schedule them last
+            return -1
+    return sorted(range(len(paths)), key=lambda index: size(paths[index]), reverse=True)
+
+
+def _iter_pool(paths, schedule, workers, task_args):
+    """
+    Yields the results of the scheduled documents in completion order, restarting the pool when a worker dies.
+
+    At most two documents per worker are in flight, so when the pool breaks (a worker killed by a segfault or by the
+    out of memory killer) only the documents in flight are suspect. Each of them runs again alone in a fresh pool:
+    the one that breaks it again gets a failed result, the others complete normally.
+    """
+    queue = collections.deque(schedule)
+    in_flight = 2 * (workers or os.cpu_count() or 1)
+    while queue:
+        broken = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            while running or (queue and not broken):
+                while queue and not broken and len(running) < in_flight:
+                    index = queue.popleft()
+                    running[executor.submit(process_document, index, paths[index], *task_args)] = index
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        broken.append(index)
+
+        for index in broken:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                try:
+                    yield executor.submit(process_document, index, paths[index], *task_args).result()
+                except BrokenProcessPool:
+                    yield DocumentResult(index, paths[index], error=f'BrokenProcessPool: the worker process parsing '
+                                                                    f'{paths[index]} terminated abruptly')
+
+
+def iter_corpus(paths, workers=None, parser_kwargs=None, chunk_kwargs=None, ordered=False, cache_dir=None):
+    """
+    Processes a corpus of HTML files on a process pool and yields the results.
+
+    The largest files are scheduled first so that a long document does not start last and delay the whole batch.
+    A failing document yields a result with `error` set and does not stop the batch, this includes a document
+    whose worker process died, the pool is then restarted for the remaining documents.
+
+    Args:
+        paths (list): The paths of the HTML files.
+        workers (int, optional): The number of worker processes, None for one per CPU. 1 processes in the current process.
+        parser_kwargs (dict, optional): Keyword arguments of HTMLParser.
+        chunk_kwargs (dict, optional): Keyword arguments of `TextChunker.chunk_text`.
+        ordered (bool, optional): Whether to yield the results in input order instead of as they complete. Defaults to False.
+        cache_dir (str, optional): The directory of a DocumentCache shared by the workers.
+
+    Yields:
+        DocumentResult: One result per path.
+    """
+    paths = [os.fspath(path) for path in paths]
+    schedule = _largest_first(paths)
+
+    if workers == 1:
+        results = (process_document(index, paths[index], parser_kwargs, chunk_kwargs, cache_dir) for index in schedule)
+        if not ordered:
+            yield from results
+            return
+        done = {result.index: result for result in results}
+        for index in range(len(paths)):
+            yield done[index]
+        return
+
+    results = _iter_pool(paths, schedule, workers, (parser_kwargs, chunk_kwargs, cache_dir))
+    if not ordered:
+        yield from results
+        return
+
+    # hold back the results completed ahead of their turn
+    waiting, next_index = {}, 0
+    for result in results:
+        waiting[result.index] = result
+        while next_index in waiting:
+            yield waiting.pop(next_index)
+            next_index += 1
+
+
+def process_corpus(paths, workers=None, parser_kwargs=None, chunk_kwargs=None, cache_dir=None):
+    """
+    Processes a corpus of HTML files on a process pool.
+
+    Args:
+        paths (list): The paths of the HTML files.
+        workers (int, optional): The number of worker processes, None for one per CPU. 1 processes in the current process.
+        parser_kwargs (dict, optional): Keyword arguments of HTMLParser, e.g. {'backend': 'lxml'}.
+        chunk_kwargs (dict, optional): Keyword arguments of `TextChunker.chunk_text`, e.g. {'cutoff': 7}.
+        cache_dir (str, optional): The directory of a DocumentCache shared by the workers.
+
+    Returns:
+        list: One DocumentResult per path, in input order.
+    """
+    return list(iter_corpus(paths, workers=workers, parser_kwargs=parser_kwargs, chunk_kwargs=chunk_kwargs, ordered=True,
+                            cache_dir=cache_dir))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Parse and chunk a corpus of HTML files.')
+    arg_parser.add_argument('paths', nargs='+', help='the HTML files to process')
+    arg_parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to one per CPU')
+    arg_parser.add_argument('--backend', default='bs4', choices=HTMLParser.BACKENDS, help='the HTMLParser backend')
+    arg_parser.add_argument('--cutoff', type=float, default=7)
+    arg_parser.add_argument('--auto-adjust-cutoff', action='store_true')
+    arg_parser.add_argument('--no-refine', action='store_true')
+    arg_parser.add_argument('--sel-metric', default='words')
+    arg_parser.add_argument('--lower-bound', type=int, default=100)
+    arg_parser.add_argument('--upper-bound', type=int, default=650)
+    arg_parser.add_argument('--ordered', action='store_true', help='write the results in input order')
+    arg_parser.add_argument('--cache-dir', help='reuse the parsed documents cached in this directory')
+    arg_parser.add_argument('--output', help='write one JSON line per document with its chunks to this file')
+    arg_parser.add_argument('--records', help='write one record per chunk to this .jsonl[.gz], .parquet or .arrow file, see ChunkSink')
+    args = arg_parser.parse_args(argv)
+
+    chunk_kwargs = {
+        'cutoff': args.cutoff, 'auto_adjust_cutoff': args.auto_adjust_cutoff, 'refine': not args.no_refine,
+        'sel_metric': args.sel_metric, 'lower_bound': args.lower_bound, 'upper_bound': args.upper_bound
+    }
+    if args.records:
+        # the records need the scores and row ranges of the chunks
+        chunk_kwargs['keep_text_only'] = False
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    sink = ChunkSink(args.records) if args.records else None
+    failures = 0
+    start = time.perf_counter()
+    try:
+        for result in iter_corpus(args.paths, workers=args.workers, parser_kwargs={'backend': args.backend},
+                                  chunk_kwargs=chunk_kwargs, ordered=args.ordered, cache_dir=args.cache_dir):
+            summary = result.summary()
+            chunks = result.chunks
+            if sink is not None and result.ok:
+                records = list(ChunkSink.chunk_records(result.path, chunks))
+                for record in records:
+                    sink.write(record)
+                chunks = [record['text'] for record in records]
+            if output:
+                output.write(json.dumps({**summary, 'chunks': chunks}, ensure_ascii=False) + '\n')
+            if not result.ok:
+                failures += 1
+                print(f'FAILED {result.path}\n{result.error}', file=sys.stderr)
+            else:
+                print(f'{result.path}: {summary["rows"]} rows, {summary["chunks"]} chunks in {result.timings["total"]:.3f}s', file=sys.stderr)
+    finally:
+        if output:
+            output.close()
+        if sink is not None:
+            sink.close()
+
+    print(f'{len(args.paths)} documents, {failures} failed, {time.perf_counter() - start:.2f}s', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
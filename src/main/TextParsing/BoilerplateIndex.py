@@ -0,0 +1,137 @@
+import heapq
+import os
+import threading
+import uuid
+from operator import itemgetter
+from .LazyModule import LazyModule
+
+np = LazyModule('numpy')
+
+class BoilerplateIndex:
+    """
+    Corpus wide document frequency of text row fingerprints.
+
+    Every document adds each distinct fingerprint of its rows once, so a fingerprint's count is the number of documents
+    the row appeared in. Rows found in at least `min_documents` documents (running headers, disclaimers, navigation
+    labels) are flagged as boilerplate, see `Deduplicator`.
+
+    The index is bounded: when it holds more than `max_entries` fingerprints the least frequent ones are dropped, which
+    mostly removes rows seen once. It can be saved to and loaded from a .npz file, and indexes built by several
+    processes can be merged.
+
+    Args:
+        min_documents (int, optional): The number of documents from which a row is boilerplate. Defaults to 5.
+        max_entries (int, optional): The maximum number of fingerprints kept. Defaults to 1 << 18 (about 25 MB).
+    """
+    def __init__(self, min_documents=5, max_entries=1 << 18):
+        if min_documents < 1 or max_entries < 1:
+            raise ValueError(f'Invalid index input: {min_documents}, {max_entries}, both must be positive')
+        self.min_documents = min_documents
+        self.max_entries = max_entries
+        self.counts = {}  # fingerprint -> number of documents
+        self.documents = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # the lock is per process, an index sent to a worker process gets a new one
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.counts
+
+    def document_frequency(self, fingerprint):
+        return self.counts.get(fingerprint, 0)
+
+    def is_boilerplate(self, fingerprint):
+        return self.counts.get(fingerprint, 0) >= self.min_documents
+
+    def add_document(self, fingerprints):
+        """
+        Counts one document.
+
+        Args:
+            fingerprints (iterable): The distinct fingerprints of the document's rows.
+        """
+        with self._lock:
+            counts = self.counts
+            self.documents += 1
+            for fingerprint in fingerprints:
+                counts[fingerprint] = counts.get(fingerprint, 0) + 1
+            if len(counts) > self.max_entries:
+                self._shrink()
+
+    def _shrink(self):
+        # drop the least frequent fingerprints down to 3/4 of the bound, so that shrinking is amortized over many documents;
+        # ties at the cut keep the fingerprints counted first
+        target = self.max_entries * 3 // 4
+        kept = dict(heapq.nlargest(target, self.counts.items(), key=itemgetter(1)))
+        self.dropped += len(self.counts) - len(kept)
+        self.counts = kept
+
+    def merge(self, other):
+        """
+        Adds the counts of another index, e.g. one built by another worker process.
+        """
+        with self._lock:
+            self.documents += other.documents
+            counts = self.counts
+            for fingerprint, count in other.counts.items():
+                counts[fingerprint] = counts.get(fingerprint, 0) + count
+            if len(counts) > self.max_entries:
+                self._shrink()
+
+    def save(self, path):
+        """
+        Writes the index to a .npz file, under a temporary name renamed into place.
+        """
+        path = os.fspath(path)
+        with self._lock:
+            fingerprints = np.fromiter(self.counts.keys(), dtype=np.uint64, count=len(self.counts))
+            counts = np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+            meta = np.array([self.documents, self.min_documents, self.max_entries, self.dropped], dtype=np.int64)
+        temporary = f'{path}.{os.getpid()}-{uuid.uuid4().hex}.tmp'
+        try:
+            with open(temporary, 'wb') as index_file:
+                np.savez(index_file, fingerprints=fingerprints, counts=counts, meta=meta)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Reads an index written by `save`. Keyword arguments override the saved min_documents and max_entries.
+        """
+        with np.load(os.fspath(path)) as arrays:
+            documents, min_documents, max_entries, dropped = arrays['meta'].tolist()
+            index = cls(min_documents=kwargs.get('min_documents', min_documents), max_entries=kwargs.get('max_entries', max_entries))
+            index.counts = dict(zip(arrays['fingerprints'].tolist(), arrays['counts'].tolist()))
+        index.documents, index.dropped = documents, dropped
+        if len(index.counts) > index.max_entries:
+            index._shrink()
+        return index
+
+    def stats(self):
+        """
+        Returns:
+            dict: The number of documents, fingerprints, boilerplate fingerprints and fingerprints dropped by the bound.
+        """
+        with self._lock:
+            boilerplate = sum(1 for count in self.counts.values() if count >= self.min_documents)
+            return {'documents': self.documents, 'entries': len(self.counts), 'boilerplate': boilerplate,
+                    'dropped': self.dropped, 'max_entries': self.max_entries}
+
+    def __repr__(self):
+        return f'BoilerplateIndex(documents={self.documents}, entries={len(self.counts)}, min_documents={self.min_documents})'
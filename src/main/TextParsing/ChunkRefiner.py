@@ -1,28 +1,40 @@
-import pandas as pd
+import warnings
+
+from .LazyModule import LazyModule
+from .Tokenizer import get_tokenizer
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
 
 class Node:
-    def __init__(self, data: pd.DataFrame):
+    """
+    A chunk of the linked list the refiner used to merge. Deprecated: ChunkRefiner merges on row offsets and no longer
+    uses it, it is kept for code built on it and will be removed in a future version.
+    """
+    def __init__(self, data: 'pd.DataFrame'):
+        warnings.warn('ChunkRefiner.Node is deprecated, ChunkRefiner merges on row offsets, see refine_boundaries',
+                      DeprecationWarning, stacklevel=2)
         self.data = data
         self.next = None
-    
+
     def __fulltext__(self):
         """
         concatenate all text content in the chunk
         """
         return self.data['text_content'].str.cat(sep=' ')
-    
+
     def __charlen__(self):
         """
         length of the concatenated text content
         """
         return len(self.__fulltext__())
-    
+
     def __wordscnt__(self):
         """
         number of words in the concatenated text content
         """
         return len(self.__fulltext__().split(' '))
-    
+
     def mergechunks(self, nextNode) -> None:
         """
         Merge the data from the current node with the data from the next node.
@@ -34,78 +46,224 @@ class Node:
         None
         """
         self.data = pd.concat([self.data, nextNode.data], axis=0, ignore_index=True)
-    def mergechunks(self, nextNode):
-        
-        self.data = pd.concat([self.data, nextNode.data], axis = 0, ignore_index=True)
 
 class ChunkRefiner:
+    # 'tokens' counts the tokens of the rows with a pluggable tokenizer, see `Tokenizer.get_tokenizer`
+    METRICS = ('words', 'characters', 'tokens')
+
     def __init__(self, chunks: list):
         self.chunks = chunks
 
-    def refine(self, lower_bound: int, upper_bound: int, sel_metric='words'):
+    @classmethod
+    def _check_metric(cls, sel_metric):
+        if sel_metric not in cls.METRICS:
+            raise ValueError(f'Invalid metric input: {sel_metric}, acceptable values are [{", ".join(cls.METRICS)}]')
+
+    @staticmethod
+    def row_lengths(texts, sel_metric='words', tokenizer=None) -> 'np.ndarray':
         """
-        Refines the chunks based on the specified lower and upper bounds and selected metric.
+        Computes the length of every text row.
+
+        Args:
+            texts (pandas.Series): The text content of the rows.
+            sel_metric (str, optional): 'words' (pieces when splitting on a single space), 'characters' or 'tokens'.
+                                        Defaults to 'words'.
+            tokenizer (optional): The tokenizer of the 'tokens' metric, see `Tokenizer.get_tokenizer`. All rows are
+                                  counted in one batch.
+
+        Returns:
+            numpy.ndarray: The length of each row.
+        """
+        if sel_metric == 'words':
+            return texts.str.count(' ').to_numpy(dtype=np.int64) + 1
+        if sel_metric == 'tokens':
+            return np.asarray(get_tokenizer(tokenizer).count(texts), dtype=np.int64)
+        return texts.str.len().to_numpy(dtype=np.int64)
+
+    @staticmethod
+    def prefix_sums(row_lengths) -> 'np.ndarray':
+        """
+        Returns:
+            numpy.ndarray: The running total of the row lengths, starting with 0 (n_rows + 1 values).
+        """
+        return np.concatenate(([0], np.cumsum(row_lengths, dtype=np.int64)))
+
+    @classmethod
+    def chunk_lengths(cls, row_lengths, starts, sel_metric='words', prefix=None) -> 'np.ndarray':
+        """
+        Computes the length of the concatenated text (joined with a space) of every chunk from per row lengths.
 
         Args:
+            row_lengths (numpy.ndarray): The length of each row, see `row_lengths`.
+            starts (numpy.ndarray): The first row of each chunk, in increasing order starting at 0.
+            sel_metric (str, optional): 'words' or 'characters'. Defaults to 'words'.
+            prefix (numpy.ndarray, optional): The `prefix_sums` of the row lengths, if already known.
+
+        Returns:
+            numpy.ndarray: The length of each chunk.
+        """
+        if prefix is None:
+            prefix = cls.prefix_sums(row_lengths)
+        stops = np.append(starts[1:], len(prefix) - 1)
+        lengths = prefix[stops] - prefix[starts]
+        if sel_metric == 'characters':
+            # the joining spaces between the rows
+            lengths += stops - starts - 1
+        return lengths
+
+    @staticmethod
+    def merge_ranges(chunk_lengths, lower_bound: int, upper_bound: int, sel_metric='words') -> list:
+        """
+        Decides which consecutive chunks are merged.
+
+        A chunk shorter than the lower bound absorbs the following chunk as long as their combined length stays within
+        the upper bound. The running length of the merged chunk is tracked in O(1) per decision.
+
+        Args:
+            chunk_lengths (array-like): The length of each chunk, see `chunk_lengths`.
             lower_bound (int): The lower bound for the chunk length.
             upper_bound (int): The upper bound for the chunk length.
-            sel_metric (str, optional): The selected metric for refining the chunks. 
-                Acceptable values are 'words' or 'characters'. Defaults to 'words'.
+            sel_metric (str, optional): 'words' or 'characters'. Defaults to 'words'.
 
         Returns:
-            list: A list of refined chunks.
+            list: (first chunk, last chunk + 1) index ranges of the refined chunks.
+        """
+        # merging two character chunks adds the joining space
+        separator = 1 if sel_metric == 'characters' else 0
+        lengths = chunk_lengths.tolist() if isinstance(chunk_lengths, np.ndarray) else list(chunk_lengths)
 
-        Raises:
-            ValueError: If an invalid metric input is provided.
+        ranges = []
+        first, n_chunks = 0, len(lengths)
+        while first < n_chunks:
+            length = lengths[first]
+            stop = first + 1
+            while stop < n_chunks and length < lower_bound and length + lengths[stop] <= upper_bound:
+                length += lengths[stop] + separator
+                stop += 1
+            ranges.append((first, stop))
+            first = stop
+        return ranges
 
+    @staticmethod
+    def split_ranges(prefix, ranges, upper_bound: int, sel_metric='words') -> list:
         """
+        Splits the row ranges longer than the upper bound at row boundaries.
 
-        root: Node = Node(self.chunks[0])
-        cur: Node = root
+        Each piece takes as many rows as fit into the upper bound, found by a binary search on the prefix sums.
+        A single row longer than the upper bound cannot be split and becomes a piece of its own.
 
-        # construct linked list
-        for i in range(1, len(self.chunks)):
-            cur.next = Node(self.chunks[i])
-            cur = cur.next
+        Args:
+            prefix (numpy.ndarray): The `prefix_sums` of the row lengths.
+            ranges (list): (start, stop) row ranges.
+            upper_bound (int): The upper bound for the chunk length.
+            sel_metric (str, optional): 'words', 'characters' or 'tokens'. Defaults to 'words'.
 
-        # refine chunks length
-        cur = root
+        Returns:
+            list: (start, stop) row ranges no longer than the upper bound, except single oversized rows.
+        """
+        separator = 1 if sel_metric == 'characters' else 0
+        # with the joining spaces counted into the prefix, the length of rows [start, stop) is
+        # offsets[stop] - offsets[start] - separator
+        offsets = prefix + separator * np.arange(len(prefix), dtype=np.int64) if separator else prefix
 
-        if sel_metric == 'words':
+        pieces = []
+        for start, stop in ranges:
+            if offsets[stop] - offsets[start] - separator <= upper_bound:
+                pieces.append((start, stop))
+                continue
+            while start < stop:
+                end = int(np.searchsorted(offsets, offsets[start] + upper_bound + separator, side='right')) - 1
+                end = min(max(end, start + 1), stop)
+                pieces.append((start, end))
+                start = end
+        return pieces
 
-            while cur.next is not None:
+    @classmethod
+    def refine_boundaries(cls, texts, starts, lower_bound: int, upper_bound: int, sel_metric='words', prefix=None,
+                          tokenizer=None, split_oversized=False, return_counts=False) -> list:
+        """
+        Refines chunks given as row offsets into one frame, without touching the frame itself.
 
-                if cur.__wordscnt__() < lower_bound:
+        Args:
+            texts (pandas.Series): The text content of all rows, not needed when `prefix` is given.
+            starts (array-like): The first row of each chunk, in increasing order starting at 0.
+            lower_bound (int): The lower bound for the chunk length.
+            upper_bound (int): The upper bound for the chunk length.
+            sel_metric (str, optional): 'words', 'characters' or 'tokens'. Defaults to 'words'.
+            prefix (numpy.ndarray, optional): The `prefix_sums` of the row lengths, reused across calls on the same rows.
+            tokenizer (optional): The tokenizer of the 'tokens' metric, see `Tokenizer.get_tokenizer`.
+            split_oversized (bool, optional): Whether to split the chunks longer than the upper bound at row
+                                              boundaries, making the upper bound a hard limit. Defaults to False.
+            return_counts (bool, optional): Whether to also return the number of merges and of splits. Defaults to False.
 
-                    if cur.__wordscnt__() + cur.next.__wordscnt__() <= upper_bound:
-                        cur.mergechunks(cur.next)
-                        cur.next = cur.next.next  # next node is merged into cur, so we skip the next node
-                    else:
-                        cur = cur.next
-                else:
-                    cur = cur.next
+        Returns:
+            list: (start, stop) row ranges of the refined chunks. With `return_counts`, a tuple (ranges, merges, splits):
+                  merges is the number of chunks merged into a neighbour, splits the number of extra chunks made by
+                  splitting the oversized ones.
+        """
+        cls._check_metric(sel_metric)
+        starts = np.asarray(starts, dtype=np.int64)
+        if len(starts) == 0:
+            return ([], 0, 0) if return_counts else []
 
-        elif sel_metric == 'characters':
+        if prefix is None:
+            prefix = cls.prefix_sums(cls.row_lengths(texts, sel_metric, tokenizer))
+        lengths = cls.chunk_lengths(None, starts, sel_metric, prefix=prefix)
+        stops = np.append(starts[1:], len(prefix) - 1)
+        ranges = [(int(starts[first]), int(stops[stop - 1])) for first, stop in cls.merge_ranges(lengths, lower_bound, upper_bound, sel_metric)]
+        merged = len(ranges)
+        if split_oversized:
+            ranges = cls.split_ranges(prefix, ranges, upper_bound, sel_metric)
+        if return_counts:
+            return ranges, len(starts) - merged, len(ranges) - merged
+        return ranges
 
-            while cur.next is not None:
-                if cur.__charlen__() < lower_bound:
-                    if cur.__charlen__() + cur.next.__charlen__() <= upper_bound:
-                        cur.mergechunks(cur.next)
-                        cur.next = cur.next.next  # next node is merged into cur, so we skip the next node
-                    else:
-                        cur = cur.next
-                else:
-                    cur = cur.next
+    def refine(self, lower_bound: int, upper_bound: int, sel_metric='words', tokenizer=None, split_oversized=False):
+        """
+        Refines the chunks based on the specified lower and upper bounds and selected metric.
 
-        else:
-            raise ValueError(f'Invalid metric input: {sel_metric}, acceptable values are [words, characters]')
+        Args:
+            lower_bound (int): The lower bound for the chunk length.
+            upper_bound (int): The upper bound for the chunk length.
+            sel_metric (str, optional): The selected metric for refining the chunks.
+                Acceptable values are 'words', 'characters' or 'tokens'. Defaults to 'words'.
+            tokenizer (optional): The tokenizer of the 'tokens' metric, see `Tokenizer.get_tokenizer`.
+            split_oversized (bool, optional): Whether to split the chunks longer than the upper bound at row boundaries.
+                Defaults to False.
 
-        # output the refined chunks
-        cur = root
-        refined_chunks = []
-        while cur is not None:
-            refined_chunks.append(cur.data)
-            cur = cur.next
+        Returns:
+            list: A list of refined chunks.
 
+        Raises:
+            ValueError: If an invalid metric input is provided.
+
+        """
+        self._check_metric(sel_metric)
+        if not self.chunks:
+            return []
+
+        # the rows of all chunks are measured in one batch
+        row_lengths = self.row_lengths(pd.concat([chunk['text_content'] for chunk in self.chunks], ignore_index=True), sel_metric, tokenizer)
+        starts = np.cumsum([0] + [len(chunk) for chunk in self.chunks[:-1]])
+        prefix = self.prefix_sums(row_lengths)
+        lengths = self.chunk_lengths(None, starts, sel_metric, prefix=prefix)
+
+        # each refined chunk is concatenated once, from all the chunks merged into it
+        refined_chunks = []
+        for first, stop in self.merge_ranges(lengths, lower_bound, upper_bound, sel_metric):
+            if stop - first == 1:
+                chunk = self.chunks[first]
+            else:
+                chunk = pd.concat(self.chunks[first:stop], axis=0, ignore_index=not split_oversized)
+            if not split_oversized:
+                refined_chunks.append(chunk)
+                continue
+            offset = int(starts[first])
+            end = offset + len(chunk)
+            for start, stop_row in self.split_ranges(prefix, [(offset, end)], upper_bound, sel_metric):
+                piece = chunk if (start, stop_row) == (offset, end) else chunk.iloc[start - offset:stop_row - offset]
+                # like a merged chunk, a piece joining several chunks is numbered from 0
+                if np.any((starts > start) & (starts < stop_row)):
+                    piece = piece.reset_index(drop=True)
+                refined_chunks.append(piece)
         return refined_chunks
-    
@@ -0,0 +1,225 @@
+import gzip
+import json
+import os
+import uuid
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("The 'parquet' and 'arrow' formats require pyarrow, install it with `pip install pyarrow`") from e
+    return pyarrow
+
+
+class ChunkSink:
+    """
+    Writes chunk records to one file incrementally, through a bounded in-memory buffer.
+
+    Every chunk becomes one record with the fields of `FIELDS`: the document id, the index of the chunk in its
+    document, its text, its heading score (the highest row score of the chunk) and its source row range
+    [row_start, row_stop). Records are buffered until `batch_size` records or `max_buffer_bytes` of utf-8 text are held,
+    then written as JSONL lines (gzip compressed when asked), one Parquet row group or one Arrow record batch. Memory therefore
+    stays bounded by the buffer, whatever the number of documents written to the file.
+
+    The file is written under a temporary name and renamed into place by `close`, so a partial file is never seen
+    under the final name. The sink is a context manager, leaving the `with` block on an exception discards the file.
+
+    Args:
+        path (str): The output file.
+        format (str, optional): 'jsonl', 'parquet' or 'arrow', None to infer it from the suffix of the path (.jsonl,
+            .jsonl.gz, .parquet, .arrow). The Parquet and Arrow formats require pyarrow.
+        batch_size (int, optional): The number of records written at a time. Defaults to 1024.
+        max_buffer_bytes (int, optional): The utf-8 encoded text size from which the buffer is written before
+            batch_size records are held. Defaults to 8 MB.
+        compress (bool, optional): Whether to gzip the JSONL output, None to compress when the path ends with .gz.
+            Parquet batches are always compressed. Defaults to None.
+    """
+    FORMATS = ('jsonl', 'parquet', 'arrow')
+    FIELDS = ('document_id', 'chunk_index', 'text', 'heading_score', 'row_start', 'row_stop')
+
+    def __init__(self, path, format=None, batch_size=1024, max_buffer_bytes=8 << 20, compress=None):
+        self.path = os.fspath(path)
+        if format is None:
+            format = self._infer_format(self.path)
+        if format not in self.FORMATS:
+            raise ValueError(f'Invalid format input: {format}, acceptable values are {list(self.FORMATS)}')
+        if batch_size < 1 or max_buffer_bytes < 1:
+            raise ValueError(f'Invalid buffer input: {batch_size}, {max_buffer_bytes}, both must be positive')
+        self.format = format
+        self.batch_size = batch_size
+        self.max_buffer_bytes = max_buffer_bytes
+        self.compress = self.path.endswith('.gz') if compress is None else compress
+
+        self.records = 0
+        self.batches = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._closed = False
+
+        if format != 'jsonl':
+            # fail before anything is written
+            _import_pyarrow()
+
+        self._temporary = f'{self.path}.{os.getpid()}-{uuid.uuid4().hex}.tmp'
+        self._raw = open(self._temporary, 'wb')
+        # the JSONL lines go through one gzip stream, Parquet and Arrow compress their own batches
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='wb') if format == 'jsonl' and self.compress else self._raw
+        self._writer = None
+
+    @staticmethod
+    def _infer_format(path):
+        name = path[:-3] if path.endswith('.gz') else path
+        suffix = os.path.splitext(name)[1].lstrip('.').lower()
+        if suffix in ('parquet', 'arrow'):
+            return suffix
+        return 'jsonl'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    @staticmethod
+    def chunk_records(document_id, chunks):
+        """
+        Turns the chunks of one document into records.
+
+        Args:
+            document_id (str): The id of the document, e.g. its path.
+            chunks (list): The output of `TextChunker.chunk_text`: DataFrames (keep_text_only=False), ChunkView objects
+                (as_views=True) or texts. Texts carry no score nor row range, these fields are None.
+
+        Yields:
+            dict: One record per chunk.
+
+        Notes:
+            - The row ranges are row positions, whatever the index of the frame. The DataFrames of `chunk_text`
+              follow each other from the first row, so their positions are counted from their lengths.
+        """
+        position = 0
+        for chunk_index, chunk in enumerate(chunks):
+            heading_score = row_start = row_stop = None
+            if isinstance(chunk, str):
+                text = chunk
+            elif hasattr(chunk, 'chunker'):
+                text, row_start, row_stop = chunk.text, chunk.start, chunk.stop
+                max_score = chunk.max_score
+                heading_score = None if max_score is None else float(max_score)
+            else:
+                text = ' '.join(chunk['text_content'])
+                if len(chunk):
+                    heading_score = float(chunk['total_score'].max())
+                    row_start, row_stop = position, position + len(chunk)
+                position += len(chunk)
+            yield {'document_id': document_id, 'chunk_index': chunk_index, 'text': text,
+                   'heading_score': heading_score, 'row_start': row_start, 'row_stop': row_stop}
+
+    def write_chunks(self, document_id, chunks):
+        """
+        Writes the chunks of one document, see `chunk_records`.
+
+        Returns:
+            int: The number of records written.
+        """
+        written = 0
+        for record in self.chunk_records(document_id, chunks):
+            self.write(record)
+            written += 1
+        return written
+
+    def write(self, record):
+        """
+        Adds one record (a dict with the fields of `FIELDS`) to the buffer, writing the buffer when it is full.
+        """
+        if self._closed:
+            raise ValueError('The ChunkSink is closed')
+        self._buffer.append(record)
+        self._buffer_bytes += len(record['text'].encode('utf-8'))
+        if len(self._buffer) >= self.batch_size or self._buffer_bytes >= self.max_buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered records as one batch.
+        """
+        if not self._buffer:
+            return
+        if self.format == 'jsonl':
+            # line by line, the batch is never held a second time as one string
+            write = self._file.write
+            for record in self._buffer:
+                write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        else:
+            self._write_arrow_batch()
+        self.records += len(self._buffer)
+        self.batches += 1
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def _arrow_writer(self):
+        # the Parquet or Arrow writer, created with the first batch
+        if self._writer is None:
+            pyarrow = _import_pyarrow()
+            schema = pyarrow.schema([
+                ('document_id', pyarrow.string()), ('chunk_index', pyarrow.int64()), ('text', pyarrow.string()),
+                ('heading_score', pyarrow.float64()), ('row_start', pyarrow.int64()), ('row_stop', pyarrow.int64())
+            ])
+            self._schema = schema
+            if self.format == 'parquet':
+                import pyarrow.parquet
+                self._writer = pyarrow.parquet.ParquetWriter(self._file, schema, compression='zstd')
+            else:
+                import pyarrow.ipc
+                self._writer = pyarrow.ipc.new_file(self._file, schema)
+        return self._writer
+
+    def _write_arrow_batch(self):
+        pyarrow = _import_pyarrow()
+        writer = self._arrow_writer()
+        columns = {field: [record[field] for record in self._buffer] for field in self.FIELDS}
+        writer.write_batch(pyarrow.RecordBatch.from_pydict(columns, schema=self._schema))
+
+    def close(self):
+        """
+        Writes the remaining records and moves the file into place.
+        """
+        if self._closed:
+            return
+        try:
+            self.flush()
+            if self.format != 'jsonl':
+                # a file without records still gets its schema
+                self._arrow_writer().close()
+            self._file.close()
+            self._raw.close()
+            os.replace(self._temporary, self.path)
+        except BaseException:
+            self.discard()
+            raise
+        self._closed = True
+
+    def discard(self):
+        """
+        Drops the records and removes the partial file.
+        """
+        self._closed = True
+        self._buffer = []
+        self._file.close()
+        self._raw.close()
+        if os.path.exists(self._temporary):
+            os.remove(self._temporary)
+
+    def stats(self):
+        """
+        Returns:
+            dict: The number of records and batches written and the records still buffered.
+        """
+        return {'records': self.records, 'batches': self.batches, 'buffered': len(self._buffer)}
+
+    def __repr__(self):
+        return f'ChunkSink({self.path!r}, format={self.format!r}, records={self.records})'
@@ -0,0 +1,96 @@
+from .LazyModule import LazyModule
+
+np = LazyModule('numpy')
+
+class ChunkView:
+    """
+    A chunk of a document, held as a (start, stop) row range into the frame of its TextChunker.
+
+    Nothing is copied when the view is created: the text, the rows and the statistics are read from the shared
+    frame and the cached scores and row lengths of the chunker when they are asked for. `to_frame` materialises
+    a standalone DataFrame.
+
+    Args:
+        chunker (TextChunker): The chunker that produced the chunk.
+        start (int): The first row of the chunk.
+        stop (int): The row after the last row of the chunk.
+        cutoff (float): The cutoff the chunk was cut with.
+    """
+    __slots__ = ('chunker', 'start', 'stop', 'cutoff')
+
+    def __init__(self, chunker, start, stop, cutoff):
+        self.chunker = chunker
+        self.start = start
+        self.stop = stop
+        self.cutoff = cutoff
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __repr__(self):
+        return f'ChunkView(rows={self.start}:{self.stop}, words={self.word_count})'
+
+    @property
+    def rows(self):
+        """
+        pandas.DataFrame: The rows of the chunk, a slice of the shared frame.
+        """
+        return self.chunker.frame.iloc[self.start:self.stop]
+
+    @property
+    def text(self):
+        """
+        str: The texts of the rows joined with a space, as returned by `chunk_text(keep_text_only=True)`.
+        """
+        return self.chunker.text_buffer.slice(self.start, self.stop)
+
+    @property
+    def word_count(self):
+        """
+        int: The number of words of the text, counted as the pieces between single spaces.
+        """
+        prefix = self.chunker._prefix_sums('words')
+        return int(prefix[self.stop] - prefix[self.start])
+
+    @property
+    def char_count(self):
+        """
+        int: The number of characters of the text, including the joining spaces.
+        """
+        prefix = self.chunker._prefix_sums('characters')
+        return int(prefix[self.stop] - prefix[self.start]) + max(len(self) - 1, 0)
+
+    @property
+    def token_count(self):
+        """
+        int: The number of tokens of the text, counted by the tokenizer of the chunker.
+        """
+        prefix = self.chunker._prefix_sums('tokens')
+        return int(prefix[self.stop] - prefix[self.start])
+
+    @property
+    def scores(self):
+        """
+        numpy.ndarray: The total score of each row, a view of the chunker's scores.
+        """
+        return self.chunker.scores[self.start:self.stop]
+
+    @property
+    def max_score(self):
+        """
+        The highest row score of the chunk, usually the score of its heading. None for an empty chunk.
+        """
+        return self.scores.max() if len(self) else None
+
+    def to_frame(self):
+        """
+        Returns:
+            pandas.DataFrame: A copy of the rows with the columns total_score, is_cutoff and Chunk, the same frame as
+                              returned by `chunk_text(keep_text_only=False)`.
+        """
+        scores = self.chunker.scores
+        is_cutoff = np.where(scores[self.start:self.stop] >= self.cutoff, 1, 0)
+        # the chunk id counts the cutoff rows from the start of the document
+        first_id = np.count_nonzero(scores[:self.start] >= self.cutoff)
+        rows = self.rows.assign(total_score=self.scores, is_cutoff=is_cutoff, Chunk=first_id + is_cutoff.cumsum())
+        return self.chunker._chunk_frame(rows, is_cutoff)
@@ -0,0 +1,62 @@
+from .LazyModule import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+class CompactDocument:
+    """
+    A parsed document held as a style table and one integer style id per row.
+
+    Every distinct combination of (font_family, font_size, font_weight, text_decoration, font_color, tags) is stored
+    once in `styles`, and the rows only keep their text and the index of their style. A filing with tens of thousands
+    of rows usually has a few dozen styles, so the style columns cost a few bytes per row and TextChunker scores each
+    style once instead of each row.
+
+    Attributes:
+        text_content (pandas.Series): The text of each row.
+        style_ids (numpy.ndarray): The row of `styles` of each text row (int32).
+        styles (pandas.DataFrame): The style table, with the columns font_family, font_size, font_weight,
+                                   text_decoration, font_color (categorical) and tags.
+    """
+    STYLE_COLUMNS = ('font_family', 'font_size', 'font_weight', 'text_decoration', 'font_color', 'tags')
+
+    def __init__(self, text_content, style_ids, styles):
+        self.text_content = text_content
+        self.style_ids = style_ids
+        self.styles = styles
+
+    def __len__(self):
+        return len(self.style_ids)
+
+    def __getitem__(self, column):
+        """
+        Returns a column of the wide view, e.g. `document['text_content']`, without building the other columns.
+        """
+        if column == 'text_content':
+            return self.text_content
+        if column in self.STYLE_COLUMNS:
+            values = self.styles[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                return pd.Series(values.array.take(self.style_ids), name=column)
+            return pd.Series(values.to_numpy()[self.style_ids], name=column)
+        raise KeyError(column)
+
+    def __repr__(self):
+        return f'CompactDocument(rows={len(self)}, styles={len(self.styles)})'
+
+    def to_frame(self):
+        """
+        Returns:
+            pandas.DataFrame: The wide view, the same frame as `HTMLParser.parse()`.
+        """
+        columns = {'text_content': self.text_content}
+        for column in self.STYLE_COLUMNS:
+            columns[column] = self[column].to_numpy() if column == 'tags' else self[column].array
+        return pd.DataFrame(columns)
+
+    def memory_usage(self):
+        """
+        Returns:
+            int: The bytes used by the style ids and the style table, the texts excluded.
+        """
+        return int(self.style_ids.nbytes + self.styles.memory_usage(index=True, deep=True).sum())
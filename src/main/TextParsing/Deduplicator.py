@@ -0,0 +1,105 @@
+import hashlib
+import json
+from .BoilerplateIndex import BoilerplateIndex
+
+class Deduplicator:
+    """
+    Removes repeated text rows while a document is parsed, before any row is scored or chunked.
+
+    Each row is normalised (case folded, whitespace collapsed) and hashed to a 64 bit fingerprint. Within a document
+    only the first occurrence of a fingerprint is kept, which drops the running headers and footers repeated on every
+    page of a converted PDF. With a `BoilerplateIndex`, rows found in at least `index.min_documents` earlier documents
+    are dropped as well, and (with `learn`) the fingerprints of every parsed document are added to the index.
+
+    Short rows are never removed: table cells such as '$ -' or 'a.' repeat legitimately.
+
+    Args:
+        min_chars (int, optional): The minimum length of a normalised row for it to be deduplicated. Defaults to 6.
+        index (BoilerplateIndex, optional): A corpus wide index of boilerplate rows.
+        learn (bool, optional): Whether to add the fingerprints of every parsed document to the index. Defaults to True.
+    """
+    def __init__(self, min_chars=6, index=None, learn=True):
+        self.min_chars = min_chars
+        self.index = index
+        self.learn = learn
+
+    @classmethod
+    def resolve(cls, dedupe):
+        """
+        Turns the `dedupe` argument of HTMLParser into a Deduplicator or None.
+
+        Args:
+            dedupe (None, bool, Deduplicator or BoilerplateIndex): None or False disables deduplication, True
+                deduplicates within each document, a BoilerplateIndex also removes the boilerplate rows of the corpus.
+        """
+        if dedupe is None or dedupe is False:
+            return None
+        if dedupe is True:
+            return cls()
+        if isinstance(dedupe, cls):
+            return dedupe
+        if isinstance(dedupe, BoilerplateIndex):
+            return cls(index=dedupe)
+        raise ValueError(f'Invalid dedupe input: {dedupe!r}, acceptable values are None, True, a Deduplicator or a BoilerplateIndex')
+
+    @staticmethod
+    def normalize(text):
+        return ' '.join(text.casefold().split())
+
+    def fingerprint(self, text):
+        """
+        Returns:
+            int: The 64 bit fingerprint of the normalised text, None if the text is too short to be deduplicated.
+        """
+        normalized = self.normalize(text)
+        if len(normalized) < self.min_chars:
+            return None
+        return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+
+    def filter_rows(self, rows, seen, stats=None):
+        """
+        Passes the rows of one document through, without the duplicate and boilerplate rows.
+
+        Args:
+            rows (iterable): (text_content, ...) tuples in document order.
+            seen (set): The fingerprints met so far in the document, updated in place.
+            stats (Stats, optional): Counts the removed rows as 'duplicate_rows' and 'boilerplate_rows'.
+
+        Yields:
+            tuple: The rows that are kept.
+        """
+        index = self.index
+        fingerprint = self.fingerprint
+        duplicates = boilerplate = 0
+        try:
+            for row in rows:
+                key = fingerprint(row[0])
+                if key is not None:
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    if index is not None and index.is_boilerplate(key):
+                        boilerplate += 1
+                        continue
+                yield row
+            # only documents parsed to the end are counted
+            if index is not None and self.learn:
+                index.add_document(seen)
+        finally:
+            if stats is not None:
+                stats.count('duplicate_rows', duplicates)
+                stats.count('boilerplate_rows', boilerplate)
+
+    def cache_key(self):
+        """
+        Returns:
+            str: A description of the deduplication for the DocumentCache key, None if the result depends on the state
+                 of a boilerplate index and cannot be cached.
+        """
+        if self.index is not None:
+            return None
+        return json.dumps({'dedupe': self.min_chars})
+
+    def __repr__(self):
+        return f'Deduplicator(min_chars={self.min_chars}, index={self.index!r}, learn={self.learn})'
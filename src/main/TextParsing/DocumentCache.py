@@ -0,0 +1,381 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import uuid
+
+from .LazyModule import LazyModule
+from .HTMLParser import HTMLParser
+from .TextChunker import TextChunker
+from .Score import Score
+from .PruneRules import DEFAULT_PRUNE_RULES
+from .Deduplicator import Deduplicator
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+class DocumentCache:
+    """
+    Persistent, content addressed cache of parsed documents and chunk results.
+
+    A parsed document is keyed by the SHA-256 of its HTML, `HTMLParser.VERSION` and the tag types map, so an
+    unchanged document is never parsed twice and a parser upgrade invalidates the old entries by itself. The frame
+    is stored column by column as .npy files:
+
+        docs/<key>/text.npy      the utf-8 bytes of all texts, concatenated
+        docs/<key>/offsets.npy   the start of each text in the decoded string (n_rows + 1)
+        docs/<key>/codes.npy     the category code of each row in the style columns and tags (n_rows x 6)
+        docs/<key>/meta.json     the categories of each coded column
+
+    and memory mapped when read back. The chunks of `chunk_text` are stored in chunks/<key>.json as their row ranges
+    and resolved cutoff, keyed by the document key, the chunking parameters (with their defaults filled in) and a hash
+    of the score dict. Text, DataFrame and view chunks are all assembled from one entry and the cached frame.
+
+    Every entry is written under a temporary name and renamed into place, so several processes can share one cache
+    directory: readers see complete entries or none, and a writer losing a race discards its copy. The total size is
+    bounded by `max_bytes`, the least recently used entries (by modification time, refreshed on every hit) are removed
+    first.
+
+    Args:
+        directory (str): The cache directory, created if missing.
+        max_bytes (int, optional): The size limit of the cache in bytes. Defaults to 1 GiB.
+    """
+    CODED_COLUMNS = ('font_family', 'font_size', 'font_weight', 'text_decoration', 'font_color', 'tags')
+    # the parameters of `TextChunker.chunk_text` that only choose the form of the chunks, not their row ranges
+    OUTPUT_OPTIONS = ('keep_text_only', 'as_views')
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = os.path.abspath(os.path.expanduser(os.fspath(directory)))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        for sub_directory in ('docs', 'chunks', 'tmp'):
+            os.makedirs(os.path.join(self.directory, sub_directory), exist_ok=True)
+        # the size is scanned when the cache is opened and when the running estimate exceeds the limit, entries
+        # written by other processes are picked up by the next scan
+        self._estimated_bytes = self.size()
+
+    # keys
+
+    @staticmethod
+    def document_key(html_content, tag_types=None, prune_rules=None, dedupe=None):
+        """
+        Returns:
+            str: The hex key of a document, the SHA-256 of the parser version, the tag types map, the prune rules and
+                 the deduplication (when they are not the defaults) and the HTML. None if the parsed rows depend on
+                 the state of a boilerplate index and cannot be cached.
+        """
+        dedupe = Deduplicator.resolve(dedupe)
+        digest = hashlib.sha256()
+        digest.update(f'HTMLParser/{HTMLParser.VERSION}\n'.encode('utf-8'))
+        tag_types = HTMLParser.TAG_TYPES if tag_types is None else tag_types
+        digest.update(json.dumps(tag_types, sort_keys=True).encode('utf-8'))
+        digest.update(b'\n')
+        if prune_rules is not None and prune_rules != DEFAULT_PRUNE_RULES:
+            digest.update(prune_rules.cache_key().encode('utf-8'))
+            digest.update(b'\n')
+        if dedupe is not None:
+            dedupe_key = dedupe.cache_key()
+            if dedupe_key is None:
+                return None
+            digest.update(dedupe_key.encode('utf-8'))
+            digest.update(b'\n')
+        digest.update(html_content.encode('utf-8', 'surrogatepass') if isinstance(html_content, str) else html_content)
+        return digest.hexdigest()
+
+    @classmethod
+    def chunk_arguments(cls, **chunk_kwargs):
+        """
+        Returns:
+            dict: The keyword arguments of `TextChunker.chunk_text` with the defaults filled in, without the output
+                  options. Raises TypeError for an unknown argument, as `chunk_text` would.
+        """
+        bound = inspect.signature(TextChunker.chunk_text).bind(None, **chunk_kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        del arguments['self']
+        for name in cls.OUTPUT_OPTIONS:
+            del arguments[name]
+        arguments['split_oversized'] = TextChunker._resolve_split_oversized(arguments['split_oversized'], arguments['sel_metric'])
+        return arguments
+
+    @classmethod
+    def chunk_key(cls, document_key, score_dict=Score.ScoreDict, **chunk_kwargs):
+        """
+        Returns:
+            str: The hex key of a chunk result, the SHA-256 of the document key, the chunking parameters and the score
+                 dict. Parameters left to their defaults give the same key as the defaults given explicitly.
+        """
+        arguments = cls.chunk_arguments(**chunk_kwargs)
+        payload = json.dumps(['boundaries', document_key, sorted(arguments.items()), score_dict], sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # frame encoding
+
+    @classmethod
+    def _write_frame(cls, df, directory):
+        texts = df['text_content'].tolist()
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        np.save(os.path.join(directory, 'text.npy'),
+                np.frombuffer(''.join(texts).encode('utf-8', 'surrogatepass'), dtype=np.uint8))
+        np.save(os.path.join(directory, 'offsets.npy'), offsets)
+
+        codes = np.empty((len(df), len(cls.CODED_COLUMNS)), dtype=np.int32)
+        categories = {}
+        for position, column in enumerate(cls.CODED_COLUMNS):
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes[:, position] = values.cat.codes.to_numpy()
+                categories[column] = values.cat.categories.tolist()
+            else:
+                column_codes, uniques = pd.factorize(values, sort=False)
+                codes[:, position] = column_codes
+                categories[column] = list(uniques)
+        np.save(os.path.join(directory, 'codes.npy'), codes)
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+            json.dump({'rows': len(df), 'categories': categories}, meta_file, ensure_ascii=False)
+
+    @classmethod
+    def _read_frame(cls, directory):
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        text = np.load(os.path.join(directory, 'text.npy'), mmap_mode='r').tobytes().decode('utf-8', 'surrogatepass')
+        offsets = np.load(os.path.join(directory, 'offsets.npy')).tolist()
+        codes = np.load(os.path.join(directory, 'codes.npy'), mmap_mode='r')
+
+        columns = {'text_content': pd.Series([text[start:stop] for start, stop in zip(offsets, offsets[1:])], dtype=object)}
+        for position, column in enumerate(cls.CODED_COLUMNS):
+            categories = meta['categories'][column]
+            column_codes = np.array(codes[:, position])
+            if column == 'tags':
+                columns[column] = np.array(categories, dtype=object)[column_codes] if categories else np.empty(0, dtype=object)
+            else:
+                columns[column] = pd.Categorical.from_codes(column_codes, categories=categories)
+        return pd.DataFrame(columns)
+
+    # storage
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, key if kind == 'docs' else key + '.json')
+
+    def _temporary_path(self):
+        return os.path.join(self.directory, 'tmp', f'{os.getpid()}-{uuid.uuid4().hex}')
+
+    @staticmethod
+    def _remove(path):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _publish(self, temporary, path):
+        size = self._entry_size(temporary)
+        try:
+            os.rename(temporary, path)
+        except OSError:
+            # another process stored the same entry first
+            self._remove(temporary)
+            return
+        self._estimated_bytes += size
+        if self._estimated_bytes > self.max_bytes:
+            self.evict()
+
+    def load_frame(self, key):
+        """
+        Returns:
+            pandas.DataFrame: The cached parsed frame of a document key, None on a miss.
+        """
+        path = self._path('docs', key)
+        try:
+            df = self._read_frame(path)
+        except (OSError, ValueError):
+            # missing, or removed by another process while reading
+            self.misses += 1
+            return None
+        self._touch(path)
+        self.hits += 1
+        return df
+
+    def store_frame(self, key, df):
+        path = self._path('docs', key)
+        if os.path.isdir(path):
+            return
+        temporary = self._temporary_path()
+        os.makedirs(temporary)
+        try:
+            self._write_frame(df, temporary)
+        except BaseException:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+        self._publish(temporary, path)
+
+    def load_chunks(self, key):
+        """
+        Returns:
+            tuple: The cached (start, stop) row ranges of the chunks of a chunk key and their resolved cutoff,
+                   None on a miss.
+        """
+        path = self._path('chunks', key)
+        try:
+            with open(path, 'r', encoding='utf-8') as chunk_file:
+                entry = json.load(chunk_file)
+            boundaries = [(start, stop) for start, stop in entry['boundaries']]
+            cutoff = entry['cutoff']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self._touch(path)
+        self.hits += 1
+        return boundaries, cutoff
+
+    def store_chunks(self, key, boundaries, cutoff):
+        temporary = self._temporary_path()
+        with open(temporary, 'w', encoding='utf-8') as chunk_file:
+            json.dump({'boundaries': boundaries, 'cutoff': cutoff}, chunk_file)
+        self._publish(temporary, self._path('chunks', key))
+
+    # public api
+
+    def parse(self, html_content, tag_types=None, **parser_kwargs):
+        """
+        Returns the parsed DataFrame of a document, parsing it only if it is not cached yet.
+
+        Args:
+            html_content (str): The HTML document.
+            tag_types (dict, optional): The tag types map of the parser, `HTMLParser.TAG_TYPES` if not given.
+            parser_kwargs: Keyword arguments of HTMLParser, e.g. backend='lxml'. Only `prune_rules` and `dedupe`
+                           change the parsed rows and are part of the key. A document deduplicated against a
+                           boilerplate index is parsed every time.
+
+        Returns:
+            pandas.DataFrame: The same frame as `HTMLParser(html_content).parse()`.
+        """
+        key = self.document_key(html_content, tag_types, parser_kwargs.get('prune_rules'), parser_kwargs.get('dedupe'))
+        df = self.load_frame(key) if key is not None else None
+        if df is None:
+            parser = HTMLParser(html_content, **parser_kwargs)
+            if tag_types is not None:
+                parser.tag_types = dict(tag_types)
+            df = parser.parse()
+            if key is not None:
+                self.store_frame(key, df)
+        return df
+
+    def chunk_text(self, html_content, score_dict=Score.ScoreDict, tag_types=None, parser_kwargs=None, **chunk_kwargs):
+        """
+        Returns the chunks of a document, reusing the cached chunks or the cached parsed frame when possible.
+
+        Args:
+            html_content (str): The HTML document.
+            score_dict (dict, optional): The scoring system of TextChunker.
+            tag_types (dict, optional): The tag types map of the parser.
+            parser_kwargs (dict, optional): Keyword arguments of HTMLParser.
+            chunk_kwargs: Keyword arguments of `TextChunker.chunk_text`. The row ranges of the chunks are stored,
+                          so one entry serves text, DataFrame and view chunks (keep_text_only, as_views).
+
+        Returns:
+            list: The same chunks as `TextChunker(HTMLParser(html_content).parse()).chunk_text(**chunk_kwargs)`.
+        """
+        parser_kwargs = parser_kwargs or {}
+        arguments = self.chunk_arguments(**chunk_kwargs)
+        document_key = self.document_key(html_content, tag_types, parser_kwargs.get('prune_rules'), parser_kwargs.get('dedupe'))
+        entry = None
+        if document_key is not None:
+            key = self.chunk_key(document_key, score_dict, **arguments)
+            entry = self.load_chunks(key)
+
+        df = self.parse(html_content, tag_types=tag_types, **parser_kwargs)
+        chunker = TextChunker(df, score_dict=score_dict)
+        if entry is None:
+            cutoff = chunker._resolve_cutoff(arguments.pop('cutoff'), arguments.pop('auto_adjust_cutoff'))
+            boundaries = chunker.chunk_boundaries(cutoff, **arguments)
+            if document_key is not None:
+                self.store_chunks(key, boundaries, cutoff)
+        else:
+            boundaries, cutoff = entry
+        return chunker._assemble(boundaries, cutoff, chunk_kwargs.get('keep_text_only', True), chunk_kwargs.get('as_views', False))
+
+    # maintenance
+
+    @staticmethod
+    def _entry_size(path):
+        if os.path.isdir(path):
+            return sum(entry.stat().st_size for entry in os.scandir(path))
+        return os.path.getsize(path)
+
+    def _entries(self):
+        """
+        Returns:
+            list: (last use, size, path) of every entry.
+        """
+        entries = []
+        for kind in ('docs', 'chunks'):
+            kind_directory = os.path.join(self.directory, kind)
+            for name in os.listdir(kind_directory):
+                path = os.path.join(kind_directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), self._entry_size(path), path))
+                except OSError:
+                    continue
+        return entries
+
+    def size(self):
+        """
+        Returns:
+            int: The total size of the cached entries in bytes.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits into `max_bytes`.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            # move the entry out of sight first, so that readers never see a half removed document
+            doomed = self._temporary_path()
+            try:
+                os.rename(path, doomed)
+            except OSError:
+                # already removed by another process
+                continue
+            self._remove(doomed)
+            total -= size
+            removed += 1
+        self._estimated_bytes = total
+        return removed
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        for kind in ('docs', 'chunks', 'tmp'):
+            kind_directory = os.path.join(self.directory, kind)
+            shutil.rmtree(kind_directory, ignore_errors=True)
+            os.makedirs(kind_directory, exist_ok=True)
+        self._estimated_bytes = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: The hit / miss counters of this instance and the size of the cache.
+        """
+        entries = self._entries()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries), 'max_bytes': self.max_bytes}
@@ -0,0 +1,164 @@
+import math
+import re
+from bisect import bisect_right
+from .LazyModule import LazyModule
+from .LRUCache import LRUCache
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+_NON_NUMERIC = re.compile(r'[^\d.]')
+
+class FontSizeResolver:
+    """
+    Resolves raw font size strings to (points, label, score) once and remembers the result.
+
+    A document only uses a few dozen distinct font sizes, so the unit conversion and bin lookup are done per
+    distinct string instead of per row. Resolvers are shared by every TextChunker that uses the same font size
+    configuration, see `for_config`.
+
+    Args:
+        font_size_bins (list): The lower bound of each font size bin, in points.
+        font_size_labels (list): The label of each bin.
+        font_size_scores (dict): The score of each label, '' being the score of a row without font size.
+        maxsize (int, optional): The number of distinct font size strings to keep. Defaults to 4096.
+    """
+    _shared = LRUCache(64)
+
+    def __init__(self, font_size_bins, font_size_labels, font_size_scores, maxsize=4096):
+        self.font_size_bins = list(font_size_bins)
+        self.font_size_labels = list(font_size_labels)
+        self.font_size_scores = dict(font_size_scores)
+        self._label_scores = [float(self.font_size_scores.get(label, 0)) for label in self.font_size_labels]
+        self.cache = LRUCache(maxsize)
+
+    @classmethod
+    def for_config(cls, font_size_bins, font_size_labels, font_size_scores):
+        """
+        Returns the resolver shared by every caller using the same bins, labels and scores.
+        """
+        key = (
+            tuple(font_size_bins),
+            tuple(font_size_labels),
+            tuple(sorted(font_size_scores.items(), key=lambda item: str(item[0])))
+        )
+        return cls._shared.get_or_create(key, lambda: cls(font_size_bins, font_size_labels, font_size_scores))
+
+    def _compute(self, font_sizes):
+        """
+        Converts font sizes to points and labels them, vectorized over a list of distinct strings.
+
+        Sizes in 'pt' are kept, 'px' are converted with 0.75pt per pixel and any other unit keeps its numeric
+        characters. A size without digits has the label '', a size that is not a number has no label (None).
+
+        Returns:
+            list: A (points, label, score) tuple per font size.
+        """
+        sizes = pd.Series(font_sizes, dtype=object)
+        points = np.full(len(sizes), np.nan)
+
+        is_pt = sizes.str.contains('pt', regex=False).to_numpy(dtype=bool)
+        is_px = ~is_pt & sizes.str.contains('px', regex=False).to_numpy(dtype=bool)
+        is_other = ~is_pt & ~is_px
+        # remove all non-numeric characters from the unit-less sizes, nothing left means no label
+        digits = sizes[is_other].str.replace(r'[^\d.]', '', regex=True)
+        has_digits = np.zeros(len(sizes), dtype=bool)
+        has_digits[is_other] = (digits != '').to_numpy(dtype=bool)
+
+        points[is_pt] = sizes[is_pt].str.replace('pt', '', regex=False).astype(float).to_numpy()
+        points[is_px] = sizes[is_px].str.replace('px', '', regex=False).astype(float).to_numpy() * 0.75
+        points[has_digits] = digits[digits != ''].astype(float).to_numpy()
+
+        labelled = (is_pt | is_px | has_digits) & ~np.isnan(points)
+        bin_index = np.zeros(len(sizes), dtype=int)
+        if self.font_size_bins:
+            # match the label with the smaller value of the bin, values outside the range use the first or last label
+            bin_index = np.searchsorted(self.font_size_bins, np.where(labelled, points, 0), side='right') - 1
+            bin_index = np.clip(bin_index, 0, len(self.font_size_bins) - 1)
+        else:
+            labelled[:] = False
+
+        results = []
+        no_label_score = self.font_size_scores.get('', 0)
+        for i in range(len(sizes)):
+            if labelled[i]:
+                results.append((points[i], self.font_size_labels[bin_index[i]], self._label_scores[bin_index[i]]))
+            elif is_other[i] and not has_digits[i]:
+                results.append((np.nan, '', no_label_score))
+            else:
+                # a size that is not a number gets no label at all
+                results.append((np.nan, None, 0))
+        return results
+
+    def _compute_one(self, font_size):
+        """
+        Converts one font size string like `_compute`, in plain python so that resolving a single size needs neither
+        pandas nor numpy.
+
+        Returns:
+            tuple: The (points, label, score) of the font size.
+        """
+        if 'pt' in font_size:
+            points = float(font_size.replace('pt', ''))
+        elif 'px' in font_size:
+            points = float(font_size.replace('px', '')) * 0.75
+        else:
+            digits = _NON_NUMERIC.sub('', font_size)
+            if not digits:
+                return (math.nan, '', self.font_size_scores.get('', 0))
+            points = float(digits)
+
+        if math.isnan(points) or not self.font_size_bins:
+            return (math.nan, None, 0)
+        index = min(max(bisect_right(self.font_size_bins, points) - 1, 0), len(self.font_size_bins) - 1)
+        return (points, self.font_size_labels[index], self._label_scores[index])
+
+    def resolve(self, font_size):
+        """
+        Returns:
+            tuple: The (points, label, score) of one font size string.
+        """
+        result = self.cache.get(font_size)
+        if result is None:
+            result = self._compute_one(font_size) if isinstance(font_size, str) else self._compute([font_size])[0]
+            self.cache.put(font_size, result)
+        return result
+
+    def scores(self, font_sizes):
+        """
+        Returns the font size score of each of the given (distinct) font size strings.
+
+        Args:
+            font_sizes (array-like): Font size strings, e.g. '12pt', '16px', '1.2em' or ''.
+
+        Returns:
+            numpy.ndarray: The score of each font size.
+        """
+        results = [self.cache.get(font_size) for font_size in font_sizes]
+        missing = [font_size for font_size, result in zip(font_sizes, results) if result is None]
+        if missing:
+            computed = dict(zip(missing, self._compute(missing)))
+            for font_size, result in computed.items():
+                self.cache.put(font_size, result)
+            results = [computed[font_size] if result is None else result for font_size, result in zip(font_sizes, results)]
+        return np.array([result[2] for result in results], dtype=float)
+
+    def warm(self, font_sizes):
+        """
+        Resolves the font sizes of a corpus ahead of time, e.g. `resolver.warm(df['font_size'])` for each parsed frame.
+
+        Args:
+            font_sizes (iterable): Font size strings, duplicates are resolved once.
+        """
+        distinct = [font_size for font_size in dict.fromkeys(str(font_size) for font_size in font_sizes)
+                    if font_size not in self.cache]
+        if distinct:
+            for font_size, result in zip(distinct, self._compute(distinct)):
+                self.cache.put(font_size, result)
+
+    def stats(self):
+        """
+        Returns:
+            dict: The hit / miss counters of the font size cache.
+        """
+        return self.cache.stats()
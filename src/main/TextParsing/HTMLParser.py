@@ -1,68 +1,178 @@
 #%%
-from bs4 import BeautifulSoup, NavigableString, Tag
-import pandas as pd
+from . import ParserBackend
+from .ParserBackend import START, TEXT, END
+from .StyleCache import DEFAULT_STYLE_CACHE, parse_inline_styles
+from .RowBuilder import RowBuilder
+from .TextBuffer import TextBuffer
+from .Instrumentation import Stats, null_stage
+from .PruneRules import DEFAULT_PRUNE_RULES
+from .Deduplicator import Deduplicator
 
 class HTMLParser:
-    def __init__(self, html_content, using_url=False):
+    # 'bs4' builds a BeautifulSoup tree (pure python), 'lxml' builds a libxml2 tree and walks it with events,
+    # 'stream' feeds libxml2 incrementally and never holds the whole tree.
+    # The style walk itself has no depth limit, the libxml2 backends are bound by libxml2's own nesting limit and
+    # raise a ValueError for deeper documents (see ParserBackend.MAX_DEPTH), which 'bs4' parses in full.
+    BACKENDS = ('bs4', 'lxml', 'stream')
+    # seconds allowed for fetching a page with `using_url=True`
+    URL_TIMEOUT = 30
+    # documents smaller than this are walked serially even with `workers` > 1, starting the pool would cost more
+    PARALLEL_MIN_BYTES = 1 << 20
+    # Linux only, opt in: the parallel walk forks its workers so they inherit the parsed tree instead of parsing the
+    # document again. Forking a process that runs other threads (an event loop, a thread pool) can deadlock them.
+    PARALLEL_FORK = False
+    # bumped whenever a change of the parser changes the parsed rows, cached parse results of older versions are ignored
+    VERSION = 1
+    # html tag -> simplified tag type of the `tags` column
+    TAG_TYPES = {
+        'h1': 'header1', 'h2': 'header2', 'h3': 'header3', 'h4': 'header4', 'h5': 'header5', 'h6': 'header6', 
+        'data-list-text': 'header2',
+        'strong': 'strong importance', 'b': 'bold', 'em': 'emphasis', 'i': 'italic', 
+        'mark': 'highlighted',
+        'u': 'underline', 
+        'del': 'line-through', 's': 'line-through', 'strike': 'line-through',
+        'small': 'small', 'cite': 'citation', 'blockquote': 'blockquote',
+        'sup': 'superscript', 'sub': 'subscript', 
+        'table': 'table', 'tr': 'table row', 'td': 'table cell', 'th': 'table header', 'tbody': 'table body', 'thead': 'table head', 'tfoot': 'table foot'
+    }
+
+    def __init__(self, html_content, using_url=False, backend='bs4', style_cache=None, stats=None, prune_rules=None, dedupe=None, workers=1):
         
+        # per stage timers and counters, None (the default) disables them, see `Instrumentation.Stats`
+        self.stats = Stats.resolve(stats, 'parser')
+        stage = self.stats.stage if self.stats is not None else null_stage
+
         # check if html_content is a url
         if using_url:
-            if 'http' in html_content and '://' in html_content and ('.com' in html_content or '.org' in html_content or '.net' in html_content or '.edu' in html_content or '.gov' in html_content):
-                import requests
-                response = requests.get(html_content)
-                if response.status_code == 200:
-                    self.html_content = response.text
-                else:
-                    # Failed to retrieve the URL
-                    raise ValueError('Failed to retrieve the URL')
+            import requests
+            from .AsyncHTMLFetcher import validate_url
+            with stage('fetch'):
+                response = requests.get(validate_url(html_content), timeout=self.URL_TIMEOUT)
+            if response.status_code == 200:
+                self.html_content = response.text
             else:
-                raise ValueError('Invalid URL')
+                # Failed to retrieve the URL
+                raise ValueError('Failed to retrieve the URL')
         else:
             self.html_content = html_content
-        
-        self.soup = BeautifulSoup(self.html_content, 'html.parser')
-            
-        self.data = []
-        self.processed_texts = set()  # To avoid duplicates
-        self.styles = self._extract_styles()
-        self.body = self.soup.find('body') if self.soup.find('body') else self.soup
-        self.tag_types = {
-            'h1': 'header1', 'h2': 'header2', 'h3': 'header3', 'h4': 'header4', 'h5': 'header5', 'h6': 'header6', 
-            'data-list-text': 'header2',
-            'strong': 'strong importance', 'b': 'bold', 'em': 'emphasis', 'i': 'italic', 
-            'mark': 'highlighted',
-            'u': 'underline', 
-            'del': 'line-through', 's': 'line-through', 'strike': 'line-through',
-            'small': 'small', 'cite': 'citation', 'blockquote': 'blockquote',
-            'sup': 'superscript', 'sub': 'subscript', 
-            'table': 'table', 'tr': 'table row', 'td': 'table cell', 'th': 'table header', 'tbody': 'table body', 'thead': 'table head', 'tfoot': 'table foot'
-        }
+
+        if backend not in self.BACKENDS:
+            raise ValueError(f'Invalid backend input: {backend}, acceptable values are {list(self.BACKENDS)}')
+        self.backend = backend
+        # processes walking the parts of a large document, see `ParallelWalk`
+        if workers < 1 or (workers > 1 and backend != 'lxml'):
+            raise ValueError(f"Invalid workers input: {workers}, must be 1, or more with backend='lxml'")
+        self.workers = workers
+
+        self.soup = None
+        self.root = None
+        with stage('build'):
+            if backend == 'bs4':
+                from bs4 import BeautifulSoup
+                self.soup = BeautifulSoup(self.html_content, 'html.parser')
+                self.body = self.soup.find('body') if self.soup.find('body') else self.soup
+            elif backend == 'lxml':
+                self.root = ParserBackend.parse_lxml(self.html_content)
+                self.body = ParserBackend.find_body(self.root)
+            else:
+                # the stream backend parses in `parse`, stylesheets are collected on the way
+                self.body = None
+
+        self.data = RowBuilder()
+        # removes repeated rows (running headers, footers) and corpus boilerplate, off unless given, see `Deduplicator`
+        self.dedupe = Deduplicator.resolve(dedupe)
+        self.processed_texts = set()  # the fingerprints of the rows kept so far, to avoid duplicates
+        # compiled stylesheets and inline styles are shared process wide unless a dedicated StyleCache is given
+        self.style_cache = style_cache if style_cache is not None else DEFAULT_STYLE_CACHE
+        # the subtrees skipped by the walk, only <script> unless other rules are given, see `PruneRules`
+        self.prune_rules = prune_rules if prune_rules is not None else DEFAULT_PRUNE_RULES
+        with stage('styles'):
+            self.styles = self._extract_styles()
+        self.tag_types = dict(self.TAG_TYPES)
         
         self.parsed_data = None
+        # the result of `parse_compact`
+        self.compact_data = None
+        # the joined text of the parsed rows, built by the first get_text
+        self.text_buffer = None
         self.parse_status = False
 
+    @classmethod
+    def from_urls(cls, urls, concurrency=16, per_host=4, timeout=30, retries=3, workers=None, **parser_kwargs):
+        """
+        Fetches many pages concurrently and parses them as they arrive.
+
+        The pages are downloaded over one pooled session by `AsyncHTMLFetcher` (requires aiohttp) and handed to
+        parser processes as soon as each one is complete.
+
+        Args:
+            urls (iterable): The URLs to fetch.
+            concurrency (int, optional): The maximum number of open connections. Defaults to 16.
+            per_host (int, optional): The maximum number of open connections to one host. Defaults to 4.
+            timeout (float, optional): Seconds allowed for one request. Defaults to 30.
+            retries (int, optional): The number of retries of a failed request. Defaults to 3.
+            workers (int, optional): The number of parser processes, None for one per CPU, 0 to parse in a thread.
+            parser_kwargs: Keyword arguments of HTMLParser, e.g. backend='lxml'.
+
+        Yields:
+            tuple: (FetchResult, pandas.DataFrame) in completion order, the DataFrame is None if the page failed.
+        """
+        import asyncio
+        from .AsyncHTMLFetcher import AsyncHTMLFetcher, iter_parsed
+
+        async def run():
+            async with AsyncHTMLFetcher(concurrency=concurrency, per_host=per_host, timeout=timeout, retries=retries) as fetcher:
+                async for item in iter_parsed(urls, fetcher=fetcher, workers=workers, **parser_kwargs):
+                    yield item
+
+        # drive the async generator from a private event loop so the caller can simply iterate
+        loop = asyncio.new_event_loop()
+        pages = run()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(pages.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(pages.aclose())
+            loop.close()
+
     def _extract_styles(self):
         """
         Extracts and returns the CSS styles from the HTML document.
 
+        The stylesheets are compiled through the style cache, so documents sharing the same stylesheets
+        share one rule table.
+
         Returns:
             dict: A dictionary containing CSS styles. The keys are CSS selectors and the values are dictionaries
-                  representing the CSS properties and their corresponding values.
-        """
-        styles = {}
-        for style in self.soup.find_all("style"):
-            css_text = style.string if style.string else ''
-            css_rules = [rule.strip() for rule in css_text.split('}') if rule.strip()]
-            for rule in css_rules:
-                selector, properties_str = rule.split('{', 1)
-                selector = selector.strip().lstrip('.')
-                properties = {}
-                for prop in properties_str.split(';'):
-                    if ':' in prop.strip():
-                        key, value = prop.split(':', 1)
-                        properties[key.strip()] = value.strip()
-                styles[selector] = properties
-        return styles
+                  representing the CSS properties and their corresponding values. The dictionary is shared and must not be modified.
+        """
+        if self.backend == 'bs4':
+            self.css_texts = [style.string if style.string else '' for style in self.soup.find_all("style")]
+        elif self.backend == 'lxml':
+            self.css_texts = ParserBackend.find_stylesheets(self.root)
+        elif self._scans_stylesheets():
+            # a first pass collects every stylesheet, so they apply to the whole document as in the other backends
+            self.css_texts = ParserBackend.scan_stylesheets(self.html_content)
+        else:
+            # a one shot iterator can only be read once, its stylesheets apply from where they close
+            self.css_texts = []
+
+        self.stylesheet = self.style_cache.compile(self.css_texts)
+        return self.stylesheet.rules
+
+    def _scans_stylesheets(self):
+        return self.backend == 'stream' and ParserBackend.can_rescan(self.html_content)
+
+    def _add_stylesheet(self, css_text):
+        """
+        Adds a stylesheet met while streaming the document, later rules override earlier ones.
+        """
+        self.css_texts = self.css_texts + [css_text]
+        self.stylesheet = self.style_cache.compile(self.css_texts)
+        self.styles = self.stylesheet.rules
 
     def _extract_inline_styles(self, tag_styles):
         """
@@ -75,110 +185,321 @@ class HTMLParser:
             dict: A dictionary containing the extracted inline styles, where the keys are style properties and the values are the corresponding values.
 
         """
-        inline_styles = {}
-        for style in tag_styles.split(';'):
-            if ':' in style.strip():
-                key, value = style.split(':', 1)
-                inline_styles[key.strip()] = value.strip()
-        return inline_styles
+        return parse_inline_styles(tag_styles)
+
+    def _resolve_styles(self, inherited_styles, class_list, tag_styles):
+        """
+        Combines the inherited styles with the class and inline styles of a tag.
+
+        Args:
+            inherited_styles (dict): The styles inherited from the parent tags.
+            class_list (list or None): The classes of the tag, None if it has no class attribute.
+            tag_styles (str or None): The inline style attribute of the tag, None if it has none.
+
+        Returns:
+            dict: A new dictionary with the styles that apply to the tag.
+        """
+        current_styles = inherited_styles.copy()
+
+        if class_list is not None:
+            current_styles.update(self.stylesheet.resolve_classes(class_list))
+
+        if tag_styles is not None:
+            current_styles.update(self.style_cache.inline(tag_styles))
 
+        return current_styles
 
-    def _extract_text_with_style(self, tag, inherited_styles={}, tags=[]):
+    def _extract_text_with_style(self, tag):
         """
         Extracts text content from HTML tags along with their associated styles.
 
         Args:
-            tag (Tag or NavigableString): The HTML tag or string to extract text from.
-            inherited_styles (dict, optional): The inherited styles from parent tags. Defaults to an empty dictionary.
-            tags (list, optional): The list of tag names representing the hierarchy of the current tag. Defaults to an empty list.
+            tag (Tag): The BeautifulSoup tag to extract text from, usually the <body>.
 
         Returns:
             None
 
         Notes:
-            - This method appends extracted text content along with associated styles to the `data` list attribute of the class.
+            - This method appends extracted text content along with associated styles to the `data` RowBuilder attribute of the class.
             - The extracted information includes text content, font family, font size, font weight, text decoration, font color, and tags.
-            - The `inherited_styles` parameter is used to pass the cumulative styles inherited from parent tags.
-            - The `tags` parameter is used to keep track of the hierarchy of tags.
-
-        """
-        if isinstance(tag, NavigableString):
-            text = tag.strip()
-            if text:
-                self.data.append({
-                    'text_content': text,
-                    'font_family': inherited_styles.get('font-family', ''),
-                    'font_size': inherited_styles.get('font-size', ''),
-                    'font_weight': inherited_styles.get('font-weight', ''),
-                    'text_decoration': inherited_styles.get('text-decoration', ''),
-                    'font_color': inherited_styles.get('color', ''),
-                    'tags': ', '.join(tags)
-                })
-        elif isinstance(tag, Tag):
-            # ignore the script tags
-            if tag.name == 'script':
-                return
-                
-            current_styles = inherited_styles.copy()
-
-            if tag.has_attr('class'):
-                class_styles = {}
-                class_list = tag['class']
-                for cls in class_list:
-                    if cls in self.styles:
-                        class_styles.update(self.styles[cls])
-                current_styles.update(class_styles)
-
-            if tag.has_attr('style'):
-                inline_styles = self._extract_inline_styles(tag['style'])
-                current_styles.update(inline_styles)
-
-            current_tags = tags + [tag.name]
-
-            # Extract and add data-list-text content if available
-            if tag.has_attr('data-list-text'):
-                self.data.append({
-                    'text_content': tag['data-list-text'],
-                    'font_family': '',
-                    'font_size': '',
-                    'font_weight': '',
-                    'text_decoration': '',
-                    'font_color': '',
-                    'tags': ', '.join(current_tags) + ', data-list-text'
-                })
-
-            for child in tag.contents:
-                self._extract_text_with_style(child, current_styles, current_tags)
+            - The tree is walked iteratively, see `_extract_text_with_style_events`.
+
+        """
+        self._extract_text_with_style_events(ParserBackend.iter_soup_events(tag, **self._pruning()))
+
+    def _extract_text_with_style_events(self, events):
+        """
+        Extracts text content along with its styles from a backend event stream.
+
+        Args:
+            events (iterable): The START / TEXT / END / STYLE events of `ParserBackend`.
+
+        Returns:
+            None
+
+        Notes:
+            - This method appends the rows of `_iter_kept_rows` to the `data` RowBuilder attribute of the class.
+        """
+        append = self.data.append
+        for text, style_id, tag_mask in self._iter_kept_rows(events):
+            append(text, style_id, tag_mask)
+
+    def _iter_kept_rows(self, events):
+        """
+        Returns the rows of `_iter_rows` without the duplicate and boilerplate rows when deduplication is enabled.
+        """
+        return self._dedupe_rows(self._iter_rows(events))
+
+    def _dedupe_rows(self, rows):
+        """
+        Returns the rows of one whole document without the duplicate and boilerplate rows when deduplication is enabled.
+        """
+        if self.dedupe is None:
+            return rows
+        self.processed_texts = set()
+        return self.dedupe.filter_rows(rows, self.processed_texts, self.stats)
+
+    def _iter_rows(self, events):
+        """
+        Yields the text rows of a backend event stream as soon as they are met.
+
+        Args:
+            events (iterable): The START / TEXT / END / STYLE events of `ParserBackend`.
+
+        Yields:
+            tuple: (text_content, style_id, tag_mask). The style id indexes `data.style_values` and the bits of the
+                   tag mask follow the labels of `_tag_bits`.
+
+        Notes:
+            - New styles are registered in the `data` RowBuilder attribute of the class.
+            - The walk keeps an explicit stack, so there is no limit on the nesting depth of the document.
+            - Styles are interned into frames identified by integers and the tag hierarchy is kept as a bitmask of
+              the simplified tag types. Siblings share the frame of their parent, and a tag without class or style
+              attribute reuses the style frame of its parent, so every node costs a constant amount of work.
+            - Pruned subtrees are skipped by the event iterators, see `_pruning`, they never reach this loop.
+        """
+        tag_bits, _ = self._tag_bits()
+        list_text_bit = tag_bits.get('data-list-text', 0)
+
+        # style frames: the resolved styles of each distinct style, the row values live in the RowBuilder
+        style_dicts = [{}]
+        style_index = {}  # (parent style id, classes, inline style) -> style id
+
+        data = self.data
+        style_id, tag_mask = 0, 0
+        stack = []
+
+        for event in events:
+            kind = event[0]
+
+            if kind == TEXT:
+                text = event[1].strip()
+                if text:
+                    yield (text, style_id, tag_mask)
+            elif kind == START:
+                name, attrs = event[1], event[2]
+                stack.append((style_id, tag_mask))
+
+                class_list, tag_styles = attrs.get('class'), attrs.get('style')
+                if class_list is not None or tag_styles is not None:
+                    key = (style_id, None if class_list is None else tuple(class_list), tag_styles)
+                    new_style_id = style_index.get(key)
+                    if new_style_id is None:
+                        styles = self._resolve_styles(style_dicts[style_id], class_list, tag_styles)
+                        style_dicts.append(styles)
+                        new_style_id = data.add_style((
+                            styles.get('font-family', ''),
+                            styles.get('font-size', ''),
+                            styles.get('font-weight', ''),
+                            styles.get('text-decoration', ''),
+                            styles.get('color', '')
+                        ))
+                        style_index[key] = new_style_id
+                    style_id = new_style_id
+
+                tag_mask |= tag_bits.get(name, 0)
+
+                # Extract and add data-list-text content if available
+                if 'data-list-text' in attrs:
+                    yield (attrs['data-list-text'], 0, tag_mask | list_text_bit)
+            elif kind == END:
+                style_id, tag_mask = stack.pop()
+            else:
+                self._add_stylesheet(event[1])
+                # frames resolved so far stay valid, new tags are resolved against the updated stylesheet
+                style_index.clear()
+
+    def _pruning(self):
+        """
+        Returns the `prune` and `on_pruned` arguments of the ParserBackend event iterators for `prune_rules`.
+
+        The iterators skip the pruned subtrees before any style is resolved or any event is yielded. Elements
+        sharing their classes, id and inline style share the decision, and what pruning saved is only counted while
+        instrumentation is enabled.
+        """
+        rules, style_cache, stats = self.prune_rules, self.style_cache, self.stats
+        prune_tags, checks_attributes = rules.tags, rules.checks_attributes
+        prune_index = {}  # (classes, id, inline style, hidden) -> pruned
+
+        def prune(name, attrs):
+            if name in prune_tags:
+                return True
+            if not checks_attributes:
+                return False
+            class_list = attrs.get('class')
+            key = (None if class_list is None else tuple(class_list), attrs.get('id'), attrs.get('style'), 'hidden' in attrs)
+            pruned = prune_index.get(key)
+            if pruned is None:
+                pruned = prune_index[key] = rules.matches(name, attrs, style_cache)
+            return pruned
+
+        if stats is None:
+            return {'prune': prune}
+
+        def on_pruned(nodes, rows):
+            stats.count('pruned_subtrees')
+            stats.count('pruned_nodes', nodes)
+            stats.count('pruned_rows', rows)
+
+        for name in ('pruned_subtrees', 'pruned_nodes', 'pruned_rows'):
+            stats.count(name, 0)
+        return {'prune': prune, 'on_pruned': on_pruned}
+
+    @staticmethod
+    def _count_events(events, stats):
+        """
+        Passes the events through and counts the element and text nodes, only used while instrumentation is enabled.
+        """
+        nodes = text_nodes = 0
+        try:
+            for event in events:
+                kind = event[0]
+                if kind == START:
+                    nodes += 1
+                elif kind == TEXT:
+                    text_nodes += 1
+                yield event
+        finally:
+            stats.count('nodes', nodes)
+            stats.count('text_nodes', text_nodes)
+
+    def _tag_bits(self):
+        """
+        Assigns one bit to every simplified tag type of `tag_types`.
+
+        Returns:
+            tuple: A dictionary mapping the html tag names to their bit, and the list of simplified tag names by bit.
+        """
+        labels = list(dict.fromkeys(label for label in self.tag_types.values() if label))
+        label_bits = {label: 1 << bit for bit, label in enumerate(labels)}
+        return {name: label_bits[label] for name, label in self.tag_types.items() if label}, labels
+
+    def _events(self):
+        """
+        Returns the event stream of the 'lxml' or 'stream' backend.
+        """
+        if self.backend == 'lxml':
+            return ParserBackend.iter_tree_events(self.body, **self._pruning())
+        return ParserBackend.iter_stream_events(self.html_content, styles=not self._scans_stylesheets(), **self._pruning())
         
+    def _walks_in_parallel(self):
+        return (self.workers > 1 and self.body is not None and len(self.body) > 1
+                and len(self.html_content) >= self.PARALLEL_MIN_BYTES)
+
+    def _parse_rows(self, stage):
+        """
+        Walks the document into a new RowBuilder, timing the 'walk' stage.
+
+        Returns:
+            list: The simplified tag name of each bit of the tag masks.
+        """
+        stats = self.stats
+        _, tag_labels = self._tag_bits()
+        self.data = RowBuilder(wide_masks=len(tag_labels) > 64)
+
+        with stage('walk'):
+            if self._walks_in_parallel():
+                from .ParallelWalk import walk_parallel
+                walk_parallel(self, self.workers)
+                return tag_labels
+            events = ParserBackend.iter_soup_events(self.body, **self._pruning()) if self.backend == 'bs4' else self._events()
+            if stats is not None:
+                events = self._count_events(events, stats)
+            self._extract_text_with_style_events(events)
+        return tag_labels
+
+    def _count_rows(self):
+        if self.stats is not None:
+            self.stats.count('rows', len(self.data))
+            self.stats.count('styles', len(self.data.style_values) - 1)
+
     def parse(self):
             """
             Parses the HTML body and returns a DataFrame with extracted data.
-            
+
+            The rows are accumulated column by column and the DataFrame is built in one shot. The style columns
+            are categorical and `tags` holds the comma separated simplified tags of each row.
+
+            With instrumentation enabled, the stages 'walk' (with the libxml2 parsing of the 'stream' backend) and
+            'frame' are timed and the counters nodes, text_nodes, rows and styles are updated, see `stats`.
+
             Returns:
                 df (pandas.DataFrame): DataFrame containing the extracted data.
             """
-            
-            self._extract_text_with_style(self.body)
-            df = pd.DataFrame(self.data)
-            
-            # update tags to simplified tags
-            return_tags_list = []
-            for tags in df['tags']:
-                
-                return_tags = []    
-                for t in tags.split(','):
-                    return_tags.append(self.tag_types.get(t.strip(), ''))
-                
-                return_tags  = list(set(return_tags))
-                return_tags.remove('')
-                return_tags_list.append(return_tags)
-            
-            df['tags'] = pd.Series([', '.join(x) for x in return_tags_list])
+            stage = self.stats.stage if self.stats is not None else null_stage
+
+            with stage('total'):
+                tag_labels = self._parse_rows(stage)
+                with stage('frame'):
+                    df = self.data.to_frame(tag_labels)
+                self._count_rows()
             
             self.parsed_data = df
+            self.text_buffer = None
             self.parse_status = True
             return df
+
+    def parse_compact(self):
+            """
+            Parses the HTML body into a style table and one integer style id per row.
+
+            Every distinct combination of the five style values and the tag set is stored once, see `CompactDocument`.
+            `CompactDocument.to_frame()` gives the same DataFrame as `parse`, and TextChunker accepts the compact
+            document directly and scores each style once.
+
+            Returns:
+                CompactDocument: The texts, the style id of each row and the style table.
+            """
+            stage = self.stats.stage if self.stats is not None else null_stage
+
+            with stage('total'):
+                tag_labels = self._parse_rows(stage)
+                with stage('frame'):
+                    document = self.data.to_compact(tag_labels)
+                self._count_rows()
+
+            self.compact_data = document
+            self.text_buffer = None
+            self.parse_status = True
+            return document
     
+    def parse_text(self):
+            """
+            Parses the HTML body and returns only the text of each row.
+
+            The style columns are not built, so this path needs neither pandas nor numpy. `' '.join(texts)` is the
+            text returned by `get_text`.
+
+            Returns:
+                list: The text of each row, in document order.
+            """
+            stage = self.stats.stage if self.stats is not None else null_stage
+
+            with stage('total'):
+                self._parse_rows(stage)
+                self._count_rows()
+            return self.data.text
+
     def get_text(self, output_file=None):
         """
         Retrieves the text content from the parsed data.
@@ -196,8 +517,11 @@ class HTMLParser:
         else:
             self.parse()
 
+        if self.text_buffer is None:
+            self.text_buffer = TextBuffer.from_frame(self.parsed_data if self.parsed_data is not None else self.compact_data)
+
         if output_file:  # write text to text file
             with open(output_file, 'w', encoding='utf-8') as file:
-                file.write(' '.join([row['text_content'] for _, row in self.parsed_data.iterrows()]))
+                self.text_buffer.write(file)
         else:
-            return ' '.join([row['text_content'] for _, row in self.parsed_data.iterrows()])
+            return self.text_buffer.text
@@ -0,0 +1,275 @@
+import collections
+import math
+import threading
+import time
+import weakref
+
+class _StageTimer:
+    __slots__ = ('stats', 'stage', 'start')
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+def null_stage(stage):
+    """
+    The stage timer used while instrumentation is disabled, it does nothing.
+    """
+    return NULL_TIMER
+
+
+class Stats:
+    """
+    Per stage timers and counters of one HTMLParser or TextChunker.
+
+    Stages are timed with `with stats.stage('walk'): ...`, counters are set with `count`. Every hook is called as
+    `hook(stats, stage, seconds)` when a stage ends, the stage 'total' ends a parse / chunk_text call and its counters
+    are complete at that point. Instrumentation is disabled by default (no Stats object), the instrumented code then
+    only pays one attribute check per stage.
+
+    Args:
+        component (str): The instrumented component, 'parser' or 'chunker'.
+        hooks (list, optional): Callables notified of every stage, e.g. a MetricsRegistry.
+    """
+    def __init__(self, component, hooks=None):
+        self.component = component
+        self.hooks = list(hooks or [])
+        self.timers = {}
+        self.calls = {}
+        self.counters = {}
+
+    @classmethod
+    def resolve(cls, stats, component):
+        """
+        Turns the `stats` argument of HTMLParser / TextChunker into a Stats object or None.
+
+        Args:
+            stats (None, bool, Stats, MetricsRegistry or callable): None or False disables the instrumentation, True
+                creates a Stats object, a MetricsRegistry or another callable creates one with that hook.
+            component (str): The instrumented component.
+        """
+        if stats is None or stats is False:
+            return None
+        if stats is True:
+            return cls(component)
+        if isinstance(stats, cls):
+            return stats
+        if callable(stats):
+            return cls(component, hooks=[stats])
+        raise ValueError(f'Invalid stats input: {stats!r}, acceptable values are None, True, a Stats object or a hook')
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def stage(self, stage):
+        """
+        Returns:
+            A context manager timing the stage.
+        """
+        return _StageTimer(self, stage)
+
+    def record(self, stage, seconds):
+        self.timers[stage] = self.timers.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        for hook in self.hooks:
+            hook(self, stage, seconds)
+
+    def count(self, name, value=1):
+        """
+        Adds `value` to a counter.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The component, the seconds and number of calls of every stage and the counters.
+        """
+        return {
+            'component': self.component,
+            'stages': {stage: {'seconds': seconds, 'calls': self.calls[stage]} for stage, seconds in self.timers.items()},
+            'counters': dict(self.counters)
+        }
+
+    def to_prometheus(self, prefix='html_text_parser', openmetrics=False):
+        """
+        Returns:
+            str: The stats in Prometheus text exposition format, see `MetricsRegistry.to_prometheus`.
+        """
+        registry = MetricsRegistry(prefix)
+        registry.add(self)
+        return registry.to_prometheus(openmetrics=openmetrics)
+
+    def __repr__(self):
+        timers = ', '.join(f'{stage}={seconds * 1e3:.2f}ms' for stage, seconds in self.timers.items())
+        return f'Stats({self.component}: {timers}; {self.counters})'
+
+
+class MetricsRegistry:
+    """
+    Aggregates the stats of many documents, for export to Prometheus.
+
+    Pass the registry as `stats` to HTMLParser and TextChunker (or add it as a hook of a Stats object): it is called
+    at the end of every stage and adds the counters of a run when its 'total' stage ends.
+
+    Args:
+        prefix (str, optional): The prefix of the metric names. Defaults to 'html_text_parser'.
+    """
+    def __init__(self, prefix='html_text_parser'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.stage_seconds = {}  # (component, stage) -> seconds
+        self.stage_calls = {}  # (component, stage) -> calls
+        self.counters = {}  # (component, name) -> total
+        self.runs = {}  # component -> completed runs
+        self._reported = weakref.WeakKeyDictionary()  # Stats -> counters already added
+
+    def __call__(self, stats, stage, seconds):
+        key = (stats.component, stage)
+        with self._lock:
+            self.stage_seconds[key] = self.stage_seconds.get(key, 0.0) + seconds
+            self.stage_calls[key] = self.stage_calls.get(key, 0) + 1
+            if stage == 'total':
+                self._add_counters(stats)
+
+    def _add_counters(self, stats):
+        self.runs[stats.component] = self.runs.get(stats.component, 0) + 1
+        # a Stats object reused for several runs keeps counting, only the increase since its last run is added
+        reported = self._reported.get(stats, {})
+        for name, value in stats.counters.items():
+            key = (stats.component, name)
+            self.counters[key] = self.counters.get(key, 0) + value - reported.get(name, 0)
+        self._reported[stats] = dict(stats.counters)
+
+    def add(self, stats):
+        """
+        Adds a finished Stats object that was not reporting to the registry.
+        """
+        with self._lock:
+            for stage, seconds in stats.timers.items():
+                key = (stats.component, stage)
+                self.stage_seconds[key] = self.stage_seconds.get(key, 0.0) + seconds
+                self.stage_calls[key] = self.stage_calls.get(key, 0) + stats.calls[stage]
+            self._add_counters(stats)
+
+    def to_prometheus(self, openmetrics=False):
+        """
+        Exports the metrics in the Prometheus text exposition format.
+
+        Args:
+            openmetrics (bool, optional): Whether to use the OpenMetrics text format, which names the families without
+                                          the _total suffix and ends with '# EOF'. Defaults to False.
+
+        Returns:
+            str: One counter family per metric: <prefix>_stage_seconds_total and <prefix>_stage_calls_total labelled by
+                 component and stage, <prefix>_runs_total and one <prefix>_<counter>_total per counter, labelled by
+                 component.
+        """
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = []
+
+        def family(name, help_text, samples):
+            if not samples:
+                return
+            # OpenMetrics names the family without the _total suffix of its samples, Prometheus 0.0.4 with it
+            family_name = f'{self.prefix}_{name}' if openmetrics else f'{self.prefix}_{name}_total'
+            lines.append(f'# HELP {family_name} {help_text}')
+            lines.append(f'# TYPE {family_name} counter')
+            for labels, value in samples:
+                label_text = ','.join(f'{label}="{escape(label_value)}"' for label, label_value in labels)
+                lines.append(f'{self.prefix}_{name}_total{{{label_text}}} {value}')
+
+        with self._lock:
+            family('stage_seconds', 'Seconds spent in each stage.',
+                   [((('component', component), ('stage', stage)), seconds) for (component, stage), seconds in sorted(self.stage_seconds.items())])
+            family('stage_calls', 'Number of times each stage ran.',
+                   [((('component', component), ('stage', stage)), calls) for (component, stage), calls in sorted(self.stage_calls.items())])
+            family('runs', 'Completed parse / chunk_text calls.',
+                   [((('component', component),), runs) for component, runs in sorted(self.runs.items())])
+            for name in sorted({name for _, name in self.counters}):
+                family(name, f'Total of the {name} counter.',
+                       [((('component', component),), value) for (component, counter), value in sorted(self.counters.items()) if counter == name])
+
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class LatencyRecorder:
+    """
+    Latency percentiles of the most recent requests of each endpoint of a long running service.
+
+    The last `window` latencies of every endpoint are kept, so the percentiles follow the current load and memory stays
+    bounded. The number of requests and the total seconds are counted since the start.
+
+    Args:
+        window (int, optional): The number of recent latencies kept per endpoint. Defaults to 10000.
+        percentiles (tuple, optional): The percentiles reported by `to_dict`. Defaults to (50, 90, 99).
+    """
+    def __init__(self, window=10000, percentiles=(50, 90, 99)):
+        self.window = window
+        self.percentiles = tuple(percentiles)
+        self._lock = threading.Lock()
+        self._recent = {}  # endpoint -> deque of seconds
+        self.calls = {}
+        self.seconds = {}
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            recent = self._recent.get(endpoint)
+            if recent is None:
+                recent = self._recent[endpoint] = collections.deque(maxlen=self.window)
+            recent.append(seconds)
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            self.seconds[endpoint] = self.seconds.get(endpoint, 0.0) + seconds
+
+    @staticmethod
+    def _percentile(ordered, percentile):
+        # nearest rank on the sorted latencies
+        rank = max(0, min(len(ordered) - 1, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: Per endpoint, the number of calls, the mean and maximum and the percentiles (p50, ...) in milliseconds,
+                  the percentiles and maximum over the recent window.
+        """
+        with self._lock:
+            snapshot = {endpoint: sorted(recent) for endpoint, recent in self._recent.items()}
+            calls, seconds = dict(self.calls), dict(self.seconds)
+        result = {}
+        for endpoint, ordered in sorted(snapshot.items()):
+            summary = {'calls': calls[endpoint], 'mean_ms': seconds[endpoint] / calls[endpoint] * 1e3}
+            for percentile in self.percentiles:
+                summary[f'p{percentile:g}_ms'] = self._percentile(ordered, percentile) * 1e3
+            summary['max_ms'] = ordered[-1] * 1e3
+            result[endpoint] = summary
+        return result
+
+    def __repr__(self):
+        return f'LatencyRecorder(endpoints={sorted(self._recent)}, window={self.window})'
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+import threading
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    A bounded, thread safe least-recently-used mapping with hit / miss counters.
+    """
+    def __init__(self, maxsize=1024):
+        if maxsize <= 0:
+            raise ValueError(f'Invalid maxsize input: {maxsize}, the cache size must be positive')
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value of `key` and marks it as recently used, or `default` on a miss.
+        """
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores `value` under `key`, evicting the least recently used entry when the cache is full.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """
+        Returns the cached value of `key`, computing and storing `factory()` on a miss.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """
+        Drops every entry and resets the counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, evictions, size, maxsize and hit_rate of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,50 @@
+import importlib
+import threading
+
+class LazyModule:
+    """
+    A module imported on first attribute access.
+
+    The heavy dependencies (pandas, numpy) are bound with `pd = LazyModule('pandas')` at module level, so importing
+    the package does not import them: a process only pays for them when a stage that needs them runs. Every attribute
+    is looked up in the real module once and then kept on the proxy, later accesses cost the same as on the module.
+
+    Args:
+        name (str): The absolute name of the module.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = self.__dict__['_module'] = importlib.import_module(self._name)
+        return module
+
+    def __getattr__(self, attribute):
+        value = getattr(self._load(), attribute)
+        self.__dict__[attribute] = value
+        return value
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError(f'Cannot set {attribute!r} on the lazily imported module {self._name!r}')
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def loaded(self):
+        """
+        Whether the module has been imported.
+        """
+        return self._module is not None
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
@@ -0,0 +1,173 @@
+"""
+Intra document parallelism: walking the parts of one large document on a process pool.
+
+The <body> is split between its top-level children into contiguous parts of about the same number of nodes. Every
+worker receives the document once and parses it again, then walks the parts it is given, each part wrapped in the
+START / END events of the <body> so that it inherits the same styles and tags as in a serial walk (see
+`ParserBackend.iter_children_events`). On Linux, with `HTMLParser.PARALLEL_FORK` set, the workers are forked from the
+parent instead and inherit its lxml tree, so the document is neither sent nor parsed again; forking is opt in as it
+is unsafe in a process running other threads. The row streams of the parts are stitched back together in document
+order, with the style ids of each part shifted past the styles of the parts before it.
+
+Only the walk is parallel: the lxml parse before it (in the parent) and the chunk scoring after it stay serial. The
+walk resolves the styles of every node and dominates the parse, while scoring is a few vectorized passes over the
+rows.
+
+The stitched rows hold the same texts, style values and tags as a serial walk, so `parse` returns the same DataFrame
+and TextChunker finds the same chunk boundaries and refine merges. Only the numbering of the styles differs: a style
+met in several parts is registered once per part.
+"""
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from . import ParserBackend
+from .RowBuilder import RowBuilder
+from .Instrumentation import Stats
+from .LazyModule import LazyModule
+
+np = LazyModule('numpy')
+
+# parts per worker process, several small parts balance the load better than one large part each
+PARTS_PER_WORKER = 4
+
+# the parser of the current worker process, inherited by `_init_forked_worker` or built once by `_init_worker`
+_WORKER_PARSER = None
+
+
+def split_children(element, parts):
+    """
+    Splits the children of an element into contiguous ranges of about the same number of nodes.
+
+    Args:
+        element (lxml.etree._Element): The element to split, usually the <body>.
+        parts (int): The maximum number of ranges.
+
+    Returns:
+        list: (start, stop) child index ranges covering all children, in document order.
+    """
+    weights = [1 + int(child.xpath('count(.//node())')) for child in element]
+    if not weights:
+        return [(0, 0)]
+    parts = max(1, min(parts, len(weights)))
+    target = sum(weights) / parts
+
+    ranges, start, total = [], 0, 0
+    for index, weight in enumerate(weights):
+        total += weight
+        # close the range once it reaches its share, or when the children left are just enough for the other ranges
+        remaining = parts - len(ranges) - 1
+        if remaining and (total >= target * (len(ranges) + 1) or len(weights) - index - 1 <= remaining):
+            ranges.append((start, index + 1))
+            start = index + 1
+    ranges.append((start, len(weights)))
+    return [(start, stop) for start, stop in ranges if stop > start] or [(0, len(weights))]
+
+
+def _init_forked_worker(parser):
+    # the initializer arguments of a forked process are inherited, not pickled
+    global _WORKER_PARSER
+    _WORKER_PARSER = parser
+
+
+def _init_worker(html_content, parser_kwargs):
+    global _WORKER_PARSER
+    from .HTMLParser import HTMLParser
+    _WORKER_PARSER = HTMLParser(html_content, backend='lxml', **parser_kwargs)
+
+
+def _walk_part(start, stop, first, tag_types, count):
+    """
+    Walks one part of the document in a worker process.
+
+    Returns:
+        tuple: The texts, style ids and tag masks of the rows, the style values registered by the part (without
+               the unstyled style 0) and the counters of the walk.
+    """
+    parser = _WORKER_PARSER
+    parser.tag_types = tag_types
+    parser.stats = Stats('parser') if count else None
+    _, tag_labels = parser._tag_bits()
+    parser.data = RowBuilder(wide_masks=len(tag_labels) > 64)
+
+    events = ParserBackend.iter_children_events(parser.body, start, stop, first, **parser._pruning())
+    if count:
+        events = parser._count_events(events, parser.stats)
+    data = parser.data
+    for row in parser._iter_rows(events):
+        data.append(*row)
+
+    counters = dict(parser.stats.counters) if count else {}
+    if count and not first:
+        # the wrapping <body> is counted once, by the first part
+        counters['nodes'] -= 1
+    return data.text, data.style_ids, data.tag_masks, data.style_values[1:], counters
+
+
+def _parser_kwargs(parser):
+    # the options a worker needs to walk like the parser, the style cache stays per process
+    return {'prune_rules': parser.prune_rules}
+
+
+def walk_parallel(parser, workers, parts=None, fork=None):
+    """
+    Walks the document of an 'lxml' HTMLParser on a process pool into `parser.data`.
+
+    Duplicate rows are removed after the parts are stitched, so deduplication sees the rows in document order.
+
+    Args:
+        parser (HTMLParser): The parser, its `data` is replaced by the stitched rows.
+        workers (int): The number of worker processes.
+        parts (int, optional): The number of parts, defaults to PARTS_PER_WORKER per worker.
+        fork (bool, optional): Whether to fork the workers from this process, only honoured on Linux. Defaults to
+            `parser.PARALLEL_FORK`.
+
+    Returns:
+        int: The number of parts walked.
+    """
+    body = parser.body
+    ranges = split_children(body, parts or workers * PARTS_PER_WORKER)
+    tag_types = dict(parser.tag_types)
+    count = parser.stats is not None
+
+    if fork is None:
+        fork = parser.PARALLEL_FORK
+    if fork and sys.platform.startswith('linux'):
+        context, initializer, initargs = multiprocessing.get_context('fork'), _init_forked_worker, (parser,)
+    else:
+        # spawned, not forked: the default start method of Linux would fork anyway
+        context = multiprocessing.get_context('spawn')
+        initializer, initargs = _init_worker, (parser.html_content, _parser_kwargs(parser))
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context, initializer=initializer,
+                             initargs=initargs) as executor:
+        futures = [executor.submit(_walk_part, start, stop, index == 0, tag_types, count)
+                   for index, (start, stop) in enumerate(ranges)]
+        results = [future.result() for future in futures]
+
+    _, tag_labels = parser._tag_bits()
+    data = RowBuilder(wide_masks=len(tag_labels) > 64)
+    for texts, style_ids, tag_masks, style_values, counters in results:
+        # the style ids of the part follow the styles of the parts before it, the unstyled style 0 is shared
+        offset = len(data.style_values) - 1
+        data.style_values.extend(style_values)
+        data.text.extend(texts)
+        if offset and len(style_ids):
+            ids = np.frombuffer(style_ids, dtype=np.int64)
+            data.style_ids.frombytes(np.where(ids > 0, ids + offset, 0).astype(np.int64).tobytes())
+        else:
+            data.style_ids.extend(style_ids)
+        data.tag_masks.extend(tag_masks)
+        for name, value in counters.items():
+            parser.stats.count(name, value)
+
+    if parser.dedupe is not None:
+        rows = zip(data.text, data.style_ids, data.tag_masks)
+        kept = RowBuilder(wide_masks=isinstance(data.tag_masks, list))
+        kept.style_values = data.style_values
+        for row in parser._dedupe_rows(rows):
+            kept.append(*row)
+        data = kept
+
+    parser.data = data
+    return len(ranges)
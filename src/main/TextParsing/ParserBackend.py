@@ -0,0 +1,418 @@
+"""
+Event sources for the HTMLParser backends.
+
+Every backend turns the document into the same flat stream of events, which HTMLParser walks with a
+single iterative style and tag resolution loop:
+
+    (START, tag_name, attrs)   attrs is a dict, the 'class' value is already split into a list
+    (TEXT, text)               a raw (unstripped) text node or comment
+    (END,)                     closes the most recent START
+    (STYLE, css_text)          the content of a <style> element (stream backend only)
+
+Every iterator takes a `prune(tag_name, attrs)` callback: an element for which it returns True is skipped with its
+whole subtree, no event is yielded for it (the STYLE events of the stream backend excepted). With instrumentation
+enabled, `on_pruned(nodes, rows)` is called once per skipped subtree with the number of its elements and text rows.
+"""
+START, TEXT, END, STYLE = 0, 1, 2, 3
+
+_END_EVENT = (END,)
+
+# libxml2 stops parsing at this element depth, huge_tree or not, and keeps whatever it built so far
+_DEPTH_ERROR = ('The document is nested deeper than libxml2 allows ({} levels), '
+                "parse it with the 'bs4' backend instead")
+MAX_DEPTH = 2048
+
+
+def _import_etree():
+    try:
+        from lxml import etree
+    except ImportError as e:
+        raise ImportError("The 'lxml' and 'stream' backends require lxml, install it with `pip install lxml`") from e
+    return etree
+
+
+def _to_bytes(html_content):
+    # lxml refuses str input carrying an encoding declaration, so always feed utf-8 bytes
+    if isinstance(html_content, str):
+        return html_content.encode('utf-8')
+    return html_content
+
+
+def _attrs(element):
+    attrs = dict(element.attrib)
+    if 'class' in attrs:
+        attrs['class'] = attrs['class'].split()
+    return attrs
+
+
+def _count_subtree(events):
+    # the elements and text rows of a skipped subtree, only walked while instrumentation is enabled
+    nodes = rows = 0
+    for event in events:
+        kind = event[0]
+        if kind == START:
+            nodes += 1
+            rows += 'data-list-text' in event[2]
+        elif kind == TEXT:
+            rows += bool(event[1].strip())
+    return nodes, rows
+
+
+def iter_soup_events(tag, prune=None, on_pruned=None):
+    """
+    Walks a BeautifulSoup tag depth first and yields START / TEXT / END events.
+
+    Args:
+        tag (bs4.Tag): The tag to walk, usually the <body>.
+        prune (callable, optional): Whether to skip an element and its subtree, see the module docstring.
+        on_pruned (callable, optional): Called with the counts of each skipped subtree.
+
+    Yields:
+        tuple: The events described in the module docstring.
+    """
+    from bs4 import NavigableString, Tag
+
+    if prune is not None and prune(tag.name, tag.attrs):
+        if on_pruned is not None:
+            on_pruned(*_count_subtree(iter_soup_events(tag)))
+        return
+    yield (START, tag.name, tag.attrs)
+    # explicit stack of children iterators so deep documents cannot hit the recursion limit
+    stack = [iter(tag.contents)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            yield _END_EVENT
+        elif isinstance(child, NavigableString):
+            yield (TEXT, child)
+        elif isinstance(child, Tag):
+            if prune is not None and prune(child.name, child.attrs):
+                if on_pruned is not None:
+                    on_pruned(*_count_subtree(iter_soup_events(child)))
+                continue
+            yield (START, child.name, child.attrs)
+            stack.append(iter(child.contents))
+
+
+def parse_lxml(html_content):
+    """
+    Builds an lxml (libxml2) tree of the HTML document.
+
+    Args:
+        html_content (str or bytes): The HTML document.
+
+    Returns:
+        lxml.etree._Element: The root element, or None if the document is empty.
+
+    Raises:
+        ValueError: The document is nested deeper than `MAX_DEPTH`, libxml2 would silently drop the rest of it.
+    """
+    etree = _import_etree()
+    parser = etree.HTMLParser(encoding='utf-8', huge_tree=True)
+    root = etree.fromstring(_to_bytes(html_content), parser)
+    if any(error.type_name == 'ERR_RESOURCE_LIMIT' for error in parser.error_log):
+        raise ValueError(_DEPTH_ERROR.format(MAX_DEPTH))
+    return root
+
+
+def find_stylesheets(root):
+    """
+    Returns the text of every <style> element of an lxml tree, in document order.
+    """
+    if root is None:
+        return []
+    return [style.text or '' for style in root.iter('style')]
+
+
+def find_body(root):
+    """
+    Returns the <body> element of an lxml tree, or the root itself when there is no body.
+    """
+    if root is None:
+        return None
+    return next(root.iter('body'), root)
+
+
+def iter_tree_events(element, prune=None, on_pruned=None):
+    """
+    Walks an lxml element depth first and yields START / TEXT / END events.
+
+    Args:
+        element (lxml.etree._Element): The element to walk, usually the <body>.
+        prune (callable, optional): Whether to skip an element and its subtree, see the module docstring.
+        on_pruned (callable, optional): Called with the counts of each skipped subtree.
+
+    Yields:
+        tuple: The events described in the module docstring.
+    """
+    if element is None:
+        return
+    etree = _import_etree()
+    Comment, ProcessingInstruction = etree.Comment, etree.ProcessingInstruction
+
+    attrs = _attrs(element)
+    if prune is not None and prune(element.tag, attrs):
+        if on_pruned is not None:
+            on_pruned(*_count_subtree(iter_tree_events(element)))
+        return
+    yield (START, element.tag, attrs)
+    if element.text:
+        yield (TEXT, element.text)
+
+    # explicit stack of (element, children iterator) so deep documents cannot hit the recursion limit
+    stack = [(element, iter(element))]
+    while stack:
+        child = next(stack[-1][1], None)
+        if child is None:
+            closed, _ = stack.pop()
+            yield _END_EVENT
+            if stack and closed.tail:
+                yield (TEXT, closed.tail)
+            continue
+
+        if child.tag is Comment or child.tag is ProcessingInstruction:
+            if child.text:
+                yield (TEXT, child.text)
+            if child.tail:
+                yield (TEXT, child.tail)
+            continue
+
+        attrs = _attrs(child)
+        if prune is not None and prune(child.tag, attrs):
+            if on_pruned is not None:
+                on_pruned(*_count_subtree(iter_tree_events(child)))
+            # the tail follows the element, it is not part of the subtree
+            if child.tail:
+                yield (TEXT, child.tail)
+            continue
+        yield (START, child.tag, attrs)
+        if child.text:
+            yield (TEXT, child.text)
+        stack.append((child, iter(child)))
+
+
+def iter_children_events(element, start, stop, first=True, prune=None, on_pruned=None):
+    """
+    Walks a slice of the children of an lxml element, wrapped in the START / END events of the element itself.
+
+    The events of consecutive slices, without their wrapping events, concatenate to the events of `iter_tree_events`,
+    and the wrapping START carries the element's attributes, so each slice is walked with the styles and tags it
+    inherits from the element.
+
+    Args:
+        element (lxml.etree._Element): The element whose children are walked, usually the <body>.
+        start (int): The index of the first child.
+        stop (int): The index after the last child.
+        first (bool, optional): Whether this is the first slice, which also carries the text before the first child
+            and the data-list-text row of the element. Defaults to True.
+        prune (callable, optional): Whether to skip an element and its subtree, see the module docstring.
+        on_pruned (callable, optional): Called with the counts of each skipped subtree.
+
+    Yields:
+        tuple: The events described in the module docstring.
+    """
+    etree = _import_etree()
+    Comment, ProcessingInstruction = etree.Comment, etree.ProcessingInstruction
+
+    attrs = _attrs(element)
+    if prune is not None and prune(element.tag, attrs):
+        # every slice skips the whole element, the first one reports it
+        if first and on_pruned is not None:
+            on_pruned(*_count_subtree(iter_tree_events(element)))
+        return
+    if not first:
+        attrs.pop('data-list-text', None)
+    yield (START, element.tag, attrs)
+    if first and element.text:
+        yield (TEXT, element.text)
+
+    for child in element[start:stop]:
+        if child.tag is Comment or child.tag is ProcessingInstruction:
+            if child.text:
+                yield (TEXT, child.text)
+        else:
+            yield from iter_tree_events(child, prune, on_pruned)
+        if child.tail:
+            yield (TEXT, child.tail)
+    yield _END_EVENT
+
+
+def _iter_pieces(source, chunk_size):
+    if isinstance(source, (str, bytes)):
+        data = _to_bytes(source)
+        return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    return (_to_bytes(piece) for piece in source)
+
+
+def can_rescan(source):
+    """
+    Whether the source of `iter_stream_events` can be read twice: a whole document, or an iterable (not an iterator)
+    of pieces such as a list.
+    """
+    return isinstance(source, (str, bytes)) or iter(source) is not source
+
+
+class _StylesheetTarget:
+    # an lxml parser target collecting the text of the <style> elements, no tree is built
+    def __init__(self):
+        self.stylesheets = []
+        self._pieces = None
+
+    def start(self, tag, attrib):
+        if tag == 'style':
+            self._pieces = []
+
+    def end(self, tag):
+        if tag == 'style' and self._pieces is not None:
+            self.stylesheets.append(''.join(self._pieces))
+            self._pieces = None
+
+    def data(self, data):
+        if self._pieces is not None:
+            self._pieces.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self.stylesheets
+
+
+def scan_stylesheets(source, chunk_size=65536):
+    """
+    Returns the text of every <style> element of a document, in document order, without building its tree.
+
+    Args:
+        source (str, bytes or iterable): The whole document, or an iterable of str / bytes pieces.
+        chunk_size (int, optional): The piece size used when the whole document is given. Defaults to 65536.
+
+    Returns:
+        list: The stylesheets, the same as `find_stylesheets` of the lxml tree.
+    """
+    etree = _import_etree()
+    parser = etree.HTMLParser(target=_StylesheetTarget(), encoding='utf-8', huge_tree=True)
+    for piece in _iter_pieces(source, chunk_size):
+        parser.feed(piece)
+    try:
+        return parser.close()
+    except etree.XMLSyntaxError:
+        # nothing was fed, libxml2 refuses to close an empty document
+        return []
+
+
+def iter_stream_events(source, chunk_size=65536, styles=True, prune=None, on_pruned=None):
+    """
+    Incrementally parses the document with libxml2 and yields events for the <body> subtree.
+
+    Elements are discarded as soon as they have been emitted, so memory stays bounded by the nesting
+    depth rather than the document size. Stylesheets are reported through STYLE events as soon as
+    their <style> element closes, unless they were already collected by `scan_stylesheets`.
+
+    Args:
+        source (str, bytes or iterable): The whole document, or an iterable of str / bytes pieces.
+        chunk_size (int, optional): The piece size used when the whole document is given. Defaults to 65536.
+        styles (bool, optional): Whether to yield STYLE events. Defaults to True.
+        prune (callable, optional): Whether to skip an element and its subtree, see the module docstring. libxml2
+            still reads the subtree, its events are dropped up to the end of the element.
+        on_pruned (callable, optional): Called with the counts of each skipped subtree.
+
+    Yields:
+        tuple: The events described in the module docstring.
+
+    Raises:
+        ValueError: The document is nested deeper than `MAX_DEPTH`, libxml2 would silently drop the rest of it.
+    """
+    etree = _import_etree()
+    parser = etree.HTMLPullParser(events=('start', 'end', 'comment'), encoding='utf-8', huge_tree=True)
+
+    pieces = _iter_pieces(source, chunk_size)
+
+    Comment = etree.Comment
+    depth = 0  # the open elements, libxml2 closes them all unless it gave up on the document
+    body_depth = 0  # > 0 while inside <body>
+    skip_depth = 0  # > 0 while inside a pruned subtree
+    pruned_nodes = pruned_rows = 0
+    # the node whose text (pending_is_text) or tail has to be emitted before the next event
+    pending, pending_is_text = None, False
+
+    def flush():
+        if pending is None:
+            return None
+        return pending.text if pending_is_text else pending.tail
+
+    def release(element):
+        # drop the finished element and any finished siblings before it
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+    def drain():
+        nonlocal depth, body_depth, skip_depth, pruned_nodes, pruned_rows, pending, pending_is_text
+        for event, element in parser.read_events():
+            if body_depth:
+                text = flush()
+                if text:
+                    if not skip_depth:
+                        yield (TEXT, text)
+                    elif on_pruned is not None:
+                        pruned_rows += bool(text.strip())
+                if pending is not None and not pending_is_text and pending.tag is not Comment:
+                    release(pending)
+
+            if event == 'comment':
+                if body_depth:
+                    if element.text:
+                        if not skip_depth:
+                            yield (TEXT, element.text)
+                        elif on_pruned is not None:
+                            pruned_rows += bool(element.text.strip())
+                    pending, pending_is_text = element, False
+                continue
+
+            if event == 'start':
+                depth += 1
+                if body_depth or element.tag == 'body':
+                    body_depth += 1
+                    if skip_depth:
+                        skip_depth += 1
+                        pruned_nodes += 1
+                        pruned_rows += element.get('data-list-text') is not None
+                    else:
+                        attrs = _attrs(element)
+                        if prune is not None and prune(element.tag, attrs):
+                            skip_depth = 1
+                            pruned_nodes, pruned_rows = 1, int('data-list-text' in attrs)
+                        else:
+                            yield (START, element.tag, attrs)
+                    pending, pending_is_text = element, True
+            else:
+                depth -= 1
+                if styles and element.tag == 'style':
+                    # stylesheets apply to the whole document, pruned or not
+                    yield (STYLE, element.text or '')
+                if body_depth:
+                    body_depth -= 1
+                    if skip_depth:
+                        skip_depth -= 1
+                        if not skip_depth and on_pruned is not None:
+                            on_pruned(pruned_nodes, pruned_rows)
+                    else:
+                        yield _END_EVENT
+                    # the tail follows the element, it is emitted even when the element was pruned
+                    pending, pending_is_text = (element, False) if body_depth else (None, False)
+
+    for piece in pieces:
+        parser.feed(piece)
+        yield from drain()
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        # nothing was fed, an empty document has no events
+        return
+    yield from drain()
+    if depth:
+        # the pull parser does not log the error, it only stops reporting events
+        raise ValueError(_DEPTH_ERROR.format(MAX_DEPTH))
@@ -0,0 +1,571 @@
+"""
+A resident parsing service: parse and chunk endpoints over HTTP, on localhost or a Unix socket.
+
+The service imports pandas, bs4 and lxml once, keeps the process wide style and font size caches warm across requests
+and hands the requests to a pool of worker processes in batches. Every request builds its own HTMLParser and
+TextChunker, so no parse state is shared between requests.
+
+Usage (from the repository root):
+    python -m src.main.TextParsing.ParsingService --port 8765 --workers 2
+    python -m src.main.TextParsing.ParsingService --unix-socket /tmp/html-text-parser.sock
+
+Endpoints (JSON in, JSON out):
+    POST /parse   {"html": "...", "parser": {"backend": "lxml"}, "format": "columns" or "text"}
+    POST /chunk   {"html": "...", "parser": {...}, "chunk": {"cutoff": 7, ...}, "records": false}
+    GET  /stats   the latency percentiles of each endpoint and the batching counters
+    GET  /health
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .Instrumentation import LatencyRecorder
+from .Score import Score
+
+# a small document parsed by every worker on start, it loads the lazily imported modules and fills the caches
+_WARM_UP_HTML = ('<html><head><style>.title { font-size: 18pt; font-weight: bold }</style></head>'
+                 '<body><h1 class="title">Title</h1><p>Text <b>bold</b></p></body></html>')
+
+
+class ParseEngine:
+    """
+    Stateless parse and chunk engine, safe to share between threads.
+
+    Every call builds its own HTMLParser and TextChunker, the only state shared between calls is the process wide
+    style cache and font size resolvers, which are thread safe. Only JSON options are accepted: the parser options
+    of `PARSER_OPTIONS` (fetching a URL is not possible) and the chunk options of `CHUNK_OPTIONS`.
+
+    Args:
+        score_dict (dict, optional): The scoring system of the chunker, see `Score.ScoreDict`.
+    """
+    PARSER_OPTIONS = ('backend', 'dedupe')
+    CHUNK_OPTIONS = ('cutoff', 'auto_adjust_cutoff', 'refine', 'sel_metric', 'lower_bound', 'upper_bound', 'split_oversized')
+    FORMATS = ('columns', 'text')
+
+    def __init__(self, score_dict=Score.ScoreDict):
+        self.score_dict = score_dict
+
+    @staticmethod
+    def _options(options, allowed, kind):
+        options = options or {}
+        if not isinstance(options, dict):
+            raise ValueError(f'Invalid {kind} options: {options!r}, expected an object')
+        unknown = sorted(set(options) - set(allowed))
+        if unknown:
+            raise ValueError(f'Invalid {kind} options: {unknown}, acceptable options are {list(allowed)}')
+        return options
+
+    def _parser(self, html, parser):
+        from .HTMLParser import HTMLParser
+        if not isinstance(html, str):
+            raise ValueError('Invalid html input: expected a string')
+        return HTMLParser(html, **self._options(parser, self.PARSER_OPTIONS, 'parser'))
+
+    def parse(self, html, parser=None, format='columns'):
+        """
+        Parses a document.
+
+        Returns:
+            dict: {'rows': n, 'columns': {column: values}} for the 'columns' format, {'rows': n, 'text': str} for 'text'.
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f'Invalid format input: {format}, acceptable values are {list(self.FORMATS)}')
+        html_parser = self._parser(html, parser)
+        if format == 'text':
+            texts = html_parser.parse_text()
+            return {'rows': len(texts), 'text': ' '.join(texts)}
+        df = html_parser.parse()
+        return {'rows': len(df), 'columns': df.to_dict(orient='list')}
+
+    def chunk(self, html, parser=None, chunk=None, records=False):
+        """
+        Parses and chunks a document.
+
+        Returns:
+            dict: {'chunks': [text, ...]}, or with `records` {'chunks': [record, ...]} with the fields of
+                  `ChunkSink.FIELDS` (without the document id).
+        """
+        from .TextChunker import TextChunker
+        from .ChunkSink import ChunkSink
+        chunk = self._options(chunk, self.CHUNK_OPTIONS, 'chunk')
+        chunker = TextChunker(self._parser(html, parser).parse_compact(), score_dict=self.score_dict)
+        if not records:
+            return {'chunks': chunker.chunk_text(**chunk)}
+        views = chunker.chunk_text(as_views=True, **chunk)
+        chunks = list(ChunkSink.chunk_records(None, views))
+        for record in chunks:
+            del record['document_id']
+        return {'chunks': chunks}
+
+    def handle(self, endpoint, request):
+        """
+        Runs one request and encodes its response.
+
+        Args:
+            endpoint (str): 'parse' or 'chunk'.
+            request (dict): The decoded JSON body.
+
+        Returns:
+            tuple: The HTTP status and the JSON encoded response body. Invalid requests give 400, failures 500.
+        """
+        try:
+            if not isinstance(request, dict):
+                raise ValueError('Invalid request: expected a JSON object')
+            options = {key: value for key, value in request.items() if key != 'html'}
+            if endpoint == 'parse':
+                response = self.parse(request.get('html'), **self._options(options, ('parser', 'format'), 'request'))
+            elif endpoint == 'chunk':
+                response = self.chunk(request.get('html'), **self._options(options, ('parser', 'chunk', 'records'), 'request'))
+            else:
+                raise ValueError(f'Invalid endpoint: {endpoint}')
+            return 200, json.dumps(response, ensure_ascii=False).encode('utf-8')
+        except ValueError as e:
+            return 400, json.dumps({'error': str(e)}).encode('utf-8')
+        except Exception as e:
+            return 500, json.dumps({'error': f'{type(e).__name__}: {e}'}).encode('utf-8')
+
+    def warm_up(self):
+        """
+        Imports the parsing modules and fills the caches with a small document.
+        """
+        self.chunk(_WARM_UP_HTML)
+        self.parse(_WARM_UP_HTML)
+
+
+# the engine of the current worker process, built once by `_init_worker`
+_WORKER_ENGINE = None
+
+
+def _init_worker(score_dict):
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = ParseEngine(score_dict)
+    _WORKER_ENGINE.warm_up()
+
+
+def _run_batch(items):
+    # one task per batch, the documents of the batch share the cost of one round trip to the worker
+    return [_WORKER_ENGINE.handle(endpoint, request) for endpoint, request in items]
+
+
+class RequestBatcher:
+    """
+    Groups concurrent requests into batches run by a pool of worker processes.
+
+    A dispatcher thread takes the first waiting request and waits until fewer than two batches per worker are in
+    flight. It then collects the requests queued meanwhile or arriving within `max_wait` seconds, up to `max_batch` of
+    them, and sends them to a worker as one task. Waiting requests are held in a queue of at most `max_pending`.
+
+    A worker process that dies (a crash or the out of memory killer on one bad document) breaks the pool. The pool is
+    then replaced by warm new workers, and each request of the batches that were in flight runs again alone in a
+    fresh single worker pool: the one that breaks it again fails with 500, the others complete normally, as in
+    `BatchProcessor.iter_corpus`.
+
+    Args:
+        workers (int, optional): The number of worker processes, 0 to run the batches in one thread of this process.
+            Defaults to 1.
+        max_batch (int, optional): The maximum number of requests of a batch. Defaults to 16.
+        max_wait (float, optional): Seconds a batch waits for more requests. Defaults to 0.002.
+        max_pending (int, optional): The maximum number of queued requests, `submit` raises queue.Full beyond it.
+            Defaults to 1024.
+        score_dict (dict, optional): The scoring system of the chunker, see `Score.ScoreDict`.
+    """
+    def __init__(self, workers=1, max_batch=16, max_wait=0.002, max_pending=1024, score_dict=Score.ScoreDict):
+        if workers < 0 or max_batch < 1:
+            raise ValueError(f'Invalid batcher input: {workers}, {max_batch}')
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self.restarts = 0
+        self._score_dict = score_dict
+        self._restart_lock = threading.Lock()
+
+        if workers:
+            self._executor = self._start_workers(workers)
+        else:
+            _init_worker(score_dict)
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue = queue.Queue(max_pending)
+        self._in_flight = threading.BoundedSemaphore(2 * max(workers, 1))
+        self._dispatcher = threading.Thread(target=self._dispatch, name='RequestBatcher', daemon=True)
+        self._dispatcher.start()
+
+    def _start_workers(self, workers):
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self._score_dict,))
+        # start and warm up the workers now rather than on the first requests
+        for task in [executor.submit(_run_batch, []) for _ in range(workers)]:
+            task.result()
+        return executor
+
+    def _restart(self, broken):
+        """
+        Replaces the broken pool by warm new workers, unless another thread already did.
+        """
+        with self._restart_lock:
+            if self._executor is broken:
+                self._executor = self._start_workers(self.workers)
+                self.restarts += 1
+                broken.shutdown(wait=False)
+            return self._executor
+
+    def _retry_alone(self, broken, batch):
+        # runs in its own thread, the callback of the broken task must not wait for new workers
+        self._restart(broken)
+        for endpoint, request, future in batch:
+            with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self._score_dict,)) as executor:
+                try:
+                    future.set_result(executor.submit(_run_batch, [(endpoint, request)]).result()[0])
+                except BrokenProcessPool:
+                    error = 'BrokenProcessPool: the worker process terminated abruptly on this document'
+                    future.set_result((500, json.dumps({'error': error}).encode('utf-8')))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def submit(self, endpoint, request):
+        """
+        Queues one request.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the (status, body) of `ParseEngine.handle`.
+
+        Raises:
+            queue.Full: If `max_pending` requests are already waiting.
+        """
+        future = Future()
+        self._queue.put_nowait((endpoint, request, future))
+        return future
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # wait for a free worker first, the requests arriving meanwhile join the batch
+            self._in_flight.acquire()
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # stop after this batch
+                    break
+                batch.append(item)
+
+            self.batches += 1
+            self.requests += len(batch)
+            items = [(endpoint, request) for endpoint, request, _ in batch]
+            executor = self._executor
+            try:
+                try:
+                    task = executor.submit(_run_batch, items)
+                except BrokenProcessPool:
+                    # a worker died since the last batch, none of these requests has run yet
+                    executor = self._restart(executor)
+                    task = executor.submit(_run_batch, items)
+            except Exception as e:
+                self._in_flight.release()
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            task.add_done_callback(lambda task, batch=batch, executor=executor: self._resolve(task, batch, executor))
+
+    def _resolve(self, task, batch, executor):
+        self._in_flight.release()
+        try:
+            results = task.result()
+        except BrokenProcessPool:
+            # a worker died on this batch or another one, find out which request it was
+            threading.Thread(target=self._retry_alone, args=(executor, batch), name='RequestBatcher-retry', daemon=True).start()
+            return
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {'workers': self.workers, 'batches': self.batches, 'requests': self.requests,
+                'mean_batch': self.requests / self.batches if self.batches else 0.0, 'pending': self._queue.qsize(),
+                'restarts': self.restarts}
+
+    def close(self):
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive connections
+
+    def address_string(self):
+        # the client address of a Unix socket is an empty string
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.service.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, response):
+        self._send(status, json.dumps(response).encode('utf-8'))
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'restarts': service.batcher.restarts})
+        elif self.path == '/stats':
+            self._send_json(200, service.stats())
+        else:
+            self._send_json(404, {'error': f'Unknown path: {self.path}'})
+
+    def _content_length(self):
+        """
+        Returns the length of the request body, or None once the error response is sent: 411 without a Content-Length
+        header, 400 if it is not a non-negative integer, 413 above `max_body`. The connection is then closed, as the
+        end of the body is unknown or the body is not read.
+        """
+        max_body = self.server.service.max_body
+        value = self.headers.get('Content-Length')
+        if value is None:
+            status, error = 411, 'The Content-Length header is required'
+        elif not (value.strip().isascii() and value.strip().isdigit()):
+            status, error = 400, f'Invalid Content-Length: {value!r}'
+        elif int(value) > max_body:
+            status, error = 413, f'The body exceeds {max_body} bytes'
+        else:
+            return int(value)
+        self.close_connection = True
+        self._send_json(status, {'error': error})
+        return None
+
+    def do_POST(self):
+        service = self.server.service
+        start = time.perf_counter()
+        endpoint = self.path.strip('/')
+        length = self._content_length()
+        if length is None:
+            return
+        if endpoint not in ('parse', 'chunk'):
+            self.rfile.read(length)
+            self._send_json(404, {'error': f'Unknown path: {self.path}'})
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._send_json(400, {'error': f'Invalid JSON: {e}'})
+            return
+
+        try:
+            status, body = service.batcher.submit(endpoint, request).result(timeout=service.request_timeout)
+        except queue.Full:
+            status, body = 503, json.dumps({'error': 'Too many pending requests'}).encode('utf-8')
+        except TimeoutError:
+            error = f'No result within {service.request_timeout} seconds'
+            status, body = 504, json.dumps({'error': error}).encode('utf-8')
+        except Exception as e:
+            status, body = 500, json.dumps({'error': f'{type(e).__name__}: {e}'}).encode('utf-8')
+        service.latency.record(endpoint, time.perf_counter() - start)
+        self._send(status, body)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ParsingService:
+    """
+    The resident parse / chunk service, see the module docstring for the endpoints.
+
+    Args:
+        host (str, optional): The address to listen on. Defaults to '127.0.0.1'.
+        port (int, optional): The port to listen on, 0 for any free port. Defaults to 8765.
+        unix_socket (str, optional): The path of a Unix socket to listen on instead of host and port.
+        workers (int, optional): The number of worker processes, 0 to parse in this process. Defaults to 1.
+        max_batch (int, optional): The maximum number of requests sent to a worker at once. Defaults to 16.
+        max_wait (float, optional): Seconds a batch waits for more requests. Defaults to 0.002.
+        max_body (int, optional): The maximum request size in bytes. Defaults to 64 MB.
+        request_timeout (float, optional): Seconds a request waits for its result before a 504. Defaults to 60.
+        verbose (bool, optional): Whether to log every request to stderr. Defaults to False.
+    """
+    def __init__(self, host='127.0.0.1', port=8765, unix_socket=None, workers=1, max_batch=16, max_wait=0.002,
+                 max_body=64 << 20, request_timeout=60, verbose=False):
+        self.unix_socket = unix_socket
+        self.max_body = max_body
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+        self.latency = LatencyRecorder()
+        self.started = time.time()
+
+        # bind first, a port in use must not leave worker processes behind
+        if unix_socket is not None:
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            self.server = _UnixHTTPServer(unix_socket, _RequestHandler)
+        else:
+            self.server = ThreadingHTTPServer((host, port), _RequestHandler)
+            self.server.daemon_threads = True
+        self.server.service = self
+        self._thread = None
+
+        try:
+            self.batcher = RequestBatcher(workers=workers, max_batch=max_batch, max_wait=max_wait)
+        except BaseException:
+            self.server.server_close()
+            if unix_socket is not None and os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            raise
+
+    @property
+    def address(self):
+        """
+        The URL of the service, or the path of its Unix socket.
+        """
+        if self.unix_socket is not None:
+            return self.unix_socket
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def stats(self):
+        return {'uptime': time.time() - self.started, 'latency': self.latency.to_dict(), 'batching': self.batcher.stats()}
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        """
+        Serves in a background thread and returns the service.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name='ParsingService', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+        self.server.server_close()
+        self.batcher.close()
+        if self.unix_socket is not None and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class ServiceClient:
+    """
+    A client of the ParsingService over one keep-alive connection, not shared between threads.
+
+    Args:
+        address (str): The URL of the service (http://host:port) or the path of its Unix socket.
+        timeout (float, optional): Seconds allowed for one request. Defaults to 60.
+    """
+    def __init__(self, address, timeout=60):
+        if address.startswith('http://'):
+            host_port = address[len('http://'):].rstrip('/')
+            host, _, port = host_port.partition(':')
+            self.connection = http.client.HTTPConnection(host, int(port or 80), timeout=timeout)
+        else:
+            self.connection = _UnixHTTPConnection(address, timeout=timeout)
+
+    def request(self, method, path, payload=None):
+        """
+        Returns:
+            tuple: The HTTP status and the decoded JSON response.
+        """
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def _post(self, path, payload):
+        status, response = self.request('POST', path, payload)
+        if status != 200:
+            raise ValueError(f'{path} failed with {status}: {response.get("error")}')
+        return response
+
+    def parse(self, html, parser=None, format='columns'):
+        return self._post('/parse', {'html': html, 'parser': parser or {}, 'format': format})
+
+    def chunk(self, html, parser=None, records=False, **chunk):
+        return self._post('/chunk', {'html': html, 'parser': parser or {}, 'chunk': chunk, 'records': records})['chunks']
+
+    def stats(self):
+        return self.request('GET', '/stats')[1]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Serve parse and chunk requests.')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--unix-socket', help='listen on this Unix socket instead of host and port')
+    arg_parser.add_argument('--workers', type=int, default=1, help='worker processes, 0 to parse in the server process')
+    arg_parser.add_argument('--max-batch', type=int, default=16)
+    arg_parser.add_argument('--max-wait', type=float, default=0.002, help='seconds a batch waits for more requests')
+    arg_parser.add_argument('--request-timeout', type=float, default=60, help='seconds before a request fails with 504')
+    arg_parser.add_argument('--verbose', action='store_true')
+    args = arg_parser.parse_args(argv)
+
+    service = ParsingService(host=args.host, port=args.port, unix_socket=args.unix_socket, workers=args.workers,
+                             max_batch=args.max_batch, max_wait=args.max_wait, request_timeout=args.request_timeout,
+                             verbose=args.verbose)
+    print(f'serving on {service.address} with {args.workers} workers', file=sys.stderr)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
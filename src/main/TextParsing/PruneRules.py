@@ -0,0 +1,96 @@
+import json
+import re
+from .StyleCache import DEFAULT_STYLE_CACHE
+
+def _compile_patterns(patterns):
+    patterns = list(patterns or ())
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+
+class PruneRules:
+    """
+    The subtrees HTMLParser skips, compiled once and checked once per element.
+
+    An element is pruned when its tag name is in `tags`, one of its classes or its id matches a pattern, or (with
+    `hidden`) it carries the `hidden` attribute or an inline `display: none` / `visibility: hidden`. A pruned element
+    and everything below it produce no rows and no styles. Stylesheets inside a pruned subtree still apply.
+
+    Args:
+        tags (iterable, optional): The tag names to prune. Defaults to ('script',), the behavior of the parser
+                                   before the rules were configurable.
+        class_patterns (iterable, optional): Regular expressions searched in every class name, case insensitive.
+        id_patterns (iterable, optional): Regular expressions searched in the id attribute, case insensitive.
+        hidden (bool, optional): Whether to prune the elements hidden by an attribute or inline style. Defaults to False.
+    """
+    def __init__(self, tags=('script',), class_patterns=(), id_patterns=(), hidden=False):
+        self.tags = frozenset(tag.lower() for tag in tags)
+        self.class_patterns = tuple(class_patterns)
+        self.id_patterns = tuple(id_patterns)
+        self.hidden = hidden
+        self._class_regex = _compile_patterns(self.class_patterns)
+        self._id_regex = _compile_patterns(self.id_patterns)
+        # whether the attributes of an element have to be looked at, the tag name check alone is a set lookup
+        self.checks_attributes = bool(self._class_regex or self._id_regex or hidden)
+
+    def matches(self, name, attrs, style_cache=DEFAULT_STYLE_CACHE):
+        """
+        Returns:
+            bool: Whether the element `name` with the attributes `attrs` (the class value split into a list) is pruned.
+        """
+        if name in self.tags:
+            return True
+        if not self.checks_attributes:
+            return False
+
+        if self._class_regex is not None:
+            classes = attrs.get('class')
+            if classes and any(self._class_regex.search(class_name) for class_name in classes):
+                return True
+        if self._id_regex is not None:
+            element_id = attrs.get('id')
+            if element_id and self._id_regex.search(element_id):
+                return True
+        if self.hidden:
+            if 'hidden' in attrs:
+                return True
+            tag_styles = attrs.get('style')
+            if tag_styles is not None:
+                for key, value in style_cache.inline(tag_styles).items():
+                    key = key.lower()
+                    if key == 'display' or key == 'visibility':
+                        value = value.split('!', 1)[0].strip().lower()
+                        if (key == 'display' and value == 'none') or (key == 'visibility' and value == 'hidden'):
+                            return True
+        return False
+
+    def cache_key(self):
+        """
+        Returns:
+            str: A stable description of the rules, part of the DocumentCache key when the rules are not the default.
+        """
+        return json.dumps([sorted(self.tags), self.class_patterns, self.id_patterns, self.hidden])
+
+    def __eq__(self, other):
+        return isinstance(other, PruneRules) and self.cache_key() == other.cache_key()
+
+    def __hash__(self):
+        return hash(self.cache_key())
+
+    def __repr__(self):
+        return (f'PruneRules(tags={sorted(self.tags)}, class_patterns={list(self.class_patterns)}, '
+                f'id_patterns={list(self.id_patterns)}, hidden={self.hidden})')
+
+
+# the rules of a parser that is not given any, only <script> is skipped
+DEFAULT_PRUNE_RULES = PruneRules()
+
+# page chrome of fetched web pages: non content tags, navigation, footers, banners and hidden elements
+BOILERPLATE_PRUNE_RULES = PruneRules(
+    tags=('script', 'style', 'noscript', 'template', 'head', 'title', 'meta', 'link', 'iframe', 'svg', 'canvas',
+          'nav', 'footer', 'aside', 'form', 'button', 'select'),
+    class_patterns=(r'(^|[-_])(nav|navbar|menu|footer|sidebar|breadcrumbs?|cookie|banner|advert|ads?|share|social|popup|modal)([-_]|$)',),
+    id_patterns=(r'(^|[-_])(nav|navbar|menu|footer|sidebar|breadcrumbs?|cookie|banner|advert|ads?)([-_]|$)',),
+    hidden=True
+)
@@ -0,0 +1,109 @@
+from array import array
+from .LazyModule import LazyModule
+from .CompactDocument import CompactDocument
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+class RowBuilder:
+    """
+    Columnar accumulator for the text rows extracted by HTMLParser.
+
+    Every row is stored as its text, an integer style id and an integer tag bitmask, appended to flat arrays.
+    The five style columns are dictionary encoded through the style table, and the tag bitmask replaces the
+    comma joined tag hierarchy. The DataFrame is built in one shot by `to_frame`.
+    """
+    STYLE_COLUMNS = ('font_family', 'font_size', 'font_weight', 'text_decoration', 'font_color')
+
+    def __init__(self, wide_masks=False):
+        self.text = []
+        self.style_ids = array('q')
+        # tag sets with more than 64 distinct types do not fit into a machine word
+        self.tag_masks = [] if wide_masks else array('Q')
+        # style id -> (font_family, font_size, font_weight, text_decoration, font_color), id 0 is the unstyled row
+        self.style_values = [('', '', '', '', '')]
+
+    def __len__(self):
+        return len(self.text)
+
+    def add_style(self, values):
+        """
+        Registers the five style values of a new style and returns its id.
+        """
+        self.style_values.append(values)
+        return len(self.style_values) - 1
+
+    def append(self, text, style_id, tag_mask):
+        self.text.append(text)
+        self.style_ids.append(style_id)
+        self.tag_masks.append(tag_mask)
+
+    def _style_codes(self, position):
+        # dictionary encode one style column over the style table
+        categories = {}
+        codes = np.fromiter(
+            (categories.setdefault(values[position], len(categories)) for values in self.style_values),
+            dtype=np.int32, count=len(self.style_values)
+        )
+        return codes, list(categories)
+
+    def to_compact(self, tag_labels):
+        """
+        Builds the compact form of the parsed rows, one style table entry per distinct style and tag set.
+
+        Args:
+            tag_labels (list): The simplified tag name of each bit of the tag masks.
+
+        Returns:
+            CompactDocument: The texts, the style id of each row and the style table.
+        """
+        style_ids = np.frombuffer(self.style_ids, dtype=np.int64) if len(self.style_ids) else np.zeros(0, dtype=np.int64)
+
+        # intern the distinct (style id, tag mask) pairs
+        if isinstance(self.tag_masks, list):
+            pairs = {}
+            row_style_ids = np.fromiter(
+                (pairs.setdefault(pair, len(pairs)) for pair in zip(style_ids.tolist(), self.tag_masks)),
+                dtype=np.int32, count=len(style_ids)
+            )
+            unique_pairs = list(pairs)
+        else:
+            masks = np.frombuffer(self.tag_masks, dtype=np.uint64) if len(self.tag_masks) else np.zeros(0, dtype=np.uint64)
+            shift = int(masks.max()).bit_length() if len(masks) else 0
+            if shift + (len(self.style_values) - 1).bit_length() <= 64:
+                # both fit into one word, the pairs are interned with a one dimensional unique
+                keys = (style_ids.astype(np.uint64) << np.uint64(shift)) | masks
+                unique, inverse = np.unique(keys, return_inverse=True)
+                unique_pairs = [(key >> shift, key & ((1 << shift) - 1)) for key in unique.tolist()]
+            else:
+                unique, inverse = np.unique(np.column_stack((style_ids.astype(np.uint64), masks)), axis=0, return_inverse=True)
+                unique_pairs = [(int(style_id), int(mask)) for style_id, mask in unique]
+            row_style_ids = inverse.reshape(-1).astype(np.int32)
+
+        unique_style_ids = np.array([style_id for style_id, _ in unique_pairs], dtype=np.int64)
+        styles = {}
+        for position, column in enumerate(self.STYLE_COLUMNS):
+            codes, categories = self._style_codes(position)
+            styles[column] = pd.Categorical.from_codes(codes[unique_style_ids], categories=categories)
+
+        # each distinct tag set is spelled out once
+        spelled = {}
+        for _, mask in unique_pairs:
+            if mask not in spelled:
+                spelled[mask] = ', '.join(label for bit, label in enumerate(tag_labels) if mask >> bit & 1)
+        styles['tags'] = np.array([spelled[mask] for _, mask in unique_pairs], dtype=object)
+
+        return CompactDocument(pd.Series(self.text, dtype=object), row_style_ids, pd.DataFrame(styles))
+
+    def to_frame(self, tag_labels):
+        """
+        Builds the parsed DataFrame.
+
+        Args:
+            tag_labels (list): The simplified tag name of each bit of the tag masks.
+
+        Returns:
+            pandas.DataFrame: The columns text_content, font_family, font_size, font_weight, text_decoration,
+                              font_color (categorical) and tags (comma separated simplified tags).
+        """
+        return self.to_compact(tag_labels).to_frame()
@@ -0,0 +1,197 @@
+import os
+from .HTMLParser import HTMLParser
+from .TextChunker import TextChunker
+from .ChunkRefiner import ChunkRefiner
+from .Score import Score
+from .Tokenizer import get_tokenizer
+
+def _iter_source(source, chunk_size):
+    """
+    Turns a file path, a file object or an iterable of str / bytes pieces into an iterable of pieces.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return _PathSource(source, chunk_size)
+
+    if hasattr(source, 'read'):
+        return iter(lambda: source.read(chunk_size), source.read(0))
+
+    return source
+
+
+class _PathSource:
+    # a file read piece by piece, every iteration reads it again so that its stylesheets can be collected first
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        with open(self.path, 'rb') as html_file:
+            while True:
+                piece = html_file.read(self.chunk_size)
+                if not piece:
+                    return
+                yield piece
+
+
+class _Chunk:
+    __slots__ = ('rows', 'length')
+
+    def __init__(self):
+        self.rows = []
+        self.length = 0
+
+
+def iter_chunks(source, cutoff=7, keep_text_only=True, refine=True, sel_metric='words', lower_bound=100, upper_bound=650,
+                split_oversized=None, score_dict=Score.ScoreDict, read_size=65536, tokenizer=None, **parser_kwargs):
+    """
+    Parses an HTML document incrementally and yields its chunks as soon as they are complete.
+
+    The rows are produced by the 'stream' backend of HTMLParser and scored as they arrive. A chunk is closed by the
+    next cutoff row and refined with the same lower_bound / upper_bound rules as `TextChunker.chunk_text`, so the
+    chunks are identical to `TextChunker(HTMLParser(html).parse()).chunk_text(...)`. At most the chunk being refined
+    and the chunk being read are held in memory. The cutoff cannot be auto adjusted, that needs the scores of the
+    whole document.
+
+    Parameters:
+    - source (str, os.PathLike, file object or iterable): The path of an HTML file, a file object opened in text or
+      binary mode, or an iterable of str / bytes pieces of the document. A path or a re-iterable (e.g. a list) is read
+      twice, first to collect the stylesheets, which then apply to the whole document as with the other backends. The
+      stylesheets of a file object or an iterator apply only from where their <style> element closes.
+    - cutoff (int, optional): The score from which a row starts a new chunk. Defaults to 7.
+    - keep_text_only (bool, optional): Whether to yield the concatenated text of each chunk or a DataFrame. Defaults to True.
+    - refine (bool, optional): Whether to refine the chunks based on the selected metric. Defaults to True.
+    - sel_metric (str, optional): The metric used for refining the chunks, 'words', 'characters' or 'tokens'. Defaults to 'words'.
+    - lower_bound (int, optional): The lower bound for the refined chunk size. Defaults to 100.
+    - upper_bound (int, optional): The upper bound for the refined chunk size. Defaults to 650.
+    - split_oversized (bool, optional): Whether to split the refined chunks longer than upper_bound at row boundaries, as
+      `TextChunker.chunk_text` does. Defaults to None, which splits with the 'tokens' metric only.
+    - score_dict (dict, optional): The scoring system, see `Score.ScoreDict`.
+    - read_size (int, optional): The number of bytes read from a path or file object at a time. Defaults to 65536.
+    - tokenizer (optional): The tokenizer of the 'tokens' metric, see `Tokenizer.get_tokenizer`.
+    - parser_kwargs: Extra keyword arguments of HTMLParser, e.g. style_cache.
+
+    Yields:
+        str or pandas.DataFrame: The chunks in document order.
+
+    Raises:
+        ValueError: If an invalid metric input is provided.
+    """
+    if refine:
+        ChunkRefiner._check_metric(sel_metric)
+    split_oversized = TextChunker._resolve_split_oversized(split_oversized, sel_metric)
+
+    parser = HTMLParser(_iter_source(source, read_size), backend='stream', **parser_kwargs)
+    chunker = TextChunker(None, score_dict=score_dict)
+    _, tag_labels = parser._tag_bits()
+    style_values = parser.data.style_values
+
+    # rows sharing a style and a tag set share their score
+    scores = {}
+    spelled_tags = {}
+
+    def score_of(style_id, tag_mask):
+        key = (style_id, tag_mask)
+        score = scores.get(key)
+        if score is None:
+            tags = spelled_tags.get(tag_mask)
+            if tags is None:
+                tags = spelled_tags[tag_mask] = ', '.join(label for bit, label in enumerate(tag_labels) if tag_mask >> bit & 1)
+            _, font_size, font_weight, text_decoration, _ = style_values[style_id]
+            score = scores[key] = chunker._calculate_score(tags, str(font_size), text_decoration, font_weight)
+        return score
+
+    tokenizer = get_tokenizer(tokenizer)
+
+    def chunk_length(rows):
+        # the rows of a raw chunk are measured together once it is complete
+        if sel_metric == 'words':
+            return sum(row[0].count(' ') + 1 for row in rows)
+        if sel_metric == 'tokens':
+            return int(tokenizer.count([row[0] for row in rows]).sum())
+        return sum(len(row[0]) for row in rows) + len(rows) - 1
+
+    # joining two character chunks adds a space
+    separator = 1 if sel_metric == 'characters' else 0
+
+    def output(chunk):
+        if keep_text_only:
+            return ' '.join(row[0] for row in chunk.rows)
+
+        import numpy as np
+        import pandas as pd
+        rows = chunk.rows
+        columns = {'text_content': [row[0] for row in rows]}
+        for position, column in enumerate(parser.data.STYLE_COLUMNS):
+            columns[column] = [style_values[row[1]][position] for row in rows]
+        columns['tags'] = [spelled_tags[row[2]] for row in rows]
+        # the same dtypes and index as the chunks of `TextChunker.chunk_text`
+        scores = np.array([row[3] for row in rows], dtype=np.float64)
+        is_cutoff = np.where(scores >= cutoff, 1, 0)
+        columns['total_score'] = scores
+        columns['is_cutoff'] = is_cutoff
+        columns['Chunk'] = np.array([row[4] for row in rows], dtype=is_cutoff.dtype)
+        frame = pd.DataFrame(columns, index=pd.RangeIndex(rows[0][5], rows[-1][5] + 1))
+        return TextChunker._chunk_frame(frame, is_cutoff)
+
+    def split(chunk):
+        """Splits a refined chunk longer than the upper bound at row boundaries, see `ChunkRefiner.split_ranges`."""
+        if not split_oversized or chunk.length <= upper_bound:
+            return [chunk]
+        rows = chunk.rows
+        if sel_metric == 'tokens':
+            row_lengths = tokenizer.count([row[0] for row in rows])
+        else:
+            row_lengths = [row[0].count(' ') + 1 if sel_metric == 'words' else len(row[0]) for row in rows]
+        pieces = []
+        for start, stop in ChunkRefiner.split_ranges(ChunkRefiner.prefix_sums(row_lengths), [(0, len(rows))], upper_bound, sel_metric):
+            piece = _Chunk()
+            piece.rows = rows[start:stop]
+            pieces.append(piece)
+        return pieces
+
+    # `current` is the raw chunk being read, `pending` the refined chunk that may still absorb it
+    current, pending = _Chunk(), None
+
+    def close(chunk):
+        """Feeds a complete raw chunk to the refine rules and returns the refined chunks that can be emitted."""
+        nonlocal pending
+        if not refine:
+            return [chunk]
+        chunk.length = chunk_length(chunk.rows)
+
+        ready = []
+        if pending is not None:
+            if pending.length + chunk.length <= upper_bound:
+                pending.rows.extend(chunk.rows)
+                pending.length += chunk.length + separator
+                chunk = None
+            else:
+                ready.append(pending)
+                pending = None
+        if chunk is not None:
+            pending = chunk
+        # a refined chunk reaching the lower bound does not absorb anything else
+        if pending is not None and pending.length >= lower_bound:
+            ready.append(pending)
+            pending = None
+        return [piece for chunk in ready for piece in split(chunk)]
+
+    chunk_id, row_number = 0, 0
+    for text, style_id, tag_mask in parser._iter_kept_rows(parser._events()):
+        score = score_of(style_id, tag_mask)
+        if score >= cutoff:
+            chunk_id += 1
+            if current.rows:
+                for chunk in close(current):
+                    yield output(chunk)
+                current = _Chunk()
+
+        current.rows.append((text, style_id, tag_mask, score, chunk_id, row_number))
+        row_number += 1
+
+    if current.rows:
+        for chunk in close(current):
+            yield output(chunk)
+    if pending is not None:
+        for chunk in split(pending):
+            yield output(chunk)
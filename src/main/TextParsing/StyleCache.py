@@ -0,0 +1,142 @@
+import hashlib
+from .LRUCache import LRUCache
+
+def parse_stylesheet(css_text, styles):
+    """
+    Parses the rules of one stylesheet into the given styles dictionary.
+
+    Args:
+        css_text (str): The content of a <style> element.
+        styles (dict): The selector to properties dictionary to update in place.
+    """
+    css_rules = [rule.strip() for rule in css_text.split('}') if rule.strip()]
+    for rule in css_rules:
+        selector, properties_str = rule.split('{', 1)
+        selector = selector.strip().lstrip('.')
+        properties = {}
+        for prop in properties_str.split(';'):
+            if ':' in prop.strip():
+                key, value = prop.split(':', 1)
+                properties[key.strip()] = value.strip()
+        styles[selector] = properties
+
+
+def parse_inline_styles(tag_styles):
+    """
+    Extracts inline styles from a string of tag styles.
+
+    Args:
+        tag_styles (str): A string containing tag styles separated by semicolons.
+
+    Returns:
+        dict: A dictionary containing the extracted inline styles, where the keys are style properties and the values are the corresponding values.
+    """
+    inline_styles = {}
+    for style in tag_styles.split(';'):
+        if ':' in style.strip():
+            key, value = style.split(':', 1)
+            inline_styles[key.strip()] = value.strip()
+    return inline_styles
+
+
+class CompiledStylesheet:
+    """
+    The rule table of a document's stylesheets together with an index of the class combinations resolved so far.
+
+    The rule table and the resolved dictionaries are shared between documents and must be treated as read only.
+    """
+    # a document only uses a handful of class combinations, this is a guard against pathological input
+    MAX_CLASS_COMBINATIONS = 4096
+
+    def __init__(self, rules):
+        self.rules = rules
+        self._class_index = {}
+
+    def resolve_classes(self, class_list):
+        """
+        Returns the combined properties of a list of classes, later classes override earlier ones.
+
+        Args:
+            class_list (list): The classes of a tag, e.g. ['s1', 's2'].
+
+        Returns:
+            dict: The combined properties of the classes that are defined in the stylesheet.
+        """
+        key = tuple(class_list)
+        properties = self._class_index.get(key)
+        if properties is None:
+            properties = {}
+            for cls in key:
+                if cls in self.rules:
+                    properties.update(self.rules[cls])
+            if len(self._class_index) < self.MAX_CLASS_COMBINATIONS:
+                self._class_index[key] = properties
+        return properties
+
+
+class StyleCache:
+    """
+    Process wide cache of compiled stylesheets and parsed inline style attributes.
+
+    Documents of the same source usually share identical stylesheets and a small set of inline style strings,
+    so both are parsed once per process instead of once per document and tag.
+
+    Args:
+        max_stylesheets (int, optional): The number of compiled stylesheets to keep. Defaults to 128.
+        max_inline_styles (int, optional): The number of parsed inline style strings to keep. Defaults to 16384.
+    """
+    def __init__(self, max_stylesheets=128, max_inline_styles=16384):
+        self.stylesheets = LRUCache(max_stylesheets)
+        self.inline_styles = LRUCache(max_inline_styles)
+
+    @staticmethod
+    def _digest(css_text):
+        return hashlib.blake2b(css_text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def compile(self, css_texts):
+        """
+        Returns the compiled stylesheet of a document.
+
+        Args:
+            css_texts (list): The content of the document's <style> elements in document order.
+
+        Returns:
+            CompiledStylesheet: The shared compiled stylesheet, keyed by the content hash of the stylesheets.
+        """
+        key = tuple(self._digest(css_text) for css_text in css_texts)
+
+        def factory():
+            rules = {}
+            for css_text in css_texts:
+                parse_stylesheet(css_text, rules)
+            return CompiledStylesheet(rules)
+
+        return self.stylesheets.get_or_create(key, factory)
+
+    def inline(self, tag_styles):
+        """
+        Returns the parsed properties of an inline style attribute, the result is shared and must not be modified.
+        """
+        properties = self.inline_styles.get(tag_styles)
+        if properties is None:
+            properties = parse_inline_styles(tag_styles)
+            self.inline_styles.put(tag_styles, properties)
+        return properties
+
+    def clear(self):
+        self.stylesheets.clear()
+        self.inline_styles.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: The hit / miss counters of the stylesheet and the inline style caches.
+        """
+        return {
+            'stylesheets': self.stylesheets.stats(),
+            'inline_styles': self.inline_styles.stats()
+        }
+
+
+# shared by every HTMLParser that is not given its own cache
+DEFAULT_STYLE_CACHE = StyleCache()
@@ -0,0 +1,54 @@
+from .LazyModule import LazyModule
+
+np = LazyModule('numpy')
+
+class TextBuffer:
+    """
+    The texts of all rows joined with a space into one string, with the offset of every row.
+
+    The text of any run of consecutive rows is then a slice of the buffer, there is no need to join the rows again.
+
+    Args:
+        texts (list): The text of each row.
+    """
+    def __init__(self, texts):
+        self.text = ' '.join(texts)
+        lengths = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+        # starts[i] is the offset of row i, starts[n_rows] is one past the end of the buffer (the missing last separator)
+        self.starts = np.concatenate(([0], np.cumsum(lengths)))
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Returns:
+            TextBuffer: The buffer of the text_content column of a parsed frame.
+        """
+        return cls(df['text_content'].tolist())
+
+    def slice(self, start, stop):
+        """
+        Returns:
+            str: The texts of the rows start to stop - 1 joined with a space.
+        """
+        if stop <= start:
+            return ''
+        return self.text[self.starts[start]:self.starts[stop] - 1]
+
+    def slices(self, boundaries):
+        """
+        Returns:
+            list: The text of each (start, stop) row range.
+        """
+        starts, text = self.starts.tolist(), self.text
+        return [text[starts[start]:starts[stop] - 1] if stop > start else '' for start, stop in boundaries]
+
+    def write(self, file, block_size=1 << 20):
+        """
+        Writes the buffer to an open text file in blocks of `block_size` characters.
+        """
+        text = self.text
+        for offset in range(0, len(text), block_size):
+            file.write(text[offset:offset + block_size])
@@ -1,13 +1,22 @@
-import pandas as pd
-import numpy as np
+from .LazyModule import LazyModule
 from .Score import Score
 from .ChunkRefiner import ChunkRefiner
-import regex as re
+from .ChunkView import ChunkView
+from .TextBuffer import TextBuffer
+from .CompactDocument import CompactDocument
+from .RowBuilder import RowBuilder
+from .Instrumentation import Stats, null_stage
+from .Tokenizer import get_tokenizer
+from .FontSizeResolver import FontSizeResolver
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
 
 class TextChunker:
-    def __init__(self, df, score_dict=Score.ScoreDict):
-        self.df = df
+    def __init__(self, df, score_dict=Score.ScoreDict, stats=None, tokenizer=None):
         # cols: 'text_content', 'font_family', 'font_size', 'font_weight', 'text_decoration', 'font_color', 'tags'
+        # the frame is never modified, the scores and row lengths derived from it are cached until it is replaced
+        self.df = df
         
         # Define the scoring system for different tags
         self.tags_scores = score_dict.get('tags_scores', {})
@@ -15,10 +24,92 @@ class TextChunker:
         self.font_size_scores = score_dict.get('font_size_scores', {})
         self.font_size_bins = score_dict.get('font_size_bins', [])
         self.font_size_labels = score_dict.get('font_size_labels', [])
+        # font size strings are resolved once and shared by every chunker with the same font size configuration
+        self.font_size_resolver = FontSizeResolver.for_config(self.font_size_bins, self.font_size_labels, self.font_size_scores)
         # Define the scoring system for different text decorations
         self.text_decoration_scores = score_dict.get('text_decoration_scores', {})
         #  Define the scoring system for different font weights
         self.font_weight_scores = score_dict.get('font_weight_scores', {})
+        # per stage timers and counters, None (the default) disables them, see `Instrumentation.Stats`
+        self.stats = Stats.resolve(stats, 'chunker')
+        # counts the tokens of the rows for sel_metric='tokens', the built in approximation unless another one is given
+        self.tokenizer = get_tokenizer(tokenizer)
+
+    @property
+    def df(self):
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        # a CompactDocument (see `HTMLParser.parse_compact`) is scored per style, its wide frame is only built if needed
+        self._df = df
+        self._compact = df if isinstance(df, CompactDocument) else None
+        self._frame = None
+        self._scores = None
+        self._text_buffer = None
+        self._prefix = {}
+
+    @property
+    def scores(self) -> 'np.ndarray':
+        """
+        The total score of each row, computed on first use.
+        """
+        if self._scores is None:
+            stage = self.stats.stage if self.stats is not None else null_stage
+            with stage('score'):
+                if self._compact is not None:
+                    # one score per style, broadcast to the rows by style id
+                    self._scores = self._calculate_scores(self._compact.styles)[self._compact.style_ids]
+                else:
+                    self._scores = self._calculate_scores(self.df)
+            if self.stats is not None:
+                self.stats.count('scored_rows', len(self._scores))
+        return self._scores
+
+    @property
+    def frame(self) -> 'pd.DataFrame':
+        """
+        The wide DataFrame of the rows, built once from a CompactDocument.
+        """
+        if self._compact is None:
+            return self.df
+        if self._frame is None:
+            self._frame = self._compact.to_frame()
+        return self._frame
+
+    def _prefix_sums(self, sel_metric):
+        # running totals of the row lengths, chunk lengths for any set of boundaries are differences of two of them
+        prefix = self._prefix.get(sel_metric)
+        if prefix is None:
+            stage = self.stats.stage if self.stats is not None else null_stage
+            with stage('lengths'):
+                prefix = self._prefix[sel_metric] = ChunkRefiner.prefix_sums(
+                    ChunkRefiner.row_lengths(self.df['text_content'], sel_metric, self.tokenizer)
+                )
+        return prefix
+
+    @property
+    def text_buffer(self) -> TextBuffer:
+        """
+        The joined text of all rows, chunk texts are slices of it.
+        """
+        if self._text_buffer is None:
+            self._text_buffer = TextBuffer.from_frame(self.df)
+        return self._text_buffer
+
+    def _resolve_cutoff(self, cutoff, auto_adjust_cutoff):
+        if auto_adjust_cutoff:
+            # On average the title and subtitle contains 6% of the contents
+            # cutoff set as quantile 94% of the total score
+            return int(pd.Series(self.scores).quantile(0.94))
+        return cutoff
+
+    @staticmethod
+    def _resolve_split_oversized(split_oversized, sel_metric):
+        # a token upper bound is usually the hard limit of a model, words and characters are soft targets
+        if split_oversized is None:
+            return sel_metric == 'tokens'
+        return split_oversized
 
     def _assign_font_size_label(self, font_size):
         """
@@ -28,34 +119,9 @@ class TextChunker:
         - font_size (str): The font size extract from the parsed text dataframe.
 
         Returns:
-        - label (str): The label assigned to the font size.
+        - label (str): The label assigned to the font size, resolved once per distinct string by the shared font size resolver.
         """
-        if font_size == '':
-            return ''
-        else:
-            if 'pt' in font_size:
-                font_size = float(font_size.replace('pt', ''))
-            elif 'px' in font_size:
-                font_size = float(font_size.replace('px', '')) * 0.75
-            else:
-                digit_part = re.sub(r'[^\d.]', '', font_size)
-                if digit_part == '':
-                    return ''
-                else:
-                    font_size = float(digit_part) # remove all non-numeric characters
-            
-            # values that exceed the value range, use the smallest or the largest label instead
-            if font_size <= self.font_size_bins[0]:
-                return self.font_size_labels[0]
-            if font_size >= self.font_size_bins[-1]:
-                return self.font_size_labels[-1]
-            
-            
-            for i in range(len(self.font_size_bins)):
-                # match the label with the smaller value of the bin
-                if font_size >= self.font_size_bins[i-1] and font_size < self.font_size_bins[i] :
-                    return self.font_size_labels[i-1]
-            
+        return self.font_size_resolver.resolve(font_size)[1]
 
     def _calculate_score(self, tags, font_size, text_decoration, font_weight):
         """
@@ -81,63 +147,199 @@ class TextChunker:
         score += sum(self.font_weight_scores.get(weight.strip(), 0)  for weight in font_weight.split(','))
         
         return score
+
+    @staticmethod
+    def _split_scores(values, scores):
+        """
+        Sums the scores of the comma separated items of every value.
+
+        Parameters:
+        - values (array-like): The distinct values of a column, e.g. 'bold, header2'.
+        - scores (dict): The score of each item.
+
+        Returns:
+        - scores (numpy.ndarray): The summed score of each value.
+        """
+        items = pd.Series(values, dtype=object).str.split(',').explode().str.strip()
+        return items.map(scores).fillna(0).groupby(level=0).sum().to_numpy(dtype=float)
+
+    def _calculate_scores(self, df):
+        """
+        Vectorized counterpart of `_calculate_score` over a whole DataFrame.
+
+        Every column is factorized, the distinct values are scored once with vectorized string operations and
+        the scores are broadcast back to the rows.
+
+        Parameters:
+        - df (pandas.DataFrame): The parsed text dataframe.
+
+        Returns:
+        - scores (numpy.ndarray): The score of each row, the same values as `_calculate_score`.
+        """
+        def score_column(column, score_values):
+            codes, uniques = pd.factorize(df[column], sort=False)
+            if len(uniques) == 0:
+                return np.zeros(len(df))
+            # a missing value scores like its string form, as in the row-wise path
+            values = np.array([str(value) for value in uniques], dtype=object)
+            scores = score_values(values)[codes]
+            if (codes < 0).any():
+                scores[codes < 0] = score_values(np.array(['nan'], dtype=object))[0]
+            return scores
+
+        total = score_column('tags', lambda values: self._split_scores(values, self.tags_scores))
+        total = total + score_column('font_size', self.font_size_resolver.scores)
+        total = total + score_column('text_decoration', lambda values: self._split_scores(values, self.text_decoration_scores))
+        total = total + score_column('font_weight', lambda values: self._split_scores(values, self.font_weight_scores))
+
+        if len(total) and np.array_equal(total, np.floor(total)):
+            return total.astype(np.int64)
+        return total
     
-    def chunk_text(self, cutoff = 7, auto_adjust_cutoff=False, keep_text_only=True, refine=True, sel_metric='words', lower_bound=100, upper_bound=650) -> list:
+    def chunk_boundaries(self, cutoff=7, auto_adjust_cutoff=False, refine=True, sel_metric='words', lower_bound=100, upper_bound=650,
+                         split_oversized=None, starts=None) -> list:
+        """
+        Computes the (start, stop) row ranges of the chunks, see `chunk_text` for the parameters.
+
+        The row scores and lengths are computed on the first call only, later calls with another cutoff or other
+        bounds only redo the boundary and refine stages.
+
+        Parameters:
+        - starts (numpy.ndarray, optional): The cutoff rows, if already known.
+
+        Returns:
+            list: (start, stop) row ranges of the chunks in document order.
+
+        Raises:
+            ValueError: If an invalid metric input is provided.
+        """
+        stats = self.stats
+        stage = stats.stage if stats is not None else null_stage
+        n_rows = len(self.df)
+        scores = self.scores
+
+        with stage('boundaries'):
+            if starts is None:
+                cut_off = self._resolve_cutoff(cutoff, auto_adjust_cutoff)
+                starts = np.flatnonzero(scores >= cut_off)
+            # a chunk starts at every cutoff row, the rows before the first cutoff form the first chunk
+            if n_rows and (len(starts) == 0 or starts[0] != 0):
+                starts = np.concatenate(([0], starts))
+
+        if refine:
+            # merges are decided on row offsets only
+            ChunkRefiner._check_metric(sel_metric)
+            prefix = self._prefix_sums(sel_metric)
+            with stage('refine'):
+                boundaries, merges, splits = ChunkRefiner.refine_boundaries(
+                    None, starts, lower_bound=lower_bound, upper_bound=upper_bound, sel_metric=sel_metric, prefix=prefix,
+                    split_oversized=self._resolve_split_oversized(split_oversized, sel_metric), return_counts=True)
+        else:
+            boundaries = list(zip(starts.tolist(), np.append(starts[1:], n_rows).tolist()))
+            merges = splits = 0
+
+        if stats is not None:
+            stats.count('chunks_before_refine', len(starts))
+            stats.count('chunks', len(boundaries))
+            # both only ever grow, they are exported as Prometheus counters
+            stats.count('merges', merges)
+            stats.count('splits', splits)
+        return boundaries
+
+    def sweep(self, cutoffs, refine=True, sel_metric='words', lower_bound=100, upper_bound=650, split_oversized=None) -> dict:
+        """
+        Computes the chunk boundaries of many cutoffs in one pass over the rows.
+
+        The rows reaching the smallest cutoff are selected once, every cutoff then filters these candidate rows only.
+
+        Parameters:
+        - cutoffs (iterable): The cutoff values to try.
+        - refine, sel_metric, lower_bound, upper_bound, split_oversized: See `chunk_text`.
+
+        Returns:
+            dict: The (start, stop) row ranges of the chunks for each cutoff.
+
+        Raises:
+            ValueError: If an invalid metric input is provided.
+        """
+        cutoffs = list(cutoffs)
+        if not cutoffs:
+            return {}
+        candidates = np.flatnonzero(self.scores >= min(cutoffs))
+        candidate_scores = self.scores[candidates]
+        return {
+            cutoff: self.chunk_boundaries(refine=refine, sel_metric=sel_metric, lower_bound=lower_bound, upper_bound=upper_bound,
+                                          split_oversized=split_oversized, starts=candidates[candidate_scores >= cutoff])
+            for cutoff in cutoffs
+        }
+
+    def chunk_text(self, cutoff = 7, auto_adjust_cutoff=False, keep_text_only=True, refine=True, sel_metric='words', lower_bound=100, upper_bound=650, as_views=False,
+                   split_oversized=None) -> list:
         """
         Chunk the text based on specified criteria.
 
+        The scores and row lengths are computed once per TextChunker, so repeated calls with other settings are cheap,
+        see `chunk_boundaries`. The DataFrame given to the TextChunker is not modified. With instrumentation enabled,
+        the stages score, lengths, boundaries, refine and assemble are timed and the counters scored_rows,
+        chunks_before_refine, chunks, merges and splits are updated, see `stats`.
+
         Parameters:
         - cutoff (int): The cutoff value for determining whether a row should be included in a chunk. Defaults to 7.
         - auto_adjust_cutoff (bool, optional): Whether to automatically adjust the cutoff value. Defaults to False.
         - keep_text_only (bool, optional): Whether to return only the concatenated text content of each chunk. Defaults to True.
         - refine (bool, optional): Whether to refine the chunks based on the selected metric. Defaults to True.
-        - sel_metric (str, optional): The metric used for refining the chunks. Defaults to 'words'.
+        - sel_metric (str, optional): The metric used for refining the chunks, 'words', 'characters' or 'tokens' (counted by
+          the tokenizer of the TextChunker). Defaults to 'words'.
         - lower_bound (int, optional): The lower bound for the refined chunk size. Defaults to 100.
         - upper_bound (int, optional): The upper bound for the refined chunk size. Defaults to 650.
+        - split_oversized (bool, optional): Whether to split the refined chunks longer than upper_bound at row boundaries, so
+          that only a single row longer than upper_bound can exceed it. Defaults to None, which splits with the 'tokens'
+          metric only.
+        - as_views (bool, optional): Whether to return ChunkView objects, row ranges into the frame that give the text,
+          the rows and the statistics of the chunk on demand. Overrides keep_text_only. Defaults to False.
 
         Returns:
-            list: A list of chunks, either as concatenated text content or as DataFrames.
+            list: A list of chunks, either as concatenated text content, as DataFrames with the additional
+                  columns total_score, is_cutoff and Chunk (laid out as in earlier versions, see `_chunk_frame`),
+                  or as ChunkView objects.
 
         """
-        # Calculate the total score for each row
-        self.df['total_score'] = self.df.apply(
-            lambda row: self._calculate_score(
-                row['tags'], str(row['font_size']), row['text_decoration'], row['font_weight']
-            ), axis=1
-        )
-
-        # if the total score is greater than or equal to the cutoff, set 'is_cutoff' to 1
-        if auto_adjust_cutoff:
-            # On average the title and subtitle contains 6% of the contents
-            # cutoff set as quantile 94% of the total score
-            cut_off = int(self.df['total_score'].quantile(0.94))
-        else:
-            cut_off = cutoff
-
-        # cut_off new defined variable to avoid conflict with the cutoff parameter
-        self.df['is_cutoff'] = np.where(self.df['total_score'] >= cut_off, 1, 0)
-        self.df['Chunk'] = self.df['is_cutoff'].cumsum()
-
-        # Split the DataFrame into chunks based on 'chunk' id
-        chunk_list = []
-
-        for _, group in self.df.groupby('Chunk'):
-            chunk_list.append(group)
-
-        # Refine the chunks based on the selected metric
-        if refine:
-            refiner = ChunkRefiner(chunk_list)
+        stage = self.stats.stage if self.stats is not None else null_stage
+        with stage('total'):
+            # cut_off new defined variable to avoid conflict with the cutoff parameter
+            cut_off = self._resolve_cutoff(cutoff, auto_adjust_cutoff)
+            boundaries = self.chunk_boundaries(cut_off, refine=refine, sel_metric=sel_metric, lower_bound=lower_bound, upper_bound=upper_bound,
+                                               split_oversized=split_oversized)
 
-            res = refiner.refine(lower_bound=lower_bound, upper_bound=upper_bound, sel_metric=sel_metric)
-        else:
-            res = chunk_list
+            with stage('assemble'):
+                res = self._assemble(boundaries, cut_off, keep_text_only, as_views)
+        return res
 
+    def _assemble(self, boundaries, cut_off, keep_text_only=True, as_views=False) -> list:
+        """
+        Builds the chunks of `chunk_text` from their (start, stop) row ranges and the resolved cutoff.
+        """
+        if as_views:
+            return [ChunkView(self, start, stop, cut_off) for start, stop in boundaries]
         if keep_text_only:
-            # Return the chunks as a list of concatenated text content
-            return [chunk['text_content'].str.cat(sep=' ') for chunk in res]
-        else:
-            # Return the chunks as a list of DataFrames
-            return res
-    
-    
-    
\ No newline at end of file
+            # Return the chunks as a list of concatenated text content, sliced from the joined text of the document
+            return self.text_buffer.slices(boundaries)
+        # Return the chunks as a list of DataFrames, sliced from one scored copy of the frame
+        is_cutoff = np.where(self.scores >= cut_off, 1, 0)
+        scored = self.frame.assign(total_score=self.scores, is_cutoff=is_cutoff, Chunk=is_cutoff.cumsum())
+        return [self._chunk_frame(scored.iloc[start:stop], is_cutoff[start:stop]) for start, stop in boundaries]
+
+    @staticmethod
+    def _chunk_frame(rows, is_cutoff) -> 'pd.DataFrame':
+        """
+        Gives the rows of one DataFrame chunk the layout chunks have always had: the style columns are plain object
+        columns (the parsed frame holds them as categoricals), and a chunk joining several cutoff groups is numbered
+        from 0, as the refiner numbers the chunks it merges. Any other chunk keeps the index labels of its rows.
+        """
+        categorical = [column for column in RowBuilder.STYLE_COLUMNS
+                       if column in rows.columns and isinstance(rows[column].dtype, pd.CategoricalDtype)]
+        if categorical:
+            rows = rows.astype(dict.fromkeys(categorical, object))
+        if is_cutoff[1:].any():
+            rows = rows.reset_index(drop=True)
+        return rows
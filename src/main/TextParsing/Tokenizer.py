@@ -0,0 +1,91 @@
+from .LazyModule import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+class ApproxTokenizer:
+    """
+    Offline, dependency free approximation of a BPE tokenizer's token count.
+
+    A run of letters costs one token per `letters_per_token` letters, a run of digits one token per
+    `digits_per_token` digits and every other visible character (punctuation, symbols) one token. Whitespace is free,
+    so the count of texts joined with a space is the sum of their counts and chunk counts can be summed from rows.
+    With the defaults the count errs on the high side of common BPE tokenizers (a long word is often one token there),
+    so chunks sized with it stay within a token budget.
+
+    Args:
+        letters_per_token (int, optional): Letters per token of a word. Defaults to 4.
+        digits_per_token (int, optional): Digits per token of a number. Defaults to 3.
+    """
+    def __init__(self, letters_per_token=4, digits_per_token=3):
+        if letters_per_token <= 0 or digits_per_token <= 0:
+            raise ValueError('The number of characters per token must be positive')
+        self.letters_per_token = letters_per_token
+        self.digits_per_token = digits_per_token
+        self.pattern = rf'[^\W\d_]{{1,{letters_per_token}}}|\d{{1,{digits_per_token}}}|[^\w\s]|_'
+
+    def count(self, texts):
+        """
+        Counts the tokens of many texts at once.
+
+        Args:
+            texts (list or pandas.Series): The texts.
+
+        Returns:
+            numpy.ndarray: The number of tokens of each text.
+        """
+        texts = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+        if len(texts) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return texts.str.count(self.pattern).to_numpy(dtype=np.int64)
+
+
+class FunctionTokenizer:
+    """
+    Adapts a tokenizer function, e.g. `tiktoken.get_encoding('cl100k_base').encode`, to the tokenizer interface.
+
+    Args:
+        function (callable): Returns the tokens of a text (any sized sequence) or their number.
+        batch_function (callable, optional): Returns the tokens of a list of texts, e.g. `encoding.encode_batch`.
+    """
+    def __init__(self, function, batch_function=None):
+        self.function = function
+        self.batch_function = batch_function
+
+    @staticmethod
+    def _size(tokens):
+        return tokens if isinstance(tokens, (int, np.integer)) else len(tokens)
+
+    def count(self, texts):
+        texts = list(texts)
+        if self.batch_function is not None:
+            results = self.batch_function(texts)
+        else:
+            results = map(self.function, texts)
+        return np.fromiter((self._size(tokens) for tokens in results), dtype=np.int64, count=len(texts))
+
+
+DEFAULT_TOKENIZER = ApproxTokenizer()
+
+
+def get_tokenizer(tokenizer=None):
+    """
+    Returns a tokenizer object with a `count(texts)` method.
+
+    Args:
+        tokenizer (optional): None for the built in `ApproxTokenizer`, an object with a `count(texts)` method
+                              (returned as is), an object with `encode` (and `encode_batch`) such as a tiktoken
+                              encoding, or a function returning the tokens of a text or their number.
+
+    Raises:
+        ValueError: If the tokenizer has none of these forms.
+    """
+    if tokenizer is None:
+        return DEFAULT_TOKENIZER
+    if hasattr(tokenizer, 'count') and callable(tokenizer.count) and not isinstance(tokenizer, (str, list, tuple)):
+        return tokenizer
+    if hasattr(tokenizer, 'encode'):
+        return FunctionTokenizer(tokenizer.encode, getattr(tokenizer, 'encode_batch', None))
+    if callable(tokenizer):
+        return FunctionTokenizer(tokenizer)
+    raise ValueError(f'Invalid tokenizer input: {tokenizer!r}, expected an object with count(texts) or encode(text), or a function')
@@ -0,0 +1,86 @@
+"""
+HTML text parsing and chunking.
+
+Importing the package is cheap: the functions below import their modules when they are first called, and the modules
+import pandas and numpy only in the stages that need them (see `LazyModule`). Streaming text only extraction
+(`iter_chunks` with keep_text_only=True and the 'words' or 'characters' metric, or `get_text`) does not import
+pandas or numpy at all.
+
+    from src.main import TextParsing
+
+    chunks = TextParsing.chunk_text(html_content, cutoff=7)
+
+The classes are imported from the module of the same name, e.g. `from src.main.TextParsing.HTMLParser import HTMLParser`.
+"""
+import importlib
+
+# lazily re-exported functions -> module defining them
+_EXPORTS = {
+    'iter_chunks': 'StreamChunker',
+    'iter_corpus': 'BatchProcessor',
+    'process_corpus': 'BatchProcessor',
+    'iter_parsed': 'AsyncHTMLFetcher',
+    'get_tokenizer': 'Tokenizer',
+}
+
+__all__ = ['parse', 'get_text', 'chunk_text'] + sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+def parse(html_content, compact=False, **parser_kwargs):
+    """
+    Parses an HTML document.
+
+    Args:
+        html_content (str): The HTML document.
+        compact (bool, optional): Whether to return a CompactDocument instead of the DataFrame. Defaults to False.
+        parser_kwargs: Keyword arguments of HTMLParser, e.g. backend='lxml'.
+
+    Returns:
+        pandas.DataFrame or CompactDocument: The result of `HTMLParser.parse` or `HTMLParser.parse_compact`.
+    """
+    from .HTMLParser import HTMLParser
+    parser = HTMLParser(html_content, **parser_kwargs)
+    return parser.parse_compact() if compact else parser.parse()
+
+
+def get_text(html_content, **parser_kwargs):
+    """
+    Returns:
+        str: The text of an HTML document, the same as `HTMLParser.get_text`, without importing pandas or numpy.
+    """
+    from .HTMLParser import HTMLParser
+    return ' '.join(HTMLParser(html_content, **parser_kwargs).parse_text())
+
+
+def chunk_text(html_content, parser_kwargs=None, score_dict=None, **chunk_kwargs):
+    """
+    Parses and chunks an HTML document.
+
+    Args:
+        html_content (str): The HTML document.
+        parser_kwargs (dict, optional): Keyword arguments of HTMLParser.
+        score_dict (dict, optional): The scoring system of TextChunker, `Score.ScoreDict` if not given.
+        chunk_kwargs: Keyword arguments of `TextChunker.chunk_text`, e.g. cutoff=7.
+
+    Returns:
+        list: The chunks of `TextChunker.chunk_text`.
+    """
+    from .HTMLParser import HTMLParser
+    from .TextChunker import TextChunker
+    from .Score import Score
+    document = HTMLParser(html_content, **(parser_kwargs or {})).parse_compact()
+    chunker = TextChunker(document, score_dict=Score.ScoreDict if score_dict is None else score_dict)
+    return chunker.chunk_text(**chunk_kwargs)
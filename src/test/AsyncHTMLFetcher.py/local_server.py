@@ -0,0 +1,141 @@
+#%%
+import asyncio
+import glob
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.AsyncHTMLFetcher import AsyncHTMLFetcher, validate_url
+from src.main.TextParsing.HTMLParser import HTMLParser
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    pages = {}
+    flaky = {}
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.flaky.get(self.path, 0) > 0:
+            self.flaky[self.path] -= 1
+            return self._send(503)
+        if self.path == '/slow':
+            threading.Event().wait(1.0)
+        elif self.path.startswith('/pause'):
+            threading.Event().wait(0.2)
+        body = self.pages.get(self.path)
+        if body is None:
+            return self._send(404)
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers={'ETag': etag})
+        self._send(200, body, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag})
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncHTMLFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        for i, path in enumerate(DATA_FILES[:3]):
+            with open(path, 'rb') as html_file:
+                PageHandler.pages[f'/doc{i}'] = html_file.read()
+        PageHandler.pages['/slow'] = b'<html><body><p>late</p></body></html>'
+        for i in range(8):
+            PageHandler.pages[f'/pause{i}'] = b'<html><body><p>paused</p></body></html>'
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        PageHandler.requests.clear()
+        PageHandler.flaky.clear()
+
+    def test_retry_conditional_get_and_errors(self):
+        PageHandler.flaky['/doc0'] = 2
+
+        async def run():
+            async with AsyncHTMLFetcher(retries=3, backoff=0.01, timeout=0.3) as fetcher:
+                first = await fetcher.fetch_all([self.base + '/doc0', self.base + '/missing', self.base + '/slow', 'ftp://x'])
+                again = await fetcher.fetch(self.base + '/doc0')
+                return first, again
+
+        (doc, missing, slow, invalid), again = asyncio.run(run())
+
+        self.assertTrue(doc.ok)
+        self.assertEqual(doc.attempts, 3)
+        self.assertEqual(doc.text, PageHandler.pages['/doc0'].decode('utf-8'))
+        # 404 is final, the slow page times out on every attempt
+        self.assertEqual((missing.status, missing.attempts), (404, 1))
+        self.assertFalse(slow.ok)
+        self.assertEqual(slow.attempts, 4)
+        self.assertIn('Invalid URL', invalid.error)
+
+        self.assertTrue(again.not_modified)
+        self.assertEqual(again.status, 304)
+        self.assertEqual(again.text, doc.text)
+        self.assertIsNotNone(PageHandler.requests[-1][1])
+
+    def test_timeout_excludes_queueing(self):
+        # eight 0.2 s pages through one connection take 1.6 s, but each request is well within its 0.5 s
+        urls = [self.base + f'/pause{i}' for i in range(8)]
+
+        async def run():
+            async with AsyncHTMLFetcher(concurrency=1, timeout=0.5, retries=0) as fetcher:
+                return [result async for result in fetcher.iter_fetch(iter(urls))], await fetcher.fetch_all(urls[:4])
+
+        streamed, gathered = asyncio.run(run())
+        self.assertTrue(all(result.ok for result in streamed + gathered))
+        self.assertSetEqual({result.url for result in streamed}, set(urls))
+        self.assertListEqual([result.url for result in gathered], urls[:4])
+
+    def test_from_urls_parses_as_pages_arrive(self):
+        urls = [self.base + f'/doc{i}' for i in range(3)] + [self.base + '/missing']
+        parsed = {result.url: (result, df) for result, df in HTMLParser.from_urls(urls, per_host=2, workers=0)}
+
+        self.assertSetEqual(set(parsed), set(urls))
+        self.assertIsNone(parsed[urls[-1]][1])
+        for i, url in enumerate(urls[:3]):
+            expected = HTMLParser(PageHandler.pages[f'/doc{i}'].decode('utf-8')).parse()
+            self.assertListEqual(parsed[url][1]['text_content'].tolist(), expected['text_content'].tolist())
+
+
+class TestValidateUrl(unittest.TestCase):
+    def test_validate_url(self):
+        self.assertEqual(validate_url('https://example.io/a?b=1'), 'https://example.io/a?b=1')
+        for url in ['example.com', 'ftp://example.com', 'http://', 'http ://x.com', None]:
+            with self.assertRaises(ValueError):
+                validate_url(url)
+
+
+if __name__ == '__main__':
+    unittest.main()
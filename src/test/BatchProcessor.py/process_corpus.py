@@ -0,0 +1,67 @@
+#%%
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.BatchProcessor import iter_corpus, process_corpus
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+class TestProcessCorpus(unittest.TestCase):
+    def test_ordered_results_and_failures(self):
+        paths = [DATA_FILES[4], os.path.join(ROOT, 'data', 'missing.html'), DATA_FILES[0]]
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                results = process_corpus(paths, workers=workers, chunk_kwargs={'cutoff': 7})
+
+                self.assertListEqual([result.path for result in results], paths)
+                self.assertListEqual([result.ok for result in results], [True, False, True])
+                self.assertIn('FileNotFoundError', results[1].error)
+
+                with open(paths[2], 'r') as html_file:
+                    expected = TextChunker(HTMLParser(html_file.read()).parse()).chunk_text(cutoff=7)
+                self.assertListEqual(results[2].chunks, expected)
+                self.assertTrue({'read', 'parse', 'chunk', 'total'} <= set(results[2].timings))
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'the workers must inherit the patched parser')
+    def test_crashed_worker(self):
+        # a document killing its worker fails alone, the pool is restarted for the others
+        parse = HTMLParser.parse
+
+        def crash(parser):
+            if 'crash me' in parser.html_content:
+                os._exit(1)
+            return parse(parser)
+
+        with tempfile.TemporaryDirectory() as directory:
+            crashing = os.path.join(directory, 'crash.html')
+            with open(crashing, 'w') as html_file:
+                html_file.write('<html><body><p>crash me</p></body></html>')
+            paths = DATA_FILES[:3] + [crashing] + DATA_FILES[3:6]
+            with mock.patch.object(HTMLParser, 'parse', crash):
+                results = process_corpus(paths, workers=2)
+
+        self.assertListEqual([result.path for result in results], paths)
+        self.assertListEqual([result.ok for result in results], [path != crashing for path in paths])
+        self.assertIn('BrokenProcessPool', results[3].error)
+        self.assertTrue(all(result.chunks for result in results if result.ok))
+
+    def test_largest_first(self):
+        results = list(iter_corpus(DATA_FILES, workers=1))
+        sizes = [os.path.getsize(result.path) for result in results]
+        self.assertListEqual(sizes, sorted(sizes, reverse=True))
+
+if __name__ == '__main__':
+    unittest.main()
+
+# %%
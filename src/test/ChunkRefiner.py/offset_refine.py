@@ -0,0 +1,84 @@
+#%%
+import glob
+import os
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.ChunkRefiner import ChunkRefiner, Node
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.Tokenizer import DEFAULT_TOKENIZER
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+BOUNDS = [(100, 650), (50, 200), (300, 2000), (1000, 5000)]
+
+
+def legacy_refine(chunk_texts, lower_bound, upper_bound, sel_metric):
+    # the former linked list algorithm, re-measuring the concatenated text of the current chunk on every step
+    length = {
+        'words': lambda text: len(text.split(' ')),
+        'characters': len,
+        # the joined text is tokenized again, the offsets path sums the row counts
+        'tokens': lambda text: int(DEFAULT_TOKENIZER.count([text])[0]),
+    }[sel_metric]
+    chunks = [[texts] for texts in chunk_texts]
+    cur = 0
+    while cur + 1 < len(chunks):
+        cur_text = ' '.join(t for texts in chunks[cur] for t in texts)
+        next_text = ' '.join(t for texts in chunks[cur + 1] for t in texts)
+        if length(cur_text) < lower_bound and length(cur_text) + length(next_text) <= upper_bound:
+            chunks[cur] += chunks.pop(cur + 1)
+        else:
+            cur += 1
+    return [sum(len(texts) for texts in merged) for merged in chunks]
+
+
+class TestOffsetRefine(unittest.TestCase):
+    def test_boundaries_match_legacy(self):
+        for path in DATA_FILES:
+            with open(path, 'r') as html_file:
+                df = HTMLParser(html_file.read()).parse()
+            scores = TextChunker(df)._calculate_scores(df)
+
+            for cutoff in [4, 7]:
+                starts = np.flatnonzero(scores >= cutoff)
+                if len(starts) == 0 or starts[0] != 0:
+                    starts = np.concatenate(([0], starts))
+                stops = np.append(starts[1:], len(df))
+                chunk_texts = [df['text_content'].iloc[start:stop].tolist() for start, stop in zip(starts, stops)]
+
+                for sel_metric in ChunkRefiner.METRICS:
+                    for lower_bound, upper_bound in BOUNDS:
+                        with self.subTest(file=os.path.basename(path), cutoff=cutoff, metric=sel_metric, bounds=(lower_bound, upper_bound)):
+                            boundaries = ChunkRefiner.refine_boundaries(df['text_content'], starts, lower_bound, upper_bound, sel_metric)
+                            expected = legacy_refine(chunk_texts, lower_bound, upper_bound, sel_metric)
+                            self.assertListEqual([stop - start for start, stop in boundaries], expected)
+                            self.assertEqual(boundaries[-1][1], len(df))
+
+    def test_frame_list_api(self):
+        chunks = [pd.DataFrame({'text_content': texts}) for texts in [['a b'], ['c'], ['d e f g'], ['h']]]
+        refined = ChunkRefiner(chunks).refine(lower_bound=3, upper_bound=4, sel_metric='words')
+        self.assertListEqual([chunk['text_content'].tolist() for chunk in refined], [['a b', 'c'], ['d e f g'], ['h']])
+
+    def test_deprecated_node(self):
+        with self.assertWarns(DeprecationWarning):
+            node = Node(pd.DataFrame({'text_content': ['a b', 'c']}))
+        with self.assertWarns(DeprecationWarning):
+            node.mergechunks(Node(pd.DataFrame({'text_content': ['d']})))
+        self.assertEqual(node.__fulltext__(), 'a b c d')
+        self.assertEqual(node.__wordscnt__(), 4)
+        self.assertEqual(node.__charlen__(), 7)
+
+    def test_invalid_metric(self):
+        with self.assertRaises(ValueError):
+            ChunkRefiner.refine_boundaries(pd.Series(['a']), [0], 1, 2, sel_metric='sentences')
+
+if __name__ == '__main__':
+    unittest.main()
+
+# %%
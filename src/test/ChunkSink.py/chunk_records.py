@@ -0,0 +1,107 @@
+#%%
+import glob
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.ChunkSink import ChunkSink
+
+PATHS = sorted(glob.glob(os.path.join(ROOT, 'data', 'ASU_2022-0*.html')))
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def read_jsonl(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as records_file:
+        return [json.loads(line) for line in records_file]
+
+
+class TestChunkSink(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.chunkers = {path: TextChunker(HTMLParser(open(path).read()).parse()) for path in PATHS[:3]}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_jsonl_records(self):
+        path = os.path.join(self.directory.name, 'chunks.jsonl.gz')
+        with ChunkSink(path, batch_size=4) as sink:
+            for document_id, chunker in self.chunkers.items():
+                sink.write_chunks(document_id, chunker.chunk_text(keep_text_only=False))
+            self.assertLess(sink.stats()['buffered'], 4)
+        self.assertGreater(sink.batches, 1)
+
+        records = read_jsonl(path)
+        self.assertEqual(len(records), sink.records)
+        for document_id, chunker in self.chunkers.items():
+            document = [record for record in records if record['document_id'] == document_id]
+            self.assertListEqual([record['text'] for record in document], chunker.chunk_text())
+            self.assertListEqual([record['chunk_index'] for record in document], list(range(len(document))))
+            # the row ranges cover the document
+            self.assertEqual(document[0]['row_start'], 0)
+            self.assertEqual(document[-1]['row_stop'], len(chunker.df))
+            self.assertTrue(all(a['row_stop'] == b['row_start'] for a, b in zip(document, document[1:])))
+            # the views give the same records
+            views = list(ChunkSink.chunk_records(document_id, chunker.chunk_text(as_views=True)))
+            self.assertListEqual(views, document)
+
+    def test_buffer_bound(self):
+        path = os.path.join(self.directory.name, 'chunks.jsonl')
+        chunks = self.chunkers[PATHS[0]].chunk_text()
+        with ChunkSink(path, batch_size=10 ** 6, max_buffer_bytes=1000) as sink:
+            sink.write_chunks('doc', chunks)
+            self.assertLessEqual(sink.stats()['buffered'], 1)
+        with open(path, encoding='utf-8') as records_file:
+            self.assertListEqual([json.loads(line)['text'] for line in records_file], chunks)
+
+    def test_row_positions(self):
+        # the row ranges are positions, not index labels
+        df = self.chunkers[PATHS[0]].df
+        expected = list(ChunkSink.chunk_records('doc', TextChunker(df).chunk_text(keep_text_only=False)))
+        for index in [df.index[::-1], df.index * 2, 'row' + df.index.astype(str)]:
+            chunks = TextChunker(df.set_axis(index)).chunk_text(keep_text_only=False)
+            self.assertListEqual(list(ChunkSink.chunk_records('doc', chunks)), expected)
+
+    def test_buffer_bytes(self):
+        # the bound counts encoded bytes, not characters
+        path = os.path.join(self.directory.name, 'chunks.jsonl')
+        with ChunkSink(path, batch_size=10 ** 6, max_buffer_bytes=12) as sink:
+            sink.write_chunks('doc', ['ééé', 'ééé'])
+            self.assertEqual(sink.stats()['buffered'], 0)
+            sink.write_chunks('doc', ['eee', 'eee'])
+            self.assertEqual(sink.stats()['buffered'], 2)
+
+    def test_discard_on_error(self):
+        path = os.path.join(self.directory.name, 'chunks.jsonl.gz')
+        with self.assertRaises(RuntimeError):
+            with ChunkSink(path, batch_size=1) as sink:
+                sink.write_chunks('doc', ['a', 'b'])
+                raise RuntimeError('interrupted')
+        self.assertListEqual(os.listdir(self.directory.name), [])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow.parquet
+        path = os.path.join(self.directory.name, 'chunks.parquet')
+        chunks = self.chunkers[PATHS[0]].chunk_text(keep_text_only=False)
+        with ChunkSink(path, batch_size=3) as sink:
+            sink.write_chunks('doc', chunks)
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.num_rows, len(chunks))
+        self.assertListEqual(table.column('text').to_pylist(), self.chunkers[PATHS[0]].chunk_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
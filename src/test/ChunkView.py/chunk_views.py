@@ -0,0 +1,48 @@
+#%%
+import glob
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+class TestChunkView(unittest.TestCase):
+    def test_views_match_materialised_chunks(self):
+        for path in DATA_FILES[:3]:
+            with open(path, 'r') as html_file:
+                df = HTMLParser(html_file.read()).parse()
+            for kwargs in [{}, {'refine': False}, {'sel_metric': 'characters', 'lower_bound': 300, 'upper_bound': 2000}]:
+                with self.subTest(path=os.path.basename(path), **kwargs):
+                    chunker = TextChunker(df)
+                    views = chunker.chunk_text(as_views=True, **kwargs)
+                    texts = chunker.chunk_text(**kwargs)
+                    frames = chunker.chunk_text(keep_text_only=False, **kwargs)
+
+                    self.assertListEqual([view.text for view in views], texts)
+                    self.assertListEqual([view.word_count for view in views], [len(text.split(' ')) for text in texts])
+                    self.assertListEqual([view.char_count for view in views], [len(text) for text in texts])
+                    self.assertListEqual([view.max_score for view in views], [frame['total_score'].max() for frame in frames])
+                    for view, frame in zip(views, frames):
+                        pd.testing.assert_frame_equal(view.to_frame(), frame)
+
+    def test_views_share_the_frame(self):
+        with open(DATA_FILES[0], 'r') as html_file:
+            df = HTMLParser(html_file.read()).parse()
+        views = TextChunker(df).chunk_text(as_views=True)
+        self.assertEqual(sum(len(view) for view in views), len(df))
+        self.assertTrue(all(view.chunker.df is df for view in views))
+        self.assertEqual(views[0].start, 0)
+        self.assertEqual(views[-1].stop, len(df))
+
+
+if __name__ == '__main__':
+    unittest.main()
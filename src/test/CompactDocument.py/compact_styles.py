@@ -0,0 +1,51 @@
+#%%
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.CompactDocument import CompactDocument
+
+
+class TestCompactDocument(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join(ROOT, 'data', 'ASU_2022-02.html'), 'r') as html_file:
+            cls.html_content = html_file.read()
+        cls.df = HTMLParser(cls.html_content).parse()
+        cls.document = HTMLParser(cls.html_content).parse_compact()
+
+    def test_wide_view(self):
+        self.assertIsInstance(self.document, CompactDocument)
+        self.assertEqual(len(self.document), len(self.df))
+        self.assertLess(len(self.document.styles), len(self.df))
+        pd.testing.assert_frame_equal(self.document.to_frame(), self.df)
+        pd.testing.assert_series_equal(self.document['font_size'], self.df['font_size'])
+
+    def test_chunks(self):
+        for kwargs in ({}, {'cutoff': 5, 'refine': False}, {'auto_adjust_cutoff': True, 'sel_metric': 'characters'}):
+            expected = TextChunker(self.df).chunk_text(**kwargs)
+            self.assertListEqual(TextChunker(self.document).chunk_text(**kwargs), expected)
+
+        chunker = TextChunker(self.document)
+        self.assertTrue((chunker.scores == TextChunker(self.df).scores).all())
+        frames = chunker.chunk_text(keep_text_only=False)
+        expected = TextChunker(self.df).chunk_text(keep_text_only=False)
+        self.assertEqual(len(frames), len(expected))
+        for frame, expected_frame in zip(frames, expected):
+            pd.testing.assert_frame_equal(frame, expected_frame)
+
+    def test_get_text(self):
+        parser = HTMLParser(self.html_content)
+        parser.parse_compact()
+        self.assertEqual(parser.get_text(), ' '.join(self.df['text_content']))
+
+
+if __name__ == '__main__':
+    unittest.main()
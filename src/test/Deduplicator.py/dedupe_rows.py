@@ -0,0 +1,94 @@
+#%%
+import glob
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.StreamChunker import iter_chunks
+from src.main.TextParsing.Deduplicator import Deduplicator
+from src.main.TextParsing.BoilerplateIndex import BoilerplateIndex
+from src.main.TextParsing.DocumentCache import DocumentCache
+
+PATHS = sorted(glob.glob(os.path.join(ROOT, 'data', 'ASU_2022-0*.html')))
+
+
+def read(path):
+    with open(path, 'r') as html_file:
+        return html_file.read()
+
+
+class TestDeduplicator(unittest.TestCase):
+    def test_within_document(self):
+        html_content = read(PATHS[1])
+        texts = HTMLParser(html_content).parse()['text_content'].tolist()
+        parser = HTMLParser(html_content, dedupe=True, stats=True)
+        kept = parser.parse()['text_content'].tolist()
+
+        seen, expected = set(), []
+        for text in texts:
+            normalized = Deduplicator.normalize(text)
+            if len(normalized) >= 6:
+                if normalized in seen:
+                    continue
+                seen.add(normalized)
+            expected.append(text)
+        self.assertListEqual(kept, expected)
+        self.assertLess(len(kept), len(texts))
+        self.assertEqual(parser.stats.counters['duplicate_rows'], len(texts) - len(kept))
+
+        # the streaming chunker removes the same rows
+        chunks = TextChunker(HTMLParser(html_content, dedupe=True).parse()).chunk_text()
+        self.assertListEqual(list(iter_chunks(PATHS[1], dedupe=True)), chunks)
+
+    def test_boilerplate_index(self):
+        index = BoilerplateIndex(min_documents=3)
+        for path in PATHS[:4]:
+            HTMLParser(read(path), dedupe=index).parse()
+        self.assertEqual(index.documents, 4)
+        self.assertGreater(index.stats()['boilerplate'], 0)
+
+        dedupe = Deduplicator()
+        parser = HTMLParser(read(PATHS[4]), dedupe=Deduplicator(index=index, learn=False), stats=True)
+        texts = parser.parse()['text_content'].tolist()
+        self.assertGreater(parser.stats.counters['boilerplate_rows'], 0)
+        self.assertFalse(any(index.is_boilerplate(dedupe.fingerprint(text)) for text in texts if dedupe.fingerprint(text) is not None))
+        self.assertEqual(index.documents, 4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.npz')
+            index.save(path)
+            loaded = BoilerplateIndex.load(path)
+            self.assertEqual(loaded.counts, index.counts)
+            self.assertEqual(loaded.documents, 4)
+
+            # a result depending on the index is not cached
+            cache = DocumentCache(os.path.join(directory, 'cache'))
+            self.assertIsNone(cache.document_key(read(PATHS[4]), dedupe=index))
+            cache.chunk_text(read(PATHS[4]), parser_kwargs={'dedupe': Deduplicator(index=index, learn=False)})
+            self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_bound(self):
+        index = BoilerplateIndex(min_documents=2, max_entries=100)
+        for document in range(10):
+            # ten fingerprints common to every document and 50 unique ones
+            index.add_document(list(range(10)) + list(range(1000 + document * 50, 1050 + document * 50)))
+        self.assertLessEqual(len(index), 100)
+        self.assertGreater(index.dropped, 0)
+        self.assertTrue(all(index.document_frequency(fingerprint) == 10 for fingerprint in range(10)))
+
+        # equal counts: shrinking keeps 3/4 of the bound instead of dropping every fingerprint tied at the cut
+        index = BoilerplateIndex(min_documents=2, max_entries=100)
+        index.add_document(range(101))
+        self.assertEqual(len(index), 75)
+        self.assertEqual(index.dropped, 26)
+        self.assertTrue(all(fingerprint in index for fingerprint in range(75)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#%%
+import glob
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.DocumentCache import DocumentCache
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as html_file:
+        return html_file.read()
+
+
+class TestDocumentCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_round_trip_and_warm_run_skips_parsing(self):
+        html = read(DATA_FILES[0])
+        expected = HTMLParser(html).parse()
+
+        cache = DocumentCache(self.directory.name)
+        pd.testing.assert_frame_equal(cache.parse(html), expected)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        # a second process opening the same directory reads the frame back without parsing
+        warm = DocumentCache(self.directory.name)
+        with mock.patch.object(HTMLParser, 'parse', side_effect=AssertionError('parsed again')):
+            pd.testing.assert_frame_equal(warm.parse(html), expected)
+        self.assertEqual(warm.hits, 1)
+
+    def test_chunks_keyed_by_parameters(self):
+        html = read(DATA_FILES[1])
+        cache = DocumentCache(self.directory.name)
+        for cutoff in [5, 7, 5]:
+            expected = TextChunker(HTMLParser(html).parse()).chunk_text(cutoff=cutoff)
+            self.assertListEqual(cache.chunk_text(html, cutoff=cutoff), expected)
+        # cutoff 7 reused the parsed frame, cutoff 5 was answered from the chunk entry and the frame on the third call
+        self.assertEqual(cache.hits, 3)
+
+        key = cache.document_key(html)
+        self.assertNotEqual(key, cache.document_key(html, tag_types={'h1': 'header1'}))
+        self.assertNotEqual(cache.chunk_key(key, cutoff=5), cache.chunk_key(key, cutoff=5, score_dict={}))
+        # defaults given explicitly and the output options do not change the key
+        self.assertEqual(cache.chunk_key(key), cache.chunk_key(key, cutoff=7, refine=True))
+        self.assertEqual(cache.chunk_key(key), cache.chunk_key(key, keep_text_only=False, as_views=True))
+        with self.assertRaises(TypeError):
+            cache.chunk_key(key, cut_off=7)
+
+        # one entry serves the text, DataFrame and view chunks
+        texts = cache.chunk_text(html, cutoff=7)
+        entries = cache.stats()['entries']
+        frames = cache.chunk_text(html, keep_text_only=False)
+        self.assertListEqual([frame['text_content'].str.cat(sep=' ') for frame in frames], texts)
+        views = cache.chunk_text(html, as_views=True)
+        self.assertListEqual([view.text for view in views], texts)
+        self.assertEqual(cache.stats()['entries'], entries)
+
+    def test_size_bound_evicts_least_recently_used(self):
+        cache = DocumentCache(self.directory.name, max_bytes=1)
+        cache.parse(read(DATA_FILES[2]))
+        cache.parse(read(DATA_FILES[3]))
+        self.assertLessEqual(cache.size(), 1)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+        cache.max_bytes = 1 << 30
+        for path in DATA_FILES[:3]:
+            cache.parse(read(path))
+        sizes = cache.size()
+        cache.max_bytes = sizes - 1
+        cache.load_frame(cache.document_key(read(DATA_FILES[0])))
+        os.utime(os.path.join(self.directory.name, 'docs', cache.document_key(read(DATA_FILES[0]))), (1e10, 1e10))
+        self.assertGreater(cache.evict(), 0)
+        self.assertIsNotNone(cache.load_frame(cache.document_key(read(DATA_FILES[0]))))
+        self.assertIsNone(cache.load_frame(cache.document_key(read(DATA_FILES[1]))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#%%
+import glob
+import io
+import os
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.StreamChunker import iter_chunks
+from src.main.TextParsing.TextChunker import TextChunker
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+def normalize_tags(df):
+    # the simplified tags of a row come out of a set, so compare them order independently
+    df = df.copy()
+    df['tags'] = df['tags'].map(lambda tags: ', '.join(sorted(t for t in tags.split(', ') if t)))
+    return df
+
+
+class TestBackendParity(unittest.TestCase):
+    def test_parsed_frames_match_bs4(self):
+        for path in DATA_FILES:
+            with open(path, 'r') as html_file:
+                html_content = html_file.read()
+            expected = normalize_tags(HTMLParser(html_content).parse())
+
+            for backend in ['lxml', 'stream']:
+                with self.subTest(file=os.path.basename(path), backend=backend):
+                    result = normalize_tags(HTMLParser(html_content, backend=backend).parse())
+                    self.assertEqual(list(result.columns), list(expected.columns))
+                    self.assertTrue(result.equals(expected))
+
+    def test_chunks_match_bs4(self):
+        for path in DATA_FILES:
+            with open(path, 'r') as html_file:
+                html_content = html_file.read()
+            expected = TextChunker(HTMLParser(html_content).parse()).chunk_text(cutoff=7)
+
+            for backend in ['lxml', 'stream']:
+                with self.subTest(file=os.path.basename(path), backend=backend):
+                    result = TextChunker(HTMLParser(html_content, backend=backend).parse()).chunk_text(cutoff=7)
+                    self.assertListEqual(result, expected)
+
+    def test_late_stylesheet(self):
+        # a <style> after the rows it styles applies to the whole document in every backend
+        html_content = '<html><body><p class="x">a</p><style>.x{font-size:20pt}</style><p class="x">b</p></body></html>'
+        for backend in HTMLParser.BACKENDS:
+            with self.subTest(backend=backend):
+                df = HTMLParser(html_content, backend=backend).parse()
+                self.assertListEqual(df['font_size'].tolist(), ['20pt', '', '20pt'])
+        # a list of pieces is read twice as well
+        self.assertEqual(HTMLParser([html_content[:20], html_content[20:]], backend='stream').parse()['font_size'][0], '20pt')
+        # a one shot iterator cannot be read twice, its stylesheets only apply from where they close
+        self.assertEqual(HTMLParser(iter([html_content]), backend='stream').parse()['font_size'][0], '')
+
+    def test_deep_nesting(self):
+        def nested(depth):
+            return '<html><body><p>top</p>' + '<div>' * depth + 'deep' + '</div>' * depth + '<p>end</p></body></html>'
+
+        # libxml2 gives up past its depth limit, the backends built on it raise instead of dropping rows
+        html_content = nested(3000)
+        self.assertListEqual(HTMLParser(html_content).parse()['text_content'].tolist(), ['top', 'deep', 'end'])
+        for backend in ['lxml', 'stream']:
+            with self.subTest(backend=backend):
+                with self.assertRaisesRegex(ValueError, 'nested deeper'):
+                    HTMLParser(html_content, backend=backend).parse()
+
+        html_content = nested(2000)
+        for backend in HTMLParser.BACKENDS:
+            with self.subTest(backend=backend):
+                df = HTMLParser(html_content, backend=backend).parse()
+                self.assertListEqual(df['text_content'].tolist(), ['top', 'deep', 'end'])
+
+    def test_empty_document(self):
+        for html_content in ['', ' \n\t ']:
+            expected = HTMLParser(html_content).parse()
+            self.assertEqual(len(expected), 0)
+            for backend in ['lxml', 'stream']:
+                with self.subTest(html=html_content, backend=backend):
+                    result = HTMLParser(html_content, backend=backend).parse()
+                    self.assertListEqual(list(result.columns), list(expected.columns))
+                    self.assertTrue(result.equals(expected))
+                    self.assertListEqual(TextChunker(result).chunk_text(cutoff=7), [])
+            with self.subTest(html=html_content, source='iter_chunks'):
+                self.assertListEqual(list(iter_chunks([html_content])), [])
+                self.assertListEqual(list(iter_chunks(io.BytesIO(html_content.encode('utf-8')))), [])
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            HTMLParser('<html></html>', backend='html5lib')
+
+if __name__ == '__main__':
+    unittest.main()
+
+# %%
@@ -0,0 +1,95 @@
+#%%
+import os
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.Instrumentation import MetricsRegistry, Stats
+
+
+def read(name):
+    with open(os.path.join(ROOT, 'data', name), 'r') as html_file:
+        return html_file.read()
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_disabled_by_default(self):
+        parser = HTMLParser(read('ASU_2022-05.html'))
+        chunker = TextChunker(parser.parse())
+        chunker.chunk_text()
+        self.assertIsNone(parser.stats)
+        self.assertIsNone(chunker.stats)
+
+    def test_stage_timers_and_counters(self):
+        html = read('ASU_2022-05.html')
+        for backend in HTMLParser.BACKENDS:
+            with self.subTest(backend=backend):
+                parser = HTMLParser(html, backend=backend, stats=True)
+                df = parser.parse()
+                stats = parser.stats.to_dict()
+                self.assertTrue({'build', 'styles', 'walk', 'frame', 'total'} <= set(stats['stages']))
+                self.assertEqual(stats['counters']['rows'], len(df))
+                self.assertGreaterEqual(stats['counters']['text_nodes'], len(df))
+                self.assertGreater(stats['counters']['nodes'], 0)
+                self.assertEqual(stats['counters']['styles'], len(parser.data.style_values) - 1)
+
+        chunker = TextChunker(df, stats=True)
+        chunks = chunker.chunk_text()
+        counters = chunker.stats.counters
+        self.assertEqual(counters['chunks'], len(chunks))
+        self.assertEqual(counters['chunks_before_refine'] - counters['merges'], len(chunks))
+        self.assertEqual(counters['chunks_before_refine'], len(chunker.chunk_text(refine=False)))
+        self.assertEqual(chunker.stats.calls['score'], 1)
+        self.assertEqual(chunker.stats.calls['total'], 2)
+
+    def test_split_counts(self):
+        chunker = TextChunker(HTMLParser(read('ASU_2022-02.html')).parse(), stats=True)
+        chunks = chunker.chunk_text(lower_bound=50, upper_bound=100, split_oversized=True)
+        counters = chunker.stats.counters
+        self.assertGreater(counters['splits'], 0)
+        self.assertGreaterEqual(counters['merges'], 0)
+        self.assertEqual(counters['chunks_before_refine'] - counters['merges'] + counters['splits'], len(chunks))
+        registry = MetricsRegistry()
+        registry.add(chunker.stats)
+        self.assertNotRegex(registry.to_prometheus(), r'\} -')
+
+    def test_hooks_and_prometheus_export(self):
+        registry = MetricsRegistry()
+        events = []
+        for name in ['ASU_2022-05.html', 'ASU_2022-06.html']:
+            parser = HTMLParser(read(name), backend='lxml', stats=registry)
+            parser.stats.add_hook(lambda stats, stage, seconds: events.append((stats.component, stage)))
+            TextChunker(parser.parse(), stats=registry).chunk_text()
+
+        self.assertIn(('parser', 'total'), events)
+        self.assertEqual(registry.runs, {'parser': 2, 'chunker': 2})
+
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE html_text_parser_stage_seconds_total counter', text)
+        self.assertIn('html_text_parser_runs_total{component="chunker"} 2', text)
+        self.assertRegex(text, r'html_text_parser_rows_total\{component="parser"\} \d+')
+        self.assertRegex(text, r'html_text_parser_stage_seconds_total\{component="parser",stage="walk"\} [0-9.e-]+')
+
+        openmetrics = registry.to_prometheus(openmetrics=True)
+        self.assertIn('# TYPE html_text_parser_merges counter', openmetrics)
+        self.assertTrue(openmetrics.endswith('# EOF\n'))
+
+    def test_reused_stats_counted_once(self):
+        registry = MetricsRegistry()
+        stats = Stats('chunker', hooks=[registry])
+        chunker = TextChunker(HTMLParser(read('ASU_2022-05.html')).parse(), stats=stats)
+        chunker.chunk_text(cutoff=7)
+        chunker.chunk_text(cutoff=5)
+        self.assertEqual(registry.counters[('chunker', 'chunks')], stats.counters['chunks'])
+        self.assertEqual(registry.counters[('chunker', 'scored_rows')], len(chunker.df))
+
+        with self.assertRaises(ValueError):
+            Stats.resolve('yes', 'parser')
+
+
+if __name__ == '__main__':
+    unittest.main()
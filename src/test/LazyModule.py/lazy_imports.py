@@ -0,0 +1,59 @@
+#%%
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main import TextParsing
+from src.main.TextParsing.LazyModule import LazyModule
+
+
+def heavy_modules_after(statement):
+    # a fresh interpreter, the test process has imported pandas already
+    script = f'{statement}\nimport sys\nprint(",".join(sorted({{"pandas", "numpy", "bs4"}} & set(sys.modules))))'
+    completed = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return completed.stdout.strip()
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_imports_are_light(self):
+        for module in ('src.main.TextParsing', 'src.main.TextParsing.HTMLParser', 'src.main.TextParsing.TextChunker',
+                       'src.main.TextParsing.StreamChunker', 'src.main.TextParsing.BatchProcessor'):
+            with self.subTest(module=module):
+                self.assertEqual(heavy_modules_after(f'import {module}'), '')
+
+    def test_text_only_paths_skip_pandas(self):
+        path = os.path.join(ROOT, 'data', 'ASU_2022-02.html')
+        self.assertEqual(heavy_modules_after(
+            f'from src.main import TextParsing\nchunks = list(TextParsing.iter_chunks({path!r}))\nassert chunks'), '')
+        self.assertEqual(heavy_modules_after(
+            f'from src.main import TextParsing\nassert TextParsing.get_text(open({path!r}).read(), backend="lxml")'), '')
+
+    def test_top_level_api(self):
+        from src.main.TextParsing.HTMLParser import HTMLParser
+        from src.main.TextParsing.TextChunker import TextChunker
+        from src.main.TextParsing.StreamChunker import iter_chunks
+
+        with open(os.path.join(ROOT, 'data', 'ASU_2022-02.html'), 'r') as html_file:
+            html_content = html_file.read()
+        df = HTMLParser(html_content).parse()
+        self.assertEqual(TextParsing.get_text(html_content), HTMLParser(html_content).get_text())
+        self.assertListEqual(TextParsing.chunk_text(html_content, cutoff=5), TextChunker(df).chunk_text(cutoff=5))
+        self.assertEqual(len(TextParsing.parse(html_content, compact=True)), len(df))
+        self.assertIs(TextParsing.iter_chunks, iter_chunks)
+        with self.assertRaises(AttributeError):
+            TextParsing.missing_name
+
+    def test_lazy_module(self):
+        module = LazyModule('json')
+        self.assertEqual(module.dumps([1]), '[1]')
+        self.assertTrue(module.loaded)
+        with self.assertRaises(AttributeError):
+            module.dumps = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#%%
+import glob
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing import ParserBackend
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.ParallelWalk import split_children, walk_parallel
+
+PATHS = sorted(glob.glob(os.path.join(ROOT, 'data', 'ASU_2022-0*.html')))
+
+PAGE = """
+<html><head><style>.page { font-family: Arial; color: #111 } .big { font-size: 20pt }</style></head>
+<body class="page" style="font-weight: bold" data-list-text="0.">
+  Leading text
+  <h1 class="big">Title</h1><!-- a comment -->
+  <p>First <b>bold</b> paragraph</p> tail text
+  <div style="color: red"><p>Red</p><p class="big">Big red</p></div>
+  <p>Last paragraph</p>
+</body></html>
+"""
+
+
+def read(path):
+    with open(path, 'r') as html_file:
+        return html_file.read()
+
+
+class TestParallelWalk(unittest.TestCase):
+    def setUp(self):
+        # walk the small test documents in parallel too
+        self.min_bytes = HTMLParser.PARALLEL_MIN_BYTES
+        HTMLParser.PARALLEL_MIN_BYTES = 0
+
+    def tearDown(self):
+        HTMLParser.PARALLEL_MIN_BYTES = self.min_bytes
+
+    def test_split_children(self):
+        body = ParserBackend.find_body(ParserBackend.parse_lxml(read(PATHS[0])))
+        ranges = split_children(body, 8)
+        self.assertEqual(len(ranges), 8)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(body))
+        self.assertTrue(all(stop == next_start for (_, stop), (next_start, _) in zip(ranges, ranges[1:])))
+        self.assertEqual(split_children(body, 10 ** 6)[-1], (len(body) - 1, len(body)))
+
+    def test_inherited_context(self):
+        serial = HTMLParser(PAGE, backend='lxml').parse()
+        parser = HTMLParser(PAGE, backend='lxml')
+        self.assertEqual(walk_parallel(parser, 2, parts=5), 5)
+        pd.testing.assert_frame_equal(parser.data.to_frame(parser._tag_bits()[1]), serial)
+        self.assertEqual(serial['text_content'].tolist().count('0.'), 1)
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'workers are only forked on Linux')
+    def test_tree_inherited(self):
+        # forked workers walk the tree of the parent, the document is neither sent nor parsed again
+        serial = HTMLParser(PAGE, backend='lxml').parse()
+        parser = HTMLParser(PAGE, backend='lxml')
+        parser.html_content = PAGE.replace('Title', 'Other')
+        walk_parallel(parser, 2, parts=3, fork=True)
+        pd.testing.assert_frame_equal(parser.data.to_frame(parser._tag_bits()[1]), serial)
+
+    def test_parsed_again_by_default(self):
+        # without the opt in, the workers parse the document again whatever the platform
+        parser = HTMLParser(PAGE, backend='lxml')
+        parser.html_content = PAGE.replace('Title', 'Other')
+        walk_parallel(parser, 2, parts=3)
+        self.assertIn('Other', list(parser.data.text))
+        self.assertNotIn('Title', list(parser.data.text))
+
+    def test_same_as_serial(self):
+        for path in PATHS[:3]:
+            html_content = read(path)
+            serial = HTMLParser(html_content, backend='lxml', stats=True)
+            parallel = HTMLParser(html_content, backend='lxml', workers=2, stats=True)
+            df = parallel.parse()
+            pd.testing.assert_frame_equal(df, serial.parse())
+            self.assertEqual(parallel.stats.counters['nodes'], serial.stats.counters['nodes'])
+            self.assertListEqual(TextChunker(df).chunk_text(), TextChunker(serial.parsed_data).chunk_text())
+
+        html_content = read(PATHS[1])
+        self.assertListEqual(HTMLParser(html_content, backend='lxml', workers=2, dedupe=True).parse_text(),
+                             HTMLParser(html_content, backend='lxml', dedupe=True).parse_text())
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            HTMLParser(PAGE, workers=2)
+        with self.assertRaises(ValueError):
+            HTMLParser(PAGE, backend='lxml', workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#%%
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.ParsingService import ParseEngine, ParsingService, RequestBatcher, ServiceClient
+from src.main.TextParsing.Instrumentation import LatencyRecorder
+
+PATHS = sorted(glob.glob(os.path.join(ROOT, 'data', 'ASU_2022-0*.html')))
+
+
+def read(path):
+    with open(path, 'r') as html_file:
+        return html_file.read()
+
+
+class TestParsingService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # batches run in a thread of the test process, the worker processes are exercised by the load test
+        cls.service = ParsingService(port=0, workers=0).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.close()
+
+    def test_endpoints(self):
+        html_content = read(PATHS[4])
+        with ServiceClient(self.service.address) as client:
+            self.assertListEqual(client.chunk(html_content, cutoff=6), TextChunker(HTMLParser(html_content).parse()).chunk_text(cutoff=6))
+            records = client.chunk(html_content, parser={'backend': 'lxml'}, records=True)
+            self.assertEqual(records[-1]['row_stop'], len(HTMLParser(html_content).parse()))
+            parsed = client.parse(html_content, format='text')
+            self.assertEqual(parsed['text'], HTMLParser(html_content).get_text())
+
+            status, response = client.request('POST', '/chunk', {'html': html_content, 'parser': {'using_url': True}})
+            self.assertEqual(status, 400)
+            self.assertIn('using_url', response['error'])
+            self.assertEqual(client.request('POST', '/chunk', {'html': html_content, 'chunk': {'sel_metric': 'lines'}})[0], 400)
+            self.assertEqual(client.request('GET', '/missing')[0], 404)
+            self.assertGreaterEqual(client.stats()['latency']['chunk']['calls'], 2)
+
+    def test_content_length(self):
+        host, port = self.service.server.server_address[:2]
+
+        def status(headers, body=''):
+            with socket.create_connection((host, port)) as connection:
+                connection.sendall(f'POST /chunk HTTP/1.1\r\nHost: {host}\r\n{headers}\r\n{body}'.encode('ascii'))
+                return int(connection.makefile('rb').readline().split()[1])
+
+        self.assertEqual(status(''), 411)
+        self.assertEqual(status('Content-Length: -5\r\n'), 400)
+        self.assertEqual(status('Content-Length: 12abc\r\n'), 400)
+        self.assertEqual(status(f'Content-Length: {self.service.max_body + 1}\r\n'), 413)
+        # a valid length reaches the endpoint, which rejects the request without html
+        self.assertEqual(status('Content-Length: 2\r\n', '{}'), 400)
+        self.assertEqual(status('Content-Length: 25\r\n', '{"html": "<p>a</p>"}'.ljust(25)), 200)
+
+    def test_port_in_use(self):
+        # a failed bind leaves no worker processes behind
+        port = self.service.server.server_address[1]
+        children = len(multiprocessing.active_children())
+        with self.assertRaises(OSError):
+            ParsingService(port=port, workers=2)
+        self.assertEqual(len(multiprocessing.active_children()), children)
+
+    def test_concurrent_clients(self):
+        expected = {path: TextChunker(HTMLParser(read(path), backend='lxml').parse()).chunk_text() for path in PATHS}
+        mismatches = []
+
+        def send(path):
+            with ServiceClient(self.service.address) as client:
+                for _ in range(3):
+                    if client.chunk(read(path), parser={'backend': 'lxml'}) != expected[path]:
+                        mismatches.append(path)
+
+        threads = [threading.Thread(target=send, args=(path,)) for path in PATHS]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(mismatches, [])
+
+    def test_request_timeout(self):
+        handle = ParseEngine.handle
+
+        def slow_handle(engine, endpoint, request):
+            time.sleep(0.5)
+            return handle(engine, endpoint, request)
+
+        with mock.patch.object(ParseEngine, 'handle', slow_handle), ParsingService(port=0, workers=0, request_timeout=0.1).start() as service:
+            with ServiceClient(service.address) as client:
+                status, response = client.request('POST', '/parse', {'html': read(PATHS[0])})
+        self.assertEqual(status, 504)
+        self.assertIn('0.1 seconds', response['error'])
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'the workers inherit the crashing engine by fork')
+    def test_crashed_worker(self):
+        handle = ParseEngine.handle
+
+        def crashing_handle(engine, endpoint, request):
+            if request['html'] == 'crash':
+                os._exit(1)
+            return handle(engine, endpoint, request)
+
+        html_content = read(PATHS[1])
+        expected = json.loads(ParseEngine().handle('chunk', {'html': html_content})[1])
+        with mock.patch.object(ParseEngine, 'handle', crashing_handle):
+            batcher = RequestBatcher(workers=1, max_wait=0.2)
+            try:
+                # the crash breaks the pool: the innocent requests of its batch run again, the crash fails alone
+                futures = [batcher.submit('chunk', {'html': html}) for html in [html_content, 'crash', html_content]]
+                results = [future.result(timeout=60) for future in futures]
+                self.assertListEqual([status for status, _ in results], [200, 500, 200])
+                self.assertIn('BrokenProcessPool', json.loads(results[1][1])['error'])
+                self.assertEqual(json.loads(results[0][1]), expected)
+                self.assertEqual(batcher.stats()['restarts'], 1)
+            finally:
+                batcher.close()
+
+    def test_killed_worker(self):
+        with ParsingService(port=0, workers=1).start() as service:
+            html_content = read(PATHS[2])
+            with ServiceClient(service.address) as client:
+                self.assertEqual(client.request('POST', '/parse', {'html': html_content})[0], 200)
+                for pid in list(service.batcher._executor._processes):
+                    os.kill(pid, signal.SIGKILL)
+                time.sleep(0.2)
+                # the next requests run on new workers
+                for _ in range(3):
+                    self.assertEqual(client.request('POST', '/parse', {'html': html_content})[0], 200)
+                self.assertEqual(client.request('GET', '/health')[1]['restarts'], 1)
+
+    def test_latency_percentiles(self):
+        latency = LatencyRecorder(window=100)
+        for millisecond in range(1, 201):
+            latency.record('chunk', millisecond / 1e3)
+        summary = latency.to_dict()['chunk']
+        # only the last 100 latencies (101 .. 200 ms) are in the window
+        self.assertEqual(summary['calls'], 200)
+        self.assertAlmostEqual(summary['p50_ms'], 150)
+        self.assertAlmostEqual(summary['p99_ms'], 199)
+        self.assertAlmostEqual(summary['max_ms'], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
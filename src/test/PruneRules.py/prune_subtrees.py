@@ -0,0 +1,96 @@
+#%%
+import os
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing import ParserBackend
+from src.main.TextParsing.ParserBackend import START, TEXT, STYLE
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.PruneRules import PruneRules, BOILERPLATE_PRUNE_RULES
+from src.main.TextParsing.DocumentCache import DocumentCache
+
+PAGE = """
+<html><head><title>Page</title><style>.big { font-size: 20pt }</style></head>
+<body>
+  <nav><a href="/">Home</a> <a href="/about">About</a></nav>
+  <div class="cookie-banner">We use cookies</div>
+  <div id="sidebar"><p>Related</p><p>Popular</p></div>
+  <h1 class="big">Title</h1>
+  <script>var x = 1;</script>
+  <noscript>Enable JavaScript</noscript>
+  <style>.small { font-size: 8pt }</style>
+  <p>First paragraph</p>
+  <div style="display: none"><p>Hidden text</p></div>
+  <div style="color: red; visibility:hidden !important">Invisible</div>
+  <p hidden>Hidden attribute</p>
+  <p class="download-note small">Not an ad</p>
+  <p class="menu-item">Menu entry</p>
+  <div data-list-text="1.">Item</div>
+  <footer><p>Copyright</p></footer>
+</body></html>
+"""
+
+
+class TestPruneRules(unittest.TestCase):
+    def test_default_rules_only_skip_scripts(self):
+        texts = HTMLParser(PAGE).parse()['text_content'].tolist()
+        self.assertNotIn('var x = 1;', texts)
+        for text in ('Home', 'We use cookies', 'Related', 'Hidden text', 'Copyright'):
+            self.assertIn(text, texts)
+
+    def test_boilerplate_rules(self):
+        expected = ['Title', 'First paragraph', 'Not an ad', '1.', 'Item']
+        for backend in HTMLParser.BACKENDS:
+            with self.subTest(backend=backend):
+                parser = HTMLParser(PAGE, backend=backend, prune_rules=BOILERPLATE_PRUNE_RULES, stats=True)
+                df = parser.parse()
+                self.assertListEqual(df['text_content'].tolist(), expected)
+                # stylesheets inside pruned subtrees still apply
+                self.assertEqual(df['font_size'].tolist()[0], '20pt')
+                self.assertEqual(df['font_size'].tolist()[2], '8pt')
+
+                counters = parser.stats.counters
+                self.assertEqual(counters['pruned_subtrees'], 11)
+                self.assertEqual(counters['pruned_rows'], 13)
+                self.assertGreater(counters['pruned_nodes'], counters['pruned_subtrees'])
+
+    def test_iterators_skip_subtrees(self):
+        html_content = ('<html><body><p>keep</p><div class="ad"><style>.x{color:red}</style><p data-list-text="1.">'
+                        'gone <b>deep</b></p></div> tail<p>end</p></body></html>')
+        prune = lambda name, attrs: 'ad' in attrs.get('class', ())
+        soup_body = HTMLParser(html_content).body
+        lxml_body = HTMLParser(html_content, backend='lxml').body
+
+        for backend, iterator in [('bs4', lambda **kwargs: ParserBackend.iter_soup_events(soup_body, **kwargs)),
+                                  ('lxml', lambda **kwargs: ParserBackend.iter_tree_events(lxml_body, **kwargs)),
+                                  ('stream', lambda **kwargs: ParserBackend.iter_stream_events(html_content, **kwargs))]:
+            with self.subTest(backend=backend):
+                counts = []
+                events = list(iterator(prune=prune, on_pruned=lambda nodes, rows: counts.append((nodes, rows))))
+                self.assertListEqual([event[1] for event in events if event[0] == START], ['body', 'p', 'p'])
+                self.assertListEqual([event[1].strip() for event in events if event[0] == TEXT and event[1].strip()],
+                                     ['keep', 'tail', 'end'])
+                # div, style, p and b, the stylesheet, the list text and the two texts of the paragraph
+                self.assertListEqual(counts, [(4, 4)])
+                if backend == 'stream':
+                    self.assertIn((STYLE, '.x{color:red}'), events)
+
+    def test_custom_rules(self):
+        rules = PruneRules(tags=('script', 'nav'), id_patterns=(r'^side',))
+        texts = HTMLParser(PAGE, prune_rules=rules).parse()['text_content'].tolist()
+        self.assertNotIn('Home', texts)
+        self.assertNotIn('Related', texts)
+        self.assertIn('We use cookies', texts)
+        self.assertIn('Hidden text', texts)
+
+    def test_cache_key(self):
+        self.assertEqual(DocumentCache.document_key(PAGE), DocumentCache.document_key(PAGE, prune_rules=PruneRules()))
+        self.assertNotEqual(DocumentCache.document_key(PAGE),
+                            DocumentCache.document_key(PAGE, prune_rules=BOILERPLATE_PRUNE_RULES))
+
+
+if __name__ == '__main__':
+    unittest.main()
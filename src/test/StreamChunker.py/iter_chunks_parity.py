@@ -0,0 +1,61 @@
+#%%
+import glob
+import os
+import sys
+import unittest
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.StreamChunker import iter_chunks
+from src.main.TextParsing.TextChunker import TextChunker
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+SETTINGS = [
+    {},
+    {'refine': False},
+    {'sel_metric': 'characters', 'lower_bound': 300, 'upper_bound': 2000},
+    {'sel_metric': 'tokens', 'lower_bound': 200, 'upper_bound': 800},
+    {'cutoff': 4, 'lower_bound': 1000, 'upper_bound': 3000},
+    {'lower_bound': 20, 'upper_bound': 60, 'split_oversized': True},
+    {'sel_metric': 'characters', 'lower_bound': 100, 'upper_bound': 300, 'split_oversized': True},
+    {'sel_metric': 'tokens', 'lower_bound': 50, 'upper_bound': 120, 'split_oversized': True},
+    {'sel_metric': 'tokens', 'lower_bound': 50, 'upper_bound': 120},
+]
+
+
+class TestIterChunks(unittest.TestCase):
+    def test_text_chunks_match_chunk_text(self):
+        for path in DATA_FILES:
+            with open(path, 'r') as html_file:
+                html_content = html_file.read()
+            df = HTMLParser(html_content).parse()
+            pieces = [html_content[i:i + 4096] for i in range(0, len(html_content), 4096)]
+
+            for settings in SETTINGS:
+                with self.subTest(file=os.path.basename(path), **settings):
+                    expected = TextChunker(df.copy()).chunk_text(**settings)
+                    self.assertListEqual(list(iter_chunks(path, **settings)), expected)
+                    self.assertListEqual(list(iter_chunks(iter(pieces), **settings)), expected)
+                    with open(path, 'rb') as html_file:
+                        self.assertListEqual(list(iter_chunks(html_file, **settings)), expected)
+
+    def test_frame_chunks_match_chunk_text(self):
+        for path in DATA_FILES[:2]:
+            with open(path, 'r') as html_file:
+                df = HTMLParser(html_file.read()).parse()
+            for settings in SETTINGS[:2]:
+                with self.subTest(file=os.path.basename(path), **settings):
+                    expected = TextChunker(df).chunk_text(keep_text_only=False, **settings)
+                    result = list(iter_chunks(path, keep_text_only=False, **settings))
+
+                    self.assertEqual(len(result), len(expected))
+                    for chunk, expected_chunk in zip(result, expected):
+                        pd.testing.assert_frame_equal(chunk, expected_chunk)
+
+if __name__ == '__main__':
+    unittest.main()
+
+# %%
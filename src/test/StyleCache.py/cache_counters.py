@@ -0,0 +1,46 @@
+#%%
+import os
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.StyleCache import StyleCache
+
+HTML = '''<html><head><style> .s1 { font-size: 12pt; color: red; } .s2 { font-weight: bold; color: blue; }</style></head>
+<body><p class="s1 s2" style="font-size: 9pt">a</p><p class="s1 s2" style="font-size: 9pt">b</p><p class="s2 s1">c</p></body></html>'''
+
+class TestStyleCache(unittest.TestCase):
+    def test_stylesheet_shared_between_documents(self):
+        cache = StyleCache()
+        first = HTMLParser(HTML, style_cache=cache)
+        second = HTMLParser(HTML, style_cache=cache)
+
+        self.assertIs(first.stylesheet, second.stylesheet)
+        self.assertEqual(cache.stats()['stylesheets']['misses'], 1)
+        self.assertEqual(cache.stats()['stylesheets']['hits'], 1)
+
+    def test_class_combination_and_inline_styles(self):
+        cache = StyleCache()
+        df = HTMLParser(HTML, style_cache=cache).parse()
+
+        self.assertListEqual(df['font_size'].tolist(), ['9pt', '9pt', '12pt'])
+        self.assertListEqual(df['font_color'].tolist(), ['blue', 'blue', 'red'])
+        self.assertListEqual(df['font_weight'].tolist(), ['bold', 'bold', 'bold'])
+        self.assertEqual(cache.stats()['inline_styles']['misses'], 1)
+
+    def test_bounded_size(self):
+        cache = StyleCache(max_inline_styles=2)
+        for style in ['color: red', 'color: blue', 'color: green']:
+            cache.inline(style)
+
+        stats = cache.stats()['inline_styles']
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
+
+# %%
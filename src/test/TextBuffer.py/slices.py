@@ -0,0 +1,40 @@
+#%%
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextBuffer import TextBuffer
+
+
+class TestTextBuffer(unittest.TestCase):
+    def test_slices(self):
+        texts = ['Title', 'a b', '', 'élan', 'end']
+        buffer = TextBuffer(texts)
+        self.assertEqual(buffer.text, ' '.join(texts))
+        self.assertEqual(len(buffer), len(texts))
+        for start in range(len(texts) + 1):
+            for stop in range(start, len(texts) + 1):
+                self.assertEqual(buffer.slice(start, stop), ' '.join(texts[start:stop]))
+        self.assertListEqual(buffer.slices([(0, 2), (2, 5)]), ['Title a b', ' élan end'])
+        self.assertEqual(TextBuffer([]).text, '')
+
+    def test_get_text_and_output_file(self):
+        with open(os.path.join(ROOT, 'data', 'ASU_2022-02.html'), 'r') as html_file:
+            parser = HTMLParser(html_file.read())
+        text = parser.get_text()
+        self.assertEqual(text, ' '.join(parser.parsed_data['text_content']))
+
+        with tempfile.TemporaryDirectory() as directory:
+            output_file = os.path.join(directory, 'text.txt')
+            self.assertIsNone(parser.get_text(output_file))
+            with open(output_file, 'r', encoding='utf-8') as text_file:
+                self.assertEqual(text_file.read(), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#%%
+import os
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.FontSizeResolver import FontSizeResolver
+from src.main.TextParsing.Score import Score
+from src.main.TextParsing.TextChunker import TextChunker
+
+class TestFontSizeLabels(unittest.TestCase):
+    def setUp(self):
+        score_dict = Score.ScoreDict
+        self.resolver = FontSizeResolver(score_dict['font_size_bins'], score_dict['font_size_labels'], score_dict['font_size_scores'])
+
+    def test_labels(self):
+        expected = {
+            '': '', 'large': '', '5pt': '6pt', '6pt': '6pt', '7.5pt': '6pt', '8.9pt': '8pt', '12pt': '12pt',
+            '100pt': '72pt', '16px': '12pt', '20 px': '15pt', '1.2em': '6pt', '14': '13pt', 'nanpt': None
+        }
+        for font_size, label in expected.items():
+            with self.subTest(font_size=font_size):
+                self.assertEqual(self.resolver.resolve(font_size)[1], label)
+
+    def test_batch_matches_single(self):
+        font_sizes = ['', '9pt', '9.5pt', '24px', 'x-large', '48pt']
+        expected = [self.resolver.resolve(font_size)[2] for font_size in font_sizes]
+        fresh = FontSizeResolver(self.resolver.font_size_bins, self.resolver.font_size_labels, self.resolver.font_size_scores)
+        self.assertListEqual(fresh.scores(font_sizes).tolist(), expected)
+
+    def test_warm_and_stats(self):
+        self.resolver.warm(['9pt', '9pt', '12pt'])
+        self.assertEqual(self.resolver.stats()['size'], 2)
+
+        self.resolver.scores(['9pt', '12pt'])
+        self.assertEqual(self.resolver.stats()['hits'], 2)
+
+    def test_shared_between_chunkers(self):
+        first, second = TextChunker(None), TextChunker(None)
+        self.assertIs(first.font_size_resolver, second.font_size_resolver)
+
+if __name__ == '__main__':
+    unittest.main()
+
+# %%
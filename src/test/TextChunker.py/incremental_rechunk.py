@@ -0,0 +1,75 @@
+#%%
+import glob
+import os
+import sys
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+class TestIncrementalRechunk(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(DATA_FILES[0], 'r') as html_file:
+            cls.df = HTMLParser(html_file.read()).parse()
+
+    def test_frame_is_not_modified(self):
+        df = self.df.copy()
+        chunker = TextChunker(df)
+        chunker.chunk_text(cutoff=7)
+        frames = chunker.chunk_text(cutoff=7, keep_text_only=False)
+
+        pd.testing.assert_frame_equal(df, self.df)
+        self.assertIn('total_score', frames[0].columns)
+        self.assertEqual(sum(len(frame) for frame in frames), len(df))
+
+    def test_frame_chunk_layout(self):
+        # DataFrame chunks keep the layout of the row by row chunker: object style columns, merged chunks numbered
+        # from 0 and the other chunks indexed by the labels of their rows
+        chunker = TextChunker(self.df)
+        for refine in [True, False]:
+            boundaries = chunker.chunk_boundaries(7, refine=refine)
+            frames = chunker.chunk_text(7, refine=refine, keep_text_only=False)
+            self.assertTrue(all(frame[column].dtype == object for frame in frames for column in ['font_family', 'font_size']))
+            for (start, stop), frame in zip(boundaries, frames):
+                merged = frame['is_cutoff'].iloc[1:].any()
+                self.assertFalse(merged and not refine)
+                self.assertListEqual(frame.index.tolist(), list(range(stop - start) if merged else range(start, stop)))
+        self.assertTrue(any(frame.index[0] == 0 and len(frame) > 1 for frame in chunker.chunk_text(7, keep_text_only=False)[1:]))
+
+    def test_scores_computed_once(self):
+        chunker = TextChunker(self.df)
+        with mock.patch.object(chunker, '_calculate_scores', wraps=chunker._calculate_scores) as calculate:
+            for cutoff in [5, 7, 9]:
+                for lower_bound, upper_bound in [(100, 650), (50, 300)]:
+                    chunks = chunker.chunk_text(cutoff=cutoff, lower_bound=lower_bound, upper_bound=upper_bound)
+                    expected = TextChunker(self.df).chunk_text(cutoff=cutoff, lower_bound=lower_bound, upper_bound=upper_bound)
+                    self.assertListEqual(chunks, expected)
+        self.assertEqual(calculate.call_count, 1)
+
+        # replacing the frame drops the cached scores
+        chunker.df = self.df.iloc[:10]
+        self.assertEqual(len(chunker.scores), 10)
+
+    def test_sweep_matches_single_cutoffs(self):
+        chunker = TextChunker(self.df)
+        cutoffs = [3, 5, 7, 8.5, 12]
+        for refine in [True, False]:
+            sweep = chunker.sweep(cutoffs, refine=refine, sel_metric='characters', lower_bound=300, upper_bound=2000)
+            self.assertListEqual(list(sweep), cutoffs)
+            for cutoff in cutoffs:
+                self.assertListEqual(sweep[cutoff], chunker.chunk_boundaries(cutoff, refine=refine, sel_metric='characters',
+                                                                             lower_bound=300, upper_bound=2000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#%%
+import glob
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.ChunkRefiner import ChunkRefiner
+from src.main.TextParsing.DocumentCache import DocumentCache
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+from src.main.TextParsing.Tokenizer import ApproxTokenizer, get_tokenizer
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+class TestTokenBudget(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(DATA_FILES[1], 'r') as html_file:
+            cls.df = HTMLParser(html_file.read()).parse()
+
+    def test_approximation_is_additive(self):
+        tokenizer = ApproxTokenizer()
+        texts = ['Net revenue rose 12.5% to $1,234 million.', 'ÉLAN', 'a_b c', '']
+        counts = tokenizer.count(texts)
+        self.assertEqual(counts.sum(), tokenizer.count([' '.join(texts)])[0])
+        self.assertEqual(counts[0], 16)
+
+    def test_hard_upper_bound(self):
+        chunker = TextChunker(self.df)
+        for sel_metric in ChunkRefiner.METRICS:
+            with self.subTest(metric=sel_metric):
+                upper_bound = 120 if sel_metric != 'characters' else 600
+                views = chunker.chunk_text(sel_metric=sel_metric, lower_bound=40, upper_bound=upper_bound,
+                                           split_oversized=True, as_views=True)
+                loose = chunker.chunk_text(sel_metric=sel_metric, lower_bound=40, upper_bound=upper_bound, split_oversized=False)
+                self.assertEqual(' '.join(view.text for view in views), ' '.join(loose))
+
+                lengths = {'words': lambda view: view.word_count, 'characters': lambda view: view.char_count,
+                           'tokens': lambda view: view.token_count}[sel_metric]
+                self.assertGreater(len(views), len(loose))
+                for view in views:
+                    # only a single row may exceed the bound
+                    self.assertTrue(lengths(view) <= upper_bound or len(view) == 1)
+
+    def test_split_by_default_for_tokens(self):
+        # a token budget is a hard limit unless split_oversized=False is given, the other metrics are soft targets
+        chunker = TextChunker(self.df)
+        for sel_metric in ChunkRefiner.METRICS:
+            with self.subTest(metric=sel_metric):
+                settings = {'sel_metric': sel_metric, 'lower_bound': 40, 'upper_bound': 120}
+                expected = chunker.chunk_boundaries(split_oversized=sel_metric == 'tokens', **settings)
+                self.assertListEqual(chunker.chunk_boundaries(**settings), expected)
+                self.assertListEqual(chunker.sweep([7], **settings)[7], expected)
+                self.assertEqual(DocumentCache.chunk_key('document', **settings),
+                                 DocumentCache.chunk_key('document', split_oversized=sel_metric == 'tokens', **settings))
+
+    def test_pluggable_tokenizer(self):
+        calls = []
+
+        def encode_batch(texts):
+            calls.append(len(texts))
+            return [text.split() for text in texts]
+
+        class Encoding:
+            def encode(self, text):
+                raise AssertionError('the rows are counted in one batch')
+
+        encoding = Encoding()
+        encoding.encode_batch = encode_batch
+        chunker = TextChunker(self.df, tokenizer=encoding)
+        chunks = chunker.chunk_text(sel_metric='tokens', cutoff=5)
+        chunker.chunk_text(sel_metric='tokens', cutoff=9)
+        self.assertListEqual(calls, [len(self.df)])
+
+        expected = TextChunker(self.df, tokenizer=lambda text: len(text.split())).chunk_text(sel_metric='tokens', cutoff=5)
+        self.assertListEqual(chunks, expected)
+
+        with self.assertRaises(ValueError):
+            get_tokenizer(42)
+
+    def test_frame_list_api_splits(self):
+        chunks = [pd.DataFrame({'text_content': texts}) for texts in [['a b', 'c d', 'e f'], ['g']]]
+        refined = ChunkRefiner(chunks).refine(lower_bound=1, upper_bound=4, sel_metric='words', split_oversized=True)
+        self.assertListEqual([chunk['text_content'].tolist() for chunk in refined], [['a b', 'c d'], ['e f'], ['g']])
+
+
+if __name__ == '__main__':
+    unittest.main()
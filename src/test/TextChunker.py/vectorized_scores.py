@@ -0,0 +1,49 @@
+#%%
+import glob
+import os
+import sys
+import unittest
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT)
+
+from src.main.TextParsing.HTMLParser import HTMLParser
+from src.main.TextParsing.TextChunker import TextChunker
+
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.html')))
+
+
+def row_wise_scores(chunker, df):
+    return df.apply(
+        lambda row: chunker._calculate_score(
+            row['tags'], str(row['font_size']), row['text_decoration'], row['font_weight']
+        ), axis=1
+    ).tolist()
+
+
+class TestVectorizedScores(unittest.TestCase):
+    def test_parity_on_data(self):
+        for path in DATA_FILES:
+            with self.subTest(file=os.path.basename(path)):
+                with open(path, 'r') as html_file:
+                    df = HTMLParser(html_file.read()).parse()
+                chunker = TextChunker(df)
+                self.assertListEqual(chunker._calculate_scores(df).tolist(), row_wise_scores(chunker, df))
+
+    def test_parity_on_font_size_units(self):
+        font_sizes = ['', '5pt', '6pt', '7.5pt', '12pt', '100pt', '16px', '20 px', '1.2em', '14', 'large', '72pt', '8.9pt']
+        df = pd.DataFrame({
+            'text_content': ['text'] * len(font_sizes),
+            'font_size': font_sizes,
+            'font_weight': ['bold', 'normal', '', 'bold, normal'] * 3 + [''],
+            'text_decoration': ['underline', '', 'none', 'underline, overline'] * 3 + [''],
+            'tags': ['header1, bold', '', 'italic', 'table cell, table row, table'] * 3 + ['header2, header2'],
+        })
+        chunker = TextChunker(df)
+        self.assertListEqual(chunker._calculate_scores(df).tolist(), row_wise_scores(chunker, df))
+
+if __name__ == '__main__':
+    unittest.main()
+
+# %%